@@ -143,6 +143,12 @@ class ConfigFile(object):
                 profile_config['cache'][kw] = profile_config[
                     'cache'].get(kw, cache_cfg[kw])
 
+            if api.cache.max_bytes is not None:
+                profile_config['cache']['max_bytes'] = api.cache.max_bytes
+
+            if api.cache.policy != 'lru':
+                profile_config['cache']['policy'] = api.cache.policy
+
     def write_config_from_api(self, api, config_file=None, profile=None):
         '''
         Create/update the config file from a DataAPI object
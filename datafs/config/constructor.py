@@ -41,7 +41,10 @@ class APIConstructor(object):
         if len(config.get('cache', {})) > 0:
 
             service = cls._generate_service(config['cache'])
-            api.attach_cache(service)
+            api.attach_cache(
+                service,
+                max_bytes=config['cache'].get('max_bytes', None),
+                policy=config['cache'].get('policy', 'lru'))
 
     @staticmethod
     def _generate_manager(manager_config):
@@ -59,8 +62,9 @@ class APIConstructor(object):
         -------
 
         manager : object
-            datafs.managers.MongoDBManager or
-            datafs.managers.DynamoDBManager object
+            datafs.managers.MongoDBManager,
+            datafs.managers.DynamoDBManager, or
+            datafs.managers.SQLiteManager object
             initialized with *args, **kwargs
 
         Examples
@@ -110,10 +114,15 @@ class APIConstructor(object):
             from datafs.managers.manager_dynamo import (
                 DynamoDBManager as mgr_class)
 
+        elif mgr_class_name.lower()[:6] == 'sqlite':
+            from datafs.managers.manager_sqlite import (
+                SQLiteManager as mgr_class)
+
         else:
             raise KeyError(
                 'Manager class "{}" not recognized. Choose from {}'.format(
-                    mgr_class_name, 'MongoDBManager or DynamoDBManager'))
+                    mgr_class_name,
+                    'MongoDBManager, DynamoDBManager, or SQLiteManager'))
 
         manager = mgr_class(
             *manager_config.get('args', []),
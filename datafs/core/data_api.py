@@ -1,14 +1,19 @@
 from __future__ import absolute_import
 
 from datafs.services.service import DataService
-from datafs.core.data_archive import DataArchive
-from datafs._compat import open_filelike
-
-import hashlib
-import fnmatch
+from datafs.services.cache_service import CacheService
+from datafs.core.data_archive import DataArchive, _process_version
+from datafs.core.dependencies import DependencyGraph
+from datafs.core import hashing
+from datafs.core.hash_index import HashIndex
+from datafs.core.name_index import NameIndex
+from datafs._compat import string_types
+
+import os
 import re
 import fs.path
 from fs.osfs import OSFS
+from multiprocessing.pool import ThreadPool
 
 try:
     PermissionError
@@ -19,10 +24,46 @@ except NameError:
 _VALID_AUTHORITY_PATTERNS = r'[\w\-]+'
 
 
+def _get_version_dependencies(archive, version=None):
+    '''
+    Returns the resolved version string and the dependencies of a version
+
+    Unversioned archives and archives without versions resolve to version
+    None, with the dependencies of their latest record.
+    '''
+
+    version = _process_version(archive, version)
+
+    if version is not None:
+        return str(version), archive.get_dependencies(version=version) or {}
+
+    history = archive.get_history()
+
+    if len(history) == 0:
+        return None, {}
+
+    return None, history[-1].get('dependencies') or {}
+
+
 class DataAPI(object):
 
     DefaultAuthorityName = None
 
+    # Seconds an archive may reuse its listing snapshot between operations.
+    # Within a single archive operation the snapshot is always reused.
+    ListingTTL = 0
+
+    # Number of concurrent transfers used by batch_download
+    DownloadWorkers = 10
+
+    # Algorithm used to compute checksums of new archive versions. Existing
+    # versions are always checked with the algorithm they were written with.
+    HashAlgorithm = 'md5'
+
+    # Name of the checksum index kept in the cache directory. Set to None to
+    # disable the index.
+    HashIndexName = '.datafs_hashes.db'
+
     _ArchiveConstructor = DataArchive
 
     def __init__(self, default_versions=None, **kwargs):
@@ -34,6 +75,8 @@ class DataAPI(object):
 
         self._manager = None
         self._cache = None
+        self._hash_index = None
+        self._name_index = None
         self._authorities = {}
 
         self.default_versions = default_versions
@@ -56,12 +99,42 @@ class DataAPI(object):
     def lock_manager(self):
         self._manager_locked = True
 
-    def attach_cache(self, service):
+    def attach_cache(self, service, max_bytes=None, policy='lru'):
+        '''
+        Attach a filesystem as the local cache
+
+        Parameters
+        ----------
+
+        service: object
+            :py:mod:`pyFilesystem` filesystem to use as the cache
+
+        max_bytes: int
+            Maximum total size of cached files in bytes. Least recently used
+            files are evicted when the limit is exceeded. If None (default),
+            the cache is not limited.
+
+        policy: str
+            Eviction policy, ``'lru'`` (default) or ``'lfu'``. See
+            :py:class:`~datafs.services.cache_service.CacheService`.
+        '''
 
         if service in self._authorities.values():
             raise ValueError('Cannot attach an authority as a cache')
         else:
-            self._cache = DataService(service)
+            if self._cache is not None:
+                self._cache.close()
+
+            self._cache = CacheService(
+                service, max_bytes=max_bytes, policy=policy)
+
+        if self._hash_index is not None:
+            self._hash_index.close()
+            self._hash_index = None
+
+        if self.HashIndexName is not None and service.hassyspath(''):
+            self._hash_index = HashIndex(
+                service.getsyspath(self.HashIndexName))
 
     @property
     def manager(self):
@@ -71,6 +144,16 @@ class DataAPI(object):
     @property
     def cache(self):
         return self._cache
+
+    @property
+    def hash_index(self):
+        '''
+        :py:class:`~datafs.core.hash_index.HashIndex` of local file checksums
+
+        The index is stored in the cache directory when a cache is attached,
+        and is None otherwise.
+        '''
+        return self._hash_index
     # get the default athority setting
 
     @property
@@ -125,6 +208,69 @@ class DataAPI(object):
 
         self._manager = manager
 
+        if self._name_index is not None:
+            self._name_index = NameIndex(manager, ttl=self._name_index.ttl)
+
+    def attach_name_index(self, ttl=300):
+        '''
+        Keep a local index of archive names
+
+        While an index is attached, :py:meth:`~DataAPI.filter`,
+        :py:meth:`~DataAPI.search` queries without tags, and
+        :py:meth:`~DataAPI.listdir` are answered from a sorted in-memory list
+        of archive names, without contacting the manager or the authority.
+        The index is loaded with one manager search when it is first used.
+
+        Archives created and deleted through this API are added to and
+        removed from the index. Changes made by other users are seen once the
+        index expires or is refreshed with
+        :py:meth:`~datafs.core.name_index.NameIndex.refresh`.
+
+        .. Note ::
+
+            With an index attached, :py:meth:`~DataAPI.listdir` lists archive
+            names on all authorities, including archives without any
+            versions. Locations which are archive names are still listed on
+            the authority, so versioned archives list their versions.
+
+        Parameters
+        ----------
+
+        ttl: float
+
+            Seconds before the index is reloaded from the manager (default
+            300). If None, the index is only reloaded when refreshed.
+
+        Returns
+        -------
+
+        index: object
+
+            The new :py:class:`~datafs.core.name_index.NameIndex`
+
+        '''
+
+        self._name_index = NameIndex(self.manager, ttl=ttl)
+
+        return self._name_index
+
+    def detach_name_index(self):
+        '''
+        Stop answering queries from the local archive name index
+        '''
+
+        self._name_index = None
+
+    @property
+    def name_index(self):
+        '''
+        :py:class:`~datafs.core.name_index.NameIndex` of archive names, or
+        None if no index is attached. See
+        :py:meth:`~DataAPI.attach_name_index`.
+        '''
+
+        return self._name_index
+
     def create(
             self,
             archive_name,
@@ -133,7 +279,8 @@ class DataAPI(object):
             raise_on_err=True,
             metadata=None,
             tags=None,
-            helper=False):
+            helper=False,
+            chunked=False):
         '''
         Create a DataFS archive
 
@@ -158,6 +305,11 @@ class DataAPI(object):
         helper: bool
             If true, interactively prompt for required metadata (default False)
 
+        chunked: bool
+            If true, store archive versions as content-defined chunks on the
+            authority, so that data shared between versions (and between
+            archives) is only stored once (default False). See
+            :py:class:`~datafs.services.chunk_store.ChunkStore`.
 
         '''
 
@@ -181,12 +333,118 @@ class DataAPI(object):
             metadata=metadata,
             user_config=self.user_config,
             tags=tags,
-            helper=helper)
+            helper=helper,
+            chunked=chunked)
+
+        if self._name_index is not None:
+            self._name_index.add(archive_name)
 
         return self._ArchiveConstructor(
             api=self,
             **res)
 
+    def batch_create(
+            self,
+            archives,
+            authority_name=None,
+            versioned=True,
+            metadata=None,
+            tags=None,
+            chunked=False):
+        '''
+        Create many DataFS archives with bulk manager requests
+
+        Archive names, required metadata and user config are validated
+        before any archives are created, and new archives are created with
+        bulk inserts. Archive objects are built from the new listings
+        without reading them back from the manager.
+
+        Parameters
+        ----------
+
+        archives: list or dict
+
+            Names of the archives to create, or a dictionary of
+            :py:meth:`~DataAPI.create` keyword arguments (``authority_name``,
+            ``versioned``, ``metadata``, ``tags`` and ``chunked``) keyed by
+            archive name
+
+        authority_name, versioned, metadata, tags, chunked:
+
+            Default :py:meth:`~DataAPI.create` arguments, used for archives
+            which do not specify their own
+
+        Returns
+        -------
+
+        archives: dict
+
+            New :py:class:`~datafs.core.data_archive.DataArchive` objects
+            keyed by archive name
+
+        failures: dict
+
+            Exceptions raised while creating archives, keyed by archive
+            name. Archives which already exist fail with a ``KeyError``.
+            Invalid archive names fail with a ``ValueError``, and missing
+            required metadata with an ``AssertionError``.
+
+        '''
+
+        if not hasattr(archives, 'items'):
+            archives = {archive_name: {} for archive_name in archives}
+
+        defaults = {
+            'authority_name': authority_name,
+            'versioned': versioned,
+            'metadata': metadata,
+            'tags': tags,
+            'chunked': chunked}
+
+        to_create = []
+        failures = {}
+
+        for archive_name, kwargs in archives.items():
+            kwargs = dict(defaults, **kwargs)
+
+            try:
+                authority, name = self._normalize_archive_name(
+                    archive_name, authority_name=kwargs['authority_name'])
+
+                if authority is None:
+                    authority = self.default_authority_name
+
+                self._validate_archive_name(name)
+
+            except Exception as e:
+                failures[archive_name] = e
+                continue
+
+            to_create.append({
+                'archive_name': name,
+                'authority_name': authority,
+                'archive_path': name,
+                'versioned': kwargs['versioned'],
+                'metadata': dict(kwargs['metadata'] or {}),
+                'user_config': self.user_config,
+                'tags': kwargs['tags'],
+                'chunked': kwargs['chunked']})
+
+        created, manager_failures = self.manager.batch_create_archives(
+            to_create)
+
+        failures.update(manager_failures)
+
+        if self._name_index is not None:
+            for archive_name in created:
+                self._name_index.add(archive_name)
+
+        archives = {
+            archive_name: self._ArchiveConstructor(api=self, **res)
+            for archive_name, res in created.items()}
+
+        return archives, failures
+
     def get_archive(self, archive_name, default_version=None):
         '''
         Retrieve a data archive
@@ -263,43 +521,527 @@ class DataAPI(object):
 
         '''
 
+        archives = self._batch_get_archive(archive_names, default_versions)
+
+        return {
+            archive_name: archive
+            for archive_name, (archive, listing) in archives.items()}
+
+    def _batch_get_archive(self, archive_names, default_versions=None):
+        '''
+        Retrieve archives and their full listings with one manager request
+
+        Returns
+        -------
+        archives: dict
+
+            Dictionary of ``(archive, listing)`` tuples keyed by archive name
+        '''
+
         # toss prefixes and normalize names
         archive_names = map(
             lambda arch: self._normalize_archive_name(arch)[1],
             archive_names)
 
-        responses = self.manager.batch_get_archive(archive_names)
+        listings = self.manager.batch_get_archive_listing(archive_names)
 
         archives = {}
 
+        for listing in listings:
+            archive = self._archive_from_listing(listing, default_versions)
+            archives[archive.archive_name] = (archive, listing)
+
+        return archives
+
+    def iter_batch_get_archive(self, archive_names, default_versions=None):
+        '''
+        Streaming version of :py:meth:`~DataAPI.batch_get_archive`
+
+        Archives are yielded as each page of listings is retrieved from the
+        manager, and archive names are consumed as they are needed, so
+        memory use does not grow with the number of archives. See
+        :py:meth:`~datafs.managers.manager.BaseDataManager.iter_batch_get_archive_listing`.
+
+        Parameters
+        ----------
+
+        archive_names: iterable
+
+            Iterable of archive names to retrieve
+
+        default_versions: str, object, or dict
+
+            Default versions to assign to each returned archive. See
+            :py:meth:`~DataAPI.batch_get_archive`.
+
+        Yields
+        ------
+
+        archive: object
+
+            :py:class:`~datafs.core.data_archive.DataArchive` objects. Archives
+            which are not found are skipped.
+
+        '''
+
+        archive_names = (
+            self._normalize_archive_name(archive_name)[1]
+            for archive_name in archive_names)
+
+        listings = self.manager.iter_batch_get_archive_listing(archive_names)
+
+        for listing in listings:
+            yield self._archive_from_listing(listing, default_versions)
+
+    def _archive_from_listing(self, listing, default_versions=None):
+
+        res = self.manager._format_archive_listing_as_constructor_spec(
+            dict(listing))
+
+        archive_name = res['archive_name']
+
         if default_versions is None:
             default_versions = {}
 
-        for res in responses:
-            res['archive_name'] = self._normalize_archive_name(
-                res['archive_name'])
+        if hasattr(default_versions, 'get'):
+
+            # Get version number from default_versions or
+            # self._default_versions if key not present.
+            default_version = default_versions.get(
+                archive_name,
+                self._default_versions.get(archive_name, None))
+
+        else:
+            default_version = default_versions
+
+        return self._ArchiveConstructor(
+            api=self,
+            default_version=default_version,
+            **res)
+
+    def batch_download(self, archives, versions=None, max_workers=None):
+        '''
+        Download many archives concurrently
+
+        All archives are retrieved from the manager in a single batch request,
+        then files are copied from the authority (or cache) on a pool of
+        threads. Each downloaded file is checked against the checksum of the
+        requested version.
+
+        Parameters
+        ----------
+
+        archives: dict
+
+            Dictionary of local file paths keyed by archive name
+
+        versions: str, object, or dict
+
+            Versions to download. May be a dict with archive names as keys and
+            versions as values, or may be a version, in which case the same
+            version is used for all archives. Archives without a version are
+            downloaded at their default version. See
+            :py:meth:`~DataAPI.batch_get_archive`.
+
+        max_workers: int
+
+            Number of concurrent downloads (default
+            :py:attr:`DownloadWorkers`)
+
+        Returns
+        -------
+
+        paths: dict
+
+            Local paths of the successfully downloaded archives, keyed by
+            archive name
+
+        failures: dict
+
+            Exceptions raised while downloading archives, keyed by archive
+            name. Archives which are not found fail with a ``KeyError``, and
+            files which do not match the version's checksum fail with an
+            ``IOError``.
+
+        '''
+
+        if max_workers is None:
+            max_workers = self.DownloadWorkers
+
+        filepaths = {
+            self._normalize_archive_name(archive_name)[1]: filepath
+            for archive_name, filepath in archives.items()}
+
+        if hasattr(versions, 'items'):
+            versions = {
+                self._normalize_archive_name(archive_name)[1]: version
+                for archive_name, version in versions.items()}
+
+        retrieved = self._batch_get_archive(
+            list(filepaths.keys()), default_versions=versions)
+
+        paths = {}
+        failures = {}
+
+        tasks = []
 
-            archive_name = res['archive_name']
+        for archive_name, filepath in filepaths.items():
+            if archive_name not in retrieved:
+                failures[archive_name] = KeyError(
+                    'Archive "{}" not found'.format(archive_name))
+                continue
 
-            if hasattr(default_versions, 'get'):
+            archive, listing = retrieved[archive_name]
+            tasks.append((archive, listing, filepath))
 
-                # Get version number from default_versions or
-                # self._default_versions if key not present.
-                default_version = default_versions.get(
-                    archive_name,
-                    self._default_versions.get(archive_name, None))
+        if len(tasks) == 0:
+            return paths, failures
 
+        pool = ThreadPool(min(max_workers, len(tasks)))
+
+        try:
+            results = pool.map(self._download_task, tasks)
+
+        finally:
+            pool.close()
+            pool.join()
+
+        for archive_name, filepath, err in results:
+            if err is None:
+                paths[archive_name] = filepath
             else:
-                default_version = default_versions
+                failures[archive_name] = err
 
-            archive = self._ArchiveConstructor(
-                api=self,
-                default_version=default_version,
-                **res)
+        return paths, failures
 
-            archives[archive_name] = archive
+    def _download_task(self, task):
+        '''
+        Download and verify a single archive for
+        :py:meth:`~DataAPI.batch_download`
 
-        return archives
+        Returns
+        -------
+        result: tuple
+
+            ``(archive_name, filepath, exception)``, where ``exception`` is
+            None on success
+        '''
+
+        archive, listing, filepath = task
+
+        try:
+            with archive._listing_snapshot(listing):
+                record = archive._get_version_record()
+
+                if record is None:
+                    raise ValueError('Archive "{}" has no versions'.format(
+                        archive.archive_name))
+
+                archive.download(filepath)
+
+            local_path = os.path.expanduser(filepath)
+
+            checksum = self._hash(
+                local_path, algorithm=record.get('algorithm', 'md5'))
+
+            if checksum['checksum'] != record['checksum']:
+                os.remove(local_path)
+                raise IOError(
+                    'Downloaded file does not match checksum of archive '
+                    '"{}"'.format(archive.archive_name))
+
+        except Exception as e:
+            return archive.archive_name, filepath, e
+
+        return archive.archive_name, filepath, None
+
+    def batch_update(
+            self,
+            archives,
+            max_workers=None,
+            bumpversion=None,
+            prerelease=None,
+            dependencies=None,
+            message=None):
+        '''
+        Add new versions to many archives
+
+        Archives are retrieved from the manager in a single batch request,
+        files are hashed and uploaded on a pool of threads, and the new
+        version records are registered with the manager in bulk.
+
+        Parameters
+        ----------
+
+        archives: dict
+
+            Dictionary of local file paths keyed by archive name
+
+        max_workers: int
+
+            Number of concurrent uploads (default :py:attr:`DownloadWorkers`)
+
+        bumpversion, prerelease, dependencies, message:
+
+            Arguments passed to
+            :py:meth:`~datafs.core.data_archive.DataArchive.update` for each
+            archive
+
+        Returns
+        -------
+
+        updated: dict
+
+            For each successfully processed archive, True if a new version
+            was registered, or False if the file matched the latest version
+
+        failures: dict
+
+            Exceptions raised while updating archives, keyed by archive name.
+            Archives which are not found fail with a ``KeyError``.
+
+        '''
+
+        if max_workers is None:
+            max_workers = self.DownloadWorkers
+
+        filepaths = {
+            self._normalize_archive_name(archive_name)[1]: filepath
+            for archive_name, filepath in archives.items()}
+
+        retrieved = self._batch_get_archive(list(filepaths.keys()))
+
+        updated = {}
+        failures = {}
+
+        tasks = []
+
+        for archive_name, filepath in filepaths.items():
+            if archive_name not in retrieved:
+                failures[archive_name] = KeyError(
+                    'Archive "{}" not found'.format(archive_name))
+                continue
+
+            archive, listing = retrieved[archive_name]
+            tasks.append((archive, listing, filepath, dict(
+                bumpversion=bumpversion,
+                prerelease=prerelease,
+                dependencies=dependencies,
+                message=message)))
+
+        if len(tasks) == 0:
+            return updated, failures
+
+        pool = ThreadPool(min(max_workers, len(tasks)))
+
+        try:
+            results = pool.map(self._update_task, tasks)
+
+        finally:
+            pool.close()
+            pool.join()
+
+        version_records = {}
+
+        for archive_name, version_metadata, err in results:
+            if err is not None:
+                failures[archive_name] = err
+
+            elif version_metadata is None:
+                updated[archive_name] = False
+
+            else:
+                version_records[archive_name] = version_metadata
+
+        manager_failures = self.manager.batch_update(version_records)
+        failures.update(manager_failures)
+
+        for archive_name in version_records:
+            if archive_name not in manager_failures:
+                updated[archive_name] = True
+                retrieved[archive_name][0].refresh()
+
+        return updated, failures
+
+    def _update_task(self, task):
+        '''
+        Hash and upload a new version of a single archive for
+        :py:meth:`~DataAPI.batch_update`
+
+        Returns
+        -------
+        result: tuple
+
+            ``(archive_name, version_metadata, exception)``, where
+            ``version_metadata`` is None if the file matches the latest
+            version and ``exception`` is None on success
+        '''
+
+        archive, listing, filepath, kwargs = task
+
+        try:
+            with archive._listing_snapshot(listing):
+                version_metadata = archive._stage_update(filepath, **kwargs)
+
+                if version_metadata is not None:
+                    archive._set_version_defaults(version_metadata)
+
+        except Exception as e:
+            return archive.archive_name, None, e
+
+        return archive.archive_name, version_metadata, None
+
+    def resolve_dependencies(self, archive, version=None, depth=None):
+        '''
+        Resolve the full dependency graph of an archive version
+
+        The graph is expanded breadth first. All archives in a level of the
+        graph are retrieved with a single batch request, and each
+        ``(archive, version)`` dependency is resolved only once, however many
+        archives depend on it.
+
+        Parameters
+        ----------
+
+        archive: str or object
+
+            Name of the archive, or a
+            :py:class:`~datafs.core.data_archive.DataArchive` object
+
+        version: str or object
+
+            Version of the archive to resolve (default: the archive's default
+            version)
+
+        depth: int
+
+            Number of levels of dependencies to resolve. If None (default),
+            all dependencies are resolved.
+
+        Returns
+        -------
+
+        graph: object
+
+            :py:class:`~datafs.core.dependencies.DependencyGraph` of
+            ``(archive_name, version)`` nodes. Dependencies without a pinned
+            version are resolved to the default version of their archive. Use
+            :py:meth:`~datafs.core.dependencies.DependencyGraph.topological_order`
+            to list the nodes with every dependency before its dependents.
+
+        Raises
+        ------
+
+        KeyError
+
+            If an archive in the graph is not found
+
+        ValueError
+
+            If a version in the graph is not found, or if the dependencies
+            form a cycle
+
+        '''
+
+        archive_name = getattr(archive, 'archive_name', archive)
+        archive_name = self._normalize_archive_name(archive_name)[1]
+
+        if version is not None:
+            version = str(version)
+
+        graph = None
+        resolved = {}
+        level = 0
+
+        # (dependent node, (archive name, requested version)) pairs
+        pending = [(None, (archive_name, version))]
+
+        while len(pending) > 0:
+
+            requests = set(
+                request for _, request in pending if request not in resolved)
+
+            archives = self._batch_get_archive(
+                set(name for name, _ in requests))
+
+            next_pending = []
+
+            for request in sorted(requests, key=lambda r: (r[0], r[1] or '')):
+                name, requested_version = request
+
+                if name not in archives:
+                    raise KeyError('Archive "{}" not found'.format(name))
+
+                dep_archive, listing = archives[name]
+
+                with dep_archive._listing_snapshot(listing):
+                    node_version, dependencies = _get_version_dependencies(
+                        dep_archive, requested_version)
+
+                node = (name, node_version)
+                resolved[request] = node
+
+                if graph is None:
+                    graph = DependencyGraph(node)
+
+                elif node in graph:
+                    continue
+
+                graph._add_node(node, dep_archive)
+
+                if depth is not None and level >= depth:
+                    continue
+
+                for dep_name, dep_version in dependencies.items():
+                    dep_name = self._normalize_archive_name(dep_name)[1]
+                    next_pending.append((node, (dep_name, dep_version)))
+
+            for dependent, request in pending:
+                if dependent is not None:
+                    graph._add_edge(dependent, resolved[request])
+
+            pending = next_pending
+            level += 1
+
+        # Raise a ValueError if the dependencies form a cycle
+        graph.topological_order()
+
+        return graph
+
+    def get_dependents(self, archive_name, version=None):
+        '''
+        List the archive versions which depend on an archive
+
+        Dependents are looked up in the manager's reverse dependency index,
+        without reading the history of each archive. See
+        :py:meth:`~datafs.managers.manager.BaseDataManager.get_dependents`.
+
+        Parameters
+        ----------
+
+        archive_name: str
+
+            Name of the dependency archive
+
+        version: str or object
+
+            Version of the dependency archive. If given, only archive versions
+            which pin this version are returned. Otherwise, all archive
+            versions which depend on the archive are returned.
+
+        Returns
+        -------
+
+        dependents: list
+
+            Sorted list of ``(archive_name, version)`` tuples. ``version`` is
+            None for unversioned archives.
+
+        '''
+
+        archive_name = self._normalize_archive_name(archive_name)[1]
+
+        return self.manager.get_dependents(archive_name, version=version)
 
     def listdir(self, location, authority_name=None):
         '''
@@ -355,6 +1097,10 @@ class DataAPI(object):
             location,
             authority_name=authority_name)
 
+        if self._name_index is not None:
+            if location not in self._name_index:
+                return self._name_index.listdir(location)
+
         if authority_name is None:
             authority_name = self.default_authority_name
 
@@ -395,33 +1141,18 @@ class DataAPI(object):
         if prefix is not None:
             prefix = fs.path.relpath(prefix)
 
-        archives = self.manager.search(tuple([]), begins_with=prefix)
-
-        if not pattern:
-            for archive in archives:
-                yield archive
-
-        if engine == 'str':
-            for arch in archives:
-                if pattern in arch:
-                    yield arch
-
-        elif engine == 'path':
-            # Change to generator version of fnmatch.filter
-
-            for arch in archives:
-                if fnmatch.fnmatch(arch, pattern):
-                    yield arch
-
-        elif engine == 'regex':
-            for arch in archives:
-                if re.search(pattern, arch):
-                    yield arch
+        if self._name_index is not None:
+            archives = self._name_index.filter(
+                pattern=pattern, engine=engine, begins_with=prefix)
 
         else:
-            raise ValueError(
-                'search engine "{}" not recognized. '.format(engine) +
-                'choose "str", "fn", or "regex"')
+            # Patterns are matched by the manager, so only matching archive
+            # names are returned from the database
+            archives = self.manager.filter(
+                pattern=pattern, engine=engine, begins_with=prefix)
+
+        for archive in archives:
+            yield archive
 
     def search(self, *query, **kwargs):
         '''
@@ -446,6 +1177,9 @@ class DataAPI(object):
         if prefix is not None:
             prefix = fs.path.relpath(prefix)
 
+        if len(query) == 0 and self._name_index is not None:
+            return iter(self._name_index.search(begins_with=prefix))
+
         return self.manager.search(query, begins_with=prefix)
 
     def _validate_archive_name(self, archive_name):
@@ -489,11 +1223,13 @@ class DataAPI(object):
         archive.delete()
 
     @staticmethod
-    def hash_file(f):
+    def hash_file(f, algorithm='md5', extra_algorithms=None):
         '''
         Utility function for hashing file contents
 
-        Overload this function to change the file equality checking algorithm
+        Overload this function to change the file equality checking algorithm.
+        To change the algorithm used for new archive versions, set
+        :py:attr:`HashAlgorithm`.
 
         Parameters
         ----------
@@ -501,29 +1237,95 @@ class DataAPI(object):
         f: file-like
             File-like object or file path from which to compute checksum value
 
+        algorithm: str
+            Name of the hashing algorithm (default 'md5'). See
+            :py:func:`~datafs.core.hashing.get_algorithms`.
+
+        extra_algorithms: list
+            Additional algorithms to compute in the same pass over the file
+            (optional)
+
 
         Returns
         -------
         checksum: dict
-            dictionary with {'algorithm': 'md5', 'checksum': hexdigest}
+            dictionary with {'algorithm': algorithm, 'checksum': hexdigest}.
+            If ``extra_algorithms`` are given, a 'checksums' dictionary of the
+            digests of all algorithms is also included.
 
         '''
 
-        md5 = hashlib.md5()
+        algorithms = [algorithm]
 
-        with open_filelike(f, 'rb') as f_obj:
-            for chunk in iter(lambda: f_obj.read(128 * md5.block_size), b''):
-                md5.update(chunk)
+        if extra_algorithms is not None:
+            algorithms.extend(
+                [a for a in extra_algorithms if a not in algorithms])
 
-        return {'algorithm': 'md5', 'checksum': md5.hexdigest()}
+        checksums = hashing.hash_file(f, algorithms)
+
+        checksum = {'algorithm': algorithm, 'checksum': checksums[algorithm]}
+
+        if extra_algorithms is not None:
+            checksum['checksums'] = checksums
+
+        return checksum
+
+    def _hash(self, f, algorithm='md5', extra_algorithms=None):
+        '''
+        Hash a file, reusing checksums from the hash index where possible
+
+        File paths are looked up in :py:attr:`hash_index` and are only hashed
+        if they have changed since they were indexed. File-like objects are
+        always hashed. See :py:meth:`~DataAPI.hash_file`.
+        '''
+
+        index = self._hash_index
+
+        if index is None or not isinstance(f, string_types):
+            return self.hash_file(
+                f, algorithm=algorithm, extra_algorithms=extra_algorithms)
+
+        algorithms = [algorithm]
+
+        if extra_algorithms is not None:
+            algorithms.extend(
+                [a for a in extra_algorithms if a not in algorithms])
+
+        stat = os.stat(f)
+
+        checksums = {a: index.get(f, a, stat=stat) for a in algorithms}
+
+        if None in checksums.values():
+            checksum = self.hash_file(
+                f, algorithm=algorithm, extra_algorithms=extra_algorithms)
+
+            computed = checksum.get(
+                'checksums', {algorithm: checksum['checksum']})
+
+            for name, digest in computed.items():
+                index.set(f, name, digest, stat=stat)
+
+            return checksum
+
+        checksum = {'algorithm': algorithm, 'checksum': checksums[algorithm]}
+
+        if extra_algorithms is not None:
+            checksum['checksums'] = checksums
+
+        return checksum
 
     def close(self):
         for service in self._authorities:
             self._authorities[service].fs.close()
 
         if self.cache:
+            self.cache.close()
             self.cache.fs.close()
 
+        if self._hash_index is not None:
+            self._hash_index.close()
+            self._hash_index = None
+
     @staticmethod
     def _validate_authority_name(authority_name):
         matched = re.match(
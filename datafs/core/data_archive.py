@@ -2,12 +2,15 @@ from __future__ import absolute_import
 
 from datafs.core import data_file
 from datafs.core.versions import BumpableVersion
+from datafs.services.chunk_store import ChunkStore
+from datafs.services.service import DataService
 from datafs._compat import string_types
 from contextlib import contextmanager
 from fs.osfs import OSFS
 import fs.utils
 import fs.path
 import click
+import functools
 import os
 import textwrap
 import time
@@ -33,6 +36,34 @@ def _process_version(self, version):
         return BumpableVersion(version)
 
 
+def _get_checksum(checksum, algorithm):
+    '''
+    Returns the digest computed with ``algorithm`` from a hash_file result
+
+    Returns None if the digest for ``algorithm`` was not computed.
+    '''
+
+    if checksum['algorithm'] == algorithm:
+        return checksum['checksum']
+
+    return checksum.get('checksums', {}).get(algorithm, None)
+
+
+def _holds_listing(method):
+    '''
+    Decorator holding the archive listing snapshot for the duration of a call
+
+    All manager reads made within the decorated method share one listing.
+    '''
+
+    @functools.wraps(method)
+    def inner(self, *args, **kwargs):
+        with self._listing_snapshot():
+            return method(self, *args, **kwargs)
+
+    return inner
+
+
 class DataArchive(object):
 
     def __init__(
@@ -42,7 +73,8 @@ class DataArchive(object):
             authority_name,
             archive_path,
             versioned=True,
-            default_version=None):
+            default_version=None,
+            chunked=False):
 
         self.api = api
         self.archive_name = archive_name
@@ -52,6 +84,11 @@ class DataArchive(object):
 
         self._versioned = versioned
         self._default_version = default_version
+        self._chunked = chunked
+
+        self._listing = None
+        self._listing_time = None
+        self._listing_holds = 0
 
     def __repr__(self):
         return "<{} {}://{}>".format(self.__class__.__name__,
@@ -69,6 +106,76 @@ class DataArchive(object):
     def versioned(self):
         return self._versioned
 
+    @property
+    def chunked(self):
+        return self._chunked
+
+    def refresh(self):
+        '''
+        Discard the archive's listing snapshot
+
+        The next read of the archive's history will be fetched from the
+        manager. Snapshots are also discarded automatically whenever this
+        archive object writes to the manager.
+        '''
+
+        self._listing = None
+        self._listing_time = None
+
+    def _get_listing(self):
+        '''
+        Return the archive listing snapshot, fetching it if necessary
+
+        The snapshot is reused while an operation holds it (see
+        :py:meth:`~DataArchive._listing_snapshot`) or while it is younger than
+        the API's ``ListingTTL``.
+        '''
+
+        manager = self.api.manager
+
+        if self._listing is not None:
+            if self._listing_holds > 0 or self._listing_is_fresh():
+                return self._listing
+
+        self._listing = manager.get_archive_listing(self.archive_name)
+        self._listing_time = time.time()
+
+        return self._listing
+
+    def _listing_is_fresh(self):
+        ttl = self.api.ListingTTL
+
+        return bool(ttl) and (time.time() - self._listing_time) < ttl
+
+    @contextmanager
+    def _listing_snapshot(self, listing=None):
+        '''
+        Hold the listing snapshot so nested reads share one manager fetch
+
+        Parameters
+        ----------
+        listing : dict
+            Archive listing already retrieved from the manager (optional). If
+            provided, the snapshot is seeded with this listing.
+        '''
+
+        if listing is not None:
+            self._listing = listing
+            self._listing_time = time.time()
+
+        elif self._listing_holds == 0 and self._listing is not None:
+            # A new operation must not inherit a stale snapshot
+            if not self._listing_is_fresh():
+                self.refresh()
+
+        self._listing_holds += 1
+
+        try:
+            yield
+
+        finally:
+            self._listing_holds -= 1
+
     def get_latest_version(self):
 
         versions = self.get_versions()
@@ -93,6 +200,7 @@ class DataArchive(object):
             return sorted(map(BumpableVersion, set(
                 [v['version'] for v in versions])))
 
+    @_holds_listing
     def get_default_version(self):
 
         if not self.versioned:
@@ -173,32 +281,124 @@ class DataArchive(object):
     def archive_path(self):
         return self._archive_path
 
+    @property
+    def _chunk_store(self):
+        return ChunkStore(self.authority.fs)
+
     def get_metadata(self):
         return self.api.manager.get_metadata(self.archive_name)
 
     def get_history(self):
-        return self.api.manager.get_version_history(self.archive_name)
+        return self._get_listing()['version_history']
 
     def get_latest_hash(self):
-        return self.api.manager.get_latest_hash(self.archive_name)
+        history = self.get_history()
+
+        if len(history) == 0:
+            return None
 
+        return history[-1]['checksum']
+
+    @_holds_listing
     def get_version_hash(self, version=None):
+        record = self._get_version_record(version)
+
+        if record is None:
+            return None
+
+        return record['checksum']
+
+    @_holds_listing
+    def _get_version_record(self, version=None):
+        '''
+        Returns the version history record of a version
+
+        Returns None if the archive has no versions.
+        '''
+
         version = _process_version(self, version)
+        history = self.get_history()
+
         if self.versioned:
 
             if version is None:
                 return None
 
-            for ver in self.get_history():
+            for ver in history:
                 if BumpableVersion(ver['version']) == version:
-                    return ver['checksum']
+                    return ver
 
             raise ValueError(
                 'Version "{}" not found in archive history'.format(version))
 
+        elif len(history) == 0:
+            return None
+
         else:
-            return self.get_latest_hash()
+            return history[-1]
+
+    def _get_hash_functions(self, record, write=True):
+        '''
+        Returns ``(hasher, version_check)`` functions for I/O on a version
 
+        ``version_check`` compares a checksum to the version ``record`` using
+        the algorithm the record was written with. If ``write`` is True,
+        ``hasher`` computes checksums with the API's ``HashAlgorithm`` for new
+        versions, as well as with the record's algorithm in the same pass.
+        '''
+
+        if record is None:
+            version_hash = None
+            version_algorithm = self.api.HashAlgorithm
+        else:
+            version_hash = record['checksum']
+            version_algorithm = record.get('algorithm', 'md5')
+
+        if write:
+            algorithm = self.api.HashAlgorithm
+        else:
+            algorithm = version_algorithm
+
+        if version_algorithm == algorithm:
+            extra_algorithms = None
+        else:
+            extra_algorithms = [version_algorithm]
+
+        def hasher(f):
+            return self.api._hash(
+                f,
+                algorithm=algorithm,
+                extra_algorithms=extra_algorithms)
+
+        # Allows streaming writes to compute checksums incrementally
+        hasher.algorithms = [algorithm] + (extra_algorithms or [])
+
+        def version_check(chk):
+            return _get_checksum(chk, version_algorithm) == version_hash
+
+        return hasher, version_check
+
+    @_holds_listing
+    def get_version_manifest(self, version=None):
+        '''
+        Returns the chunk manifest of a version of a chunked archive
+
+        Returns
+        -------
+        manifest : list
+            List of ``{'checksum': sha256 hexdigest, 'size': bytes}`` chunk
+            descriptions, or None if the archive is not chunked or the version
+            was not stored in chunks
+        '''
+
+        record = self._get_version_record(version)
+
+        if record is None:
+            return None
+
+        return record.get('manifest', None)
+
+    @_holds_listing
     def update(
             self,
             filepath,
@@ -248,20 +448,64 @@ class DataArchive(object):
         if metadata is None:
             metadata = {}
 
+        version_metadata = self._stage_update(
+            filepath,
+            cache=cache,
+            remove=remove,
+            bumpversion=bumpversion,
+            prerelease=prerelease,
+            dependencies=dependencies,
+            message=message)
+
+        if version_metadata is None:
+            self.update_metadata(metadata)
+            return
+
+        self._update_manager(
+            archive_metadata=metadata,
+            version_metadata=version_metadata)
+
+    @_holds_listing
+    def _stage_update(
+            self,
+            filepath,
+            cache=False,
+            remove=False,
+            bumpversion=None,
+            prerelease=None,
+            dependencies=None,
+            message=None):
+        '''
+        Hash and upload a new version, without registering it with the manager
+
+        See :py:meth:`update`.
+
+        Returns
+        -------
+        version_metadata : dict
+            The new version's record, or None if ``filepath`` matches the
+            latest version
+        '''
+
         latest_version = self.get_latest_version()
 
-        hashval = self.api.hash_file(filepath)
+        history = self.get_history()
+
+        if len(history) > 0:
+            hasher, version_check = self._get_hash_functions(history[-1])
+        else:
+            hasher, version_check = self._get_hash_functions(None)
+
+        hashval = hasher(filepath)
 
         checksum = hashval['checksum']
         algorithm = hashval['algorithm']
 
-        if checksum == self.get_latest_hash():
-            self.update_metadata(metadata)
-
+        if version_check(hashval):
             if remove and os.path.isfile(filepath):
                 os.remove(filepath)
 
-            return
+            return None
 
         if self.versioned:
             if latest_version is None:
@@ -280,21 +524,31 @@ class DataArchive(object):
         if cache:
             self.cache(next_version)
 
-        if self.is_cached(next_version):
+        version_metadata = dict(
+            checksum=checksum,
+            algorithm=algorithm,
+            version=next_version,
+            dependencies=dependencies,
+            message=message)
+
+        if self.chunked:
+            with open(filepath, 'rb') as f:
+                version_metadata['manifest'] = self._chunk_store.store(f)
+
+            if self.is_cached(next_version):
+                self.api.cache.upload(filepath, next_path, remove=remove)
+
+            elif remove and os.path.isfile(filepath):
+                os.remove(filepath)
+
+        elif self.is_cached(next_version):
             self.authority.upload(filepath, next_path)
             self.api.cache.upload(filepath, next_path, remove=remove)
 
         else:
             self.authority.upload(filepath, next_path, remove=remove)
 
-        self._update_manager(
-            archive_metadata=metadata,
-            version_metadata=dict(
-                checksum=checksum,
-                algorithm=algorithm,
-                version=next_version,
-                dependencies=dependencies,
-                message=message))
+        return version_metadata
 
     def _get_default_dependencies(self):
         '''
@@ -346,9 +600,109 @@ class DataArchive(object):
         # just update records in self.api.manager
 
         self.api.manager.update_metadata(self.archive_name, metadata)
+        self.refresh()
 
     # File I/O methods
 
+    @_holds_listing
+    def _prepare_io(self, version, bumpversion, prerelease, dependencies):
+        '''
+        Resolve the paths and version information for a read/write operation
+
+        All manager reads needed by the operation are made here, from a single
+        listing snapshot. Default dependencies are resolved up front so that
+        registering a new version on close does not re-read the archive.
+
+        Returns
+        -------
+        io_spec : tuple
+            ``(record, read_path, write_path, next_version,
+            dependencies)``, where ``record`` is the version history record
+            of the version read (None if the archive has no versions)
+        '''
+
+        latest_version = self.get_latest_version()
+        version = _process_version(self, version)
+
+        record = self._get_version_record(version)
+
+        if self.versioned:
+
+            if latest_version is None:
+                latest_version = BumpableVersion()
+
+            next_version = latest_version.bump(
+                kind=bumpversion,
+                prerelease=prerelease,
+                inplace=False)
+
+            msg = "Version must be bumped on write. " \
+                "Provide bumpversion and/or prerelease."
+
+            assert next_version > latest_version, msg
+
+            read_path = self.get_version_path(version)
+            write_path = self.get_version_path(next_version)
+
+        else:
+            read_path = self.archive_path
+            write_path = self.archive_path
+            next_version = None
+
+        if dependencies is None:
+            dependencies = self._get_default_dependencies()
+
+        return record, read_path, write_path, next_version, dependencies
+
+    @contextmanager
+    def _staged_authority(self, read_path, record, hasher, version_check):
+        '''
+        Context manager returning the service to use as an I/O authority
+
+        Unchunked archives are read from and written to the archive's
+        authority directly. Chunked archives are staged on a temporary local
+        filesystem: the version being read is reassembled from its chunks
+        (unless an up-to-date copy is already cached) and new versions are
+        written to the staging area, to be split into chunks by the updater.
+        '''
+
+        if not self.chunked:
+            yield self.authority
+            return
+
+        if record is not None:
+            manifest = record.get('manifest', None)
+        else:
+            manifest = None
+
+        cache = self.api.cache
+        cached = False
+
+        if manifest is not None and cache and cache.fs.isfile(read_path):
+            cached = version_check(
+                data_file._hash_file(cache.fs, read_path, hasher))
+
+        with data_file._get_write_fs() as staging_fs:
+
+            if manifest is not None and not cached:
+                self._chunk_store.restore(manifest, staging_fs, read_path)
+
+            yield DataService(staging_fs)
+
+    def _get_write_metadata(self, authority, write_path, **version_metadata):
+        '''
+        Build the version record for a file written to ``authority``
+
+        For chunked archives, the new file is split into chunks and its
+        manifest is added to the record.
+        '''
+
+        if self.chunked:
+            version_metadata['manifest'] = self._chunk_store.store_file(
+                authority.fs, write_path)
+
+        return version_metadata
+
     @contextmanager
     def open(
             self,
@@ -400,63 +754,42 @@ class DataArchive(object):
         if metadata is None:
             metadata = {}
 
-        latest_version = self.get_latest_version()
-        version = _process_version(self, version)
-
-        version_hash = self.get_version_hash(version)
-
-        if self.versioned:
-
-            if latest_version is None:
-                latest_version = BumpableVersion()
-
-            next_version = latest_version.bump(
-                kind=bumpversion,
-                prerelease=prerelease,
-                inplace=False)
-
-            msg = "Version must be bumped on write. " \
-                "Provide bumpversion and/or prerelease."
-
-            assert next_version > latest_version, msg
-
-            read_path = self.get_version_path(version)
-            write_path = self.get_version_path(next_version)
-
-        else:
-            read_path = self.archive_path
-            write_path = self.archive_path
-            next_version = None
+        record, read_path, write_path, next_version, dependencies = (
+            self._prepare_io(version, bumpversion, prerelease, dependencies))
 
         # version_check returns true if fp's hash is current as of read
-        def version_check(chk):
-            return chk['checksum'] == version_hash
-
-        # Updater updates the manager with the latest version number
-        def updater(checksum, algorithm):
-            self._update_manager(
-                archive_metadata=metadata,
-                version_metadata=dict(
-                    version=next_version,
-                    dependencies=dependencies,
-                    checksum=checksum,
-                    algorithm=algorithm,
-                    message=message))
-
-        opener = data_file.open_file(
-            self.authority,
-            self.api.cache,
-            updater,
-            version_check,
-            self.api.hash_file,
-            read_path,
-            write_path,
-            mode=mode,
-            *args,
-            **kwargs)
+        hasher, version_check = self._get_hash_functions(record)
+
+        with self._staged_authority(
+                read_path, record, hasher, version_check) as authority:
+
+            # Updater updates the manager with the latest version number
+            def updater(checksum, algorithm, checksums=None):
+                self._update_manager(
+                    archive_metadata=metadata,
+                    version_metadata=self._get_write_metadata(
+                        authority,
+                        write_path,
+                        version=next_version,
+                        dependencies=dependencies,
+                        checksum=checksum,
+                        algorithm=algorithm,
+                        message=message))
+
+            opener = data_file.open_file(
+                authority,
+                self.api.cache,
+                updater,
+                version_check,
+                hasher,
+                read_path,
+                write_path,
+                mode=mode,
+                *args,
+                **kwargs)
 
-        with opener as f:
-            yield f
+            with opener as f:
+                yield f
 
     @contextmanager
     def get_local_path(
@@ -500,61 +833,41 @@ class DataArchive(object):
         if metadata is None:
             metadata = {}
 
-        latest_version = self.get_latest_version()
-        version = _process_version(self, version)
-
-        version_hash = self.get_version_hash(version)
-
-        if self.versioned:
-
-            if latest_version is None:
-                latest_version = BumpableVersion()
-
-            next_version = latest_version.bump(
-                kind=bumpversion,
-                prerelease=prerelease,
-                inplace=False)
-
-            msg = "Version must be bumped on write. " \
-                "Provide bumpversion and/or prerelease."
-
-            assert next_version > latest_version, msg
-
-            read_path = self.get_version_path(version)
-            write_path = self.get_version_path(next_version)
-
-        else:
-            read_path = self.archive_path
-            write_path = self.archive_path
-            next_version = None
+        record, read_path, write_path, next_version, dependencies = (
+            self._prepare_io(version, bumpversion, prerelease, dependencies))
 
         # version_check returns true if fp's hash is current as of read
-        def version_check(chk):
-            return chk['checksum'] == version_hash
-
-        # Updater updates the manager with the latest version number
-        def updater(checksum, algorithm):
-            self._update_manager(
-                archive_metadata=metadata,
-                version_metadata=dict(
-                    version=next_version,
-                    dependencies=dependencies,
-                    checksum=checksum,
-                    algorithm=algorithm,
-                    message=message))
-
-        path = data_file.get_local_path(
-            self.authority,
-            self.api.cache,
-            updater,
-            version_check,
-            self.api.hash_file,
-            read_path,
-            write_path)
-
-        with path as fp:
-            yield fp
+        hasher, version_check = self._get_hash_functions(record)
+
+        with self._staged_authority(
+                read_path, record, hasher, version_check) as authority:
+
+            # Updater updates the manager with the latest version number
+            def updater(checksum, algorithm, checksums=None):
+                self._update_manager(
+                    archive_metadata=metadata,
+                    version_metadata=self._get_write_metadata(
+                        authority,
+                        write_path,
+                        version=next_version,
+                        dependencies=dependencies,
+                        checksum=checksum,
+                        algorithm=algorithm,
+                        message=message))
+
+            path = data_file.get_local_path(
+                authority,
+                self.api.cache,
+                updater,
+                version_check,
+                hasher,
+                read_path,
+                write_path)
+
+            with path as fp:
+                yield fp
 
+    @_holds_listing
     def download(self, filepath, version=None):
         '''
         Downloads a file from authority to local path
@@ -574,30 +887,32 @@ class DataArchive(object):
 
         local = OSFS(dirname)
 
-        version_hash = self.get_version_hash(version)
+        record = self._get_version_record(version)
 
         # version_check returns true if fp's hash is current as of read
-        def version_check(chk):
-            return chk['checksum'] == version_hash
+        hasher, version_check = self._get_hash_functions(record, write=False)
 
         if os.path.exists(filepath):
-            if version_check(self.api.hash_file(filepath)):
+            if version_check(hasher(filepath)):
                 return
 
         read_path = self.get_version_path(version)
 
-        with data_file._choose_read_fs(
-                self.authority,
-                self.api.cache,
-                read_path,
-                version_check,
-                self.api.hash_file) as read_fs:
+        with self._staged_authority(
+                read_path, record, hasher, version_check) as authority:
 
-            fs.utils.copyfile(
-                read_fs,
-                read_path,
-                local,
-                filename)
+            with data_file._choose_read_fs(
+                    authority,
+                    self.api.cache,
+                    read_path,
+                    version_check,
+                    hasher) as read_fs:
+
+                fs.utils.copyfile(
+                    read_fs,
+                    read_path,
+                    local,
+                    filename)
 
     def log(self):
 
@@ -608,6 +923,7 @@ class DataArchive(object):
         for i, record in enumerate(history):
             output = ''
 
+            record = dict(record)
             record['timestamp'] = time.strftime(
                 '%a, %d %b %Y %H:%M:%S +0000',
                 time.strptime(record['updated'], '%Y%m%d-%H%M%S'))
@@ -646,6 +962,7 @@ class DataArchive(object):
 
         click.echo_via_pager('\n\n'.join(reversed(outputs)) + '\n')
 
+    @_holds_listing
     def delete(self):
         '''
         Delete the archive
@@ -660,6 +977,10 @@ class DataArchive(object):
         versions = self.get_versions()
         self.api.manager.delete_archive_record(self.archive_name)
 
+        if self.api.name_index is not None:
+            self.api.name_index.discard(self.archive_name)
+        self.refresh()
+
         for version in versions:
             if self.authority.fs.exists(self.get_version_path(version)):
                 self.authority.fs.remove(self.get_version_path(version))
@@ -749,6 +1070,8 @@ class DataArchive(object):
 
         if not self.api.cache.fs.isfile(self.get_version_path(version)):
             data_file._touch(self.api.cache.fs, self.get_version_path(version))
+            data_file._record_cache_write(
+                self.api.cache, self.get_version_path(version))
 
         assert self.api.cache.fs.isfile(
             self.get_version_path(version)), "Cache creation failed"
@@ -758,7 +1081,10 @@ class DataArchive(object):
 
         if self.api.cache.fs.isfile(self.get_version_path(version)):
             self.api.cache.fs.remove(self.get_version_path(version))
+            data_file._record_cache_removal(
+                self.api.cache, self.get_version_path(version))
 
+    @_holds_listing
     def get_dependencies(self, version=None):
         '''
         Parameters
@@ -786,12 +1112,13 @@ class DataArchive(object):
         if len(history) == 0:
             raise ValueError('Cannot set dependencies on an empty archive')
 
-        version_metadata = history[-1]
+        version_metadata = dict(history[-1])
 
         version_metadata['dependencies'] = dependencies
         version_metadata['user_config'] = self.api.user_config
 
         self.api.manager.update(self.archive_name, version_metadata)
+        self.refresh()
 
     def get_tags(self):
         '''
@@ -806,6 +1133,7 @@ class DataArchive(object):
         '''
         normed_tags = self.api.manager._normalize_tags(tags)
         self.api.manager.add_tags(self.archive_name, normed_tags)
+        self.refresh()
 
     def delete_tags(self, *tags):
         '''
@@ -816,3 +1144,4 @@ class DataArchive(object):
         normed_tags = self.api.manager._normalize_tags(tags)
 
         self.api.manager.delete_tags(self.archive_name, normed_tags)
+        self.refresh()
@@ -1,9 +1,13 @@
 
+from datafs.services.cache_service import CacheService
+from datafs.core import hashing
+
 import fs.utils
 import fs.path
 import tempfile
 import shutil
 import time
+import io
 from fs.osfs import OSFS
 from fs.multifs import MultiFS
 
@@ -12,6 +16,13 @@ from fs.errors import (ResourceLockedError)
 from contextlib import contextmanager
 
 
+# Streaming writes are buffered in memory up to this many bytes before
+# spilling to a temporary file
+SpoolMaxSize = 8 * 1024 * 1024
+
+STREAM_MODES = ('w', 'wb', 'wt')
+
+
 # HELPER FUNCTIONS
 
 def _close(filesys):
@@ -40,6 +51,61 @@ def _touch(filesystem, path):
         filesystem.createfile(path)
 
 
+def _record_cache_access(cache, path, hit):
+    if isinstance(cache, CacheService):
+        cache.record_access(path, hit=hit)
+
+
+def _record_cache_write(cache, path):
+    if isinstance(cache, CacheService):
+        cache.record_write(path)
+
+
+def _record_cache_removal(cache, path):
+    if isinstance(cache, CacheService):
+        cache.discard(path)
+
+
+def _hash_file(filesystem, path, hasher):
+    '''
+    Hash a file on a filesystem
+
+    Files are passed to ``hasher`` by system path where the filesystem
+    provides one, so that their checksums can be looked up in a hash index.
+    '''
+
+    if filesystem.hassyspath(path):
+        return hasher(filesystem.getsyspath(path))
+
+    with filesystem.open(path, 'rb') as f:
+        return hasher(f)
+
+
+class _HashingWriter(io.RawIOBase):
+    '''
+    Write-only stream which hashes data as it is written to a buffer
+    '''
+
+    def __init__(self, buf, hashers):
+        self._buf = buf
+        self._hashers = hashers
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        data = memoryview(b)
+
+        for hasher in self._hashers:
+            hasher.update(data)
+
+        self._buf.write(data)
+        self.size += len(data)
+
+        return len(data)
+
+
 # HELPER CONTEXT MANAGERS
 
 
@@ -55,7 +121,8 @@ def _choose_read_fs(authority, cache, read_path, version_check, hasher):
     '''
 
     if cache and cache.fs.isfile(read_path):
-        if version_check(hasher(cache.fs.open(read_path, 'rb'))):
+        if version_check(_hash_file(cache.fs, read_path, hasher)):
+            _record_cache_access(cache, read_path, hit=True)
             yield cache.fs
 
         elif authority.fs.isfile(read_path):
@@ -64,6 +131,8 @@ def _choose_read_fs(authority, cache, read_path, version_check, hasher):
                 read_path,
                 cache.fs,
                 read_path)
+            _record_cache_access(cache, read_path, hit=False)
+            _record_cache_write(cache, read_path)
             yield cache.fs
 
         else:
@@ -83,17 +152,8 @@ def _get_write_fs():
     '''
     Context manager returning a writable filesystem
 
-    Use a temporary directory and clean on exit.
-
-    .. todo::
-
-        Evaluate options for using a cached memoryFS or streaming object
-        instead of an OSFS(tmp). This could offer significant performance
-        improvements. Writing to the cache is less of a problem since this
-        would be done in any case, though performance could be improved by
-        writing to an in-memory filesystem and then writing to both cache and
-        auth.
-
+    Use a temporary directory and clean on exit. Write-only modes bypass the
+    temporary filesystem (see :py:func:`open_stream`).
     '''
 
     tmp = tempfile.mkdtemp()
@@ -142,6 +202,118 @@ def _prepare_write_fs(read_fs, cache, read_path, readwrite_mode=True):
 
 # AVAILABLE I/O CONTEXT MANAGERS
 
+@contextmanager
+def open_stream(
+        authority,
+        cache,
+        update,
+        version_check,
+        hasher,
+        read_path,
+        write_path=None,
+        cache_on_write=False,
+        mode='w',
+        buffering=-1,
+        encoding=None,
+        errors=None,
+        newline=None,
+        line_buffering=False,
+        **kwargs):
+    '''
+    Context manager for writing a new archive version from a stream
+
+    Data is buffered in memory (spilling to a temporary file beyond
+    ``SpoolMaxSize`` bytes) and hashed as it is written. On close, the buffer
+    is uploaded directly to the authority, and to the cache if the archive is
+    cached. Only write-only modes (``'w'``, ``'wt'`` and ``'wb'``) are
+    supported.
+
+    If ``hasher`` has an ``algorithms`` attribute (a list of algorithm names,
+    the first of which is the primary algorithm), checksums are computed
+    while writing. Otherwise ``hasher`` is called on the buffer on close.
+    '''
+
+    if mode not in STREAM_MODES:
+        raise ValueError(
+            'Mode "{}" not supported for streaming writes'.format(mode))
+
+    if write_path is None:
+        write_path = read_path
+
+    algorithms = getattr(hasher, 'algorithms', None)
+
+    if algorithms is not None:
+        hashers = [(name, hashing.new_hasher(name)) for name in algorithms]
+    else:
+        hashers = []
+
+    buf = tempfile.SpooledTemporaryFile(max_size=SpoolMaxSize)
+
+    try:
+        raw = _HashingWriter(buf, [h for _, h in hashers])
+
+        if buffering == 0 or buffering == -1:
+            buffering = io.DEFAULT_BUFFER_SIZE
+
+        f = io.BufferedWriter(raw, buffer_size=buffering)
+
+        if 'b' not in mode:
+            f = io.TextIOWrapper(
+                f,
+                encoding=encoding or 'utf-8',
+                errors=errors,
+                newline=newline,
+                line_buffering=line_buffering)
+
+        with f:
+            yield f
+
+        if raw.size == 0:
+            return
+
+        if algorithms is not None:
+            checksums = dict(
+                (name, h.hexdigest()) for name, h in hashers)
+
+            checksum = {
+                'algorithm': algorithms[0],
+                'checksum': checksums[algorithms[0]]}
+
+            if len(algorithms) > 1:
+                checksum['checksums'] = checksums
+
+        else:
+            buf.seek(0)
+            checksum = hasher(buf)
+
+        if version_check(checksum):
+            return
+
+        if (
+            cache_on_write or
+            (
+                cache
+                and (
+                    fs.path.abspath(read_path) ==
+                    fs.path.abspath(write_path))
+                and cache.fs.isfile(read_path)
+            )
+        ):
+            buf.seek(0)
+            _makedirs(cache.fs, fs.path.dirname(write_path))
+            cache.fs.setcontents(write_path, buf)
+            _record_cache_write(cache, write_path)
+
+        buf.seek(0)
+        _makedirs(authority.fs, fs.path.dirname(write_path))
+        authority.fs.setcontents(write_path, buf)
+
+        update(**checksum)
+
+    finally:
+        buf.close()
+
+
 @contextmanager
 def open_file(
         authority,
@@ -179,6 +351,25 @@ def open_file(
     if write_path is None:
         write_path = read_path
 
+    # Write-only modes do not need the current contents of the file
+    if mode in STREAM_MODES:
+        with open_stream(
+                authority,
+                cache,
+                update,
+                version_check,
+                hasher,
+                read_path,
+                write_path,
+                cache_on_write,
+                mode,
+                *args,
+                **kwargs) as f:
+
+            yield f
+
+        return
+
     with _choose_read_fs(
             authority, cache, read_path, version_check, hasher) as read_fs:
 
@@ -224,6 +415,7 @@ def open_file(
                         _makedirs(cache.fs, fs.path.dirname(write_path))
                         fs.utils.copyfile(
                             write_fs, read_path, cache.fs, write_path)
+                        _record_cache_write(cache, write_path)
 
                         _makedirs(authority.fs, fs.path.dirname(write_path))
                         fs.utils.copyfile(
@@ -311,6 +503,7 @@ def get_local_path(
                         _makedirs(cache.fs, fs.path.dirname(write_path))
                         fs.utils.copyfile(
                             write_fs, read_path, cache.fs, write_path)
+                        _record_cache_write(cache, write_path)
 
                         _makedirs(authority.fs, fs.path.dirname(write_path))
                         fs.utils.copyfile(
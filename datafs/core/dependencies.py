@@ -0,0 +1,157 @@
+'''
+Graphs of archive version dependencies
+'''
+
+from __future__ import absolute_import
+
+import collections
+import heapq
+
+
+def _sort_key(node):
+    archive_name, version = node
+    return (archive_name, '' if version is None else version)
+
+
+def _format_node(node):
+    archive_name, version = node
+
+    if version is None:
+        return archive_name
+
+    return '{}=={}'.format(archive_name, version)
+
+
+class DependencyGraph(object):
+    '''
+    Directed acyclic graph of archive versions and their dependencies
+
+    Nodes are ``(archive_name, version)`` tuples. ``version`` is a version
+    string, or None for unversioned archives and archives without versions.
+    Graphs are built by
+    :py:meth:`~datafs.core.data_api.DataAPI.resolve_dependencies`.
+
+    Parameters
+    ----------
+    root : tuple
+        Node of the archive version the graph was resolved from
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        >>> graph = DependencyGraph(('model', '1.0'))
+        >>> graph._add_node(('model', '1.0'), None)
+        >>> graph._add_node(('inputs', '0.2'), None)
+        >>> graph._add_node(('climate', None), None)
+        >>> graph._add_edge(('model', '1.0'), ('inputs', '0.2'))
+        >>> graph._add_edge(('model', '1.0'), ('climate', None))
+        >>> graph._add_edge(('inputs', '0.2'), ('climate', None))
+        >>> for node in graph.topological_order():
+        ...     print(node)
+        ...
+        ('climate', None)
+        ('inputs', '0.2')
+        ('model', '1.0')
+
+    '''
+
+    def __init__(self, root):
+        self.root = root
+
+        self._archives = {}
+        self._dependencies = collections.OrderedDict()
+
+    def _add_node(self, node, archive):
+        self._archives[node] = archive
+        self._dependencies.setdefault(node, [])
+
+    def _add_edge(self, node, dependency):
+        dependencies = self._dependencies[node]
+
+        if dependency not in dependencies:
+            dependencies.append(dependency)
+
+    def __contains__(self, node):
+        return node in self._dependencies
+
+    def __len__(self):
+        return len(self._dependencies)
+
+    def __iter__(self):
+        return iter(self.topological_order())
+
+    @property
+    def nodes(self):
+        '''
+        List of nodes in the order they were resolved (breadth first)
+        '''
+
+        return list(self._dependencies)
+
+    def get_archive(self, node):
+        '''
+        Returns the :py:class:`~datafs.core.data_archive.DataArchive` of a
+        node
+        '''
+
+        return self._archives[node]
+
+    def get_dependencies(self, node):
+        '''
+        Returns the nodes a node depends on directly
+        '''
+
+        return list(self._dependencies[node])
+
+    def topological_order(self):
+        '''
+        Returns all nodes, with every node following its dependencies
+
+        Nodes whose dependencies are satisfied at the same point are ordered
+        by archive name and version, so the order is deterministic.
+
+        Raises
+        ------
+        ValueError
+            If the dependencies form a cycle
+
+        '''
+
+        waiting = {}
+        dependents = collections.defaultdict(list)
+
+        for node, dependencies in self._dependencies.items():
+            waiting[node] = len(dependencies)
+
+            for dependency in dependencies:
+                dependents[dependency].append(node)
+
+        ready = [
+            (_sort_key(node), node)
+            for node, count in waiting.items() if count == 0]
+
+        heapq.heapify(ready)
+
+        order = []
+
+        while len(ready) > 0:
+            _, node = heapq.heappop(ready)
+            order.append(node)
+
+            for dependent in dependents[node]:
+                waiting[dependent] -= 1
+
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, (_sort_key(dependent), dependent))
+
+        if len(order) < len(waiting):
+            cycle = sorted(
+                (node for node, count in waiting.items() if count > 0),
+                key=_sort_key)
+
+            raise ValueError('Dependency cycle between {}'.format(
+                ', '.join(_format_node(node) for node in cycle)))
+
+        return order
@@ -0,0 +1,155 @@
+'''
+Persistent index of local file checksums
+
+Checksums are stored in a SQLite database keyed by file path and algorithm,
+along with a fingerprint of the file's stat (size, mtime and inode). A file
+whose fingerprint is unchanged since it was hashed does not need to be
+rehashed.
+'''
+
+from __future__ import absolute_import
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class HashIndex(object):
+    '''
+    SQLite-backed memo of file checksums
+
+    Parameters
+    ----------
+    path : str
+        Path to the index database file. Use ``':memory:'`` for a
+        non-persistent index.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        >>> import tempfile
+        >>> index = HashIndex(':memory:')
+        >>> index.RacyInterval = 0
+        >>> with tempfile.NamedTemporaryFile() as f:
+        ...     index.set(f.name, 'md5', 'd41d8cd98f00b204e9800998ecf8427e')
+        ...     print(index.get(f.name, 'md5'))
+        True
+        d41d8cd98f00b204e9800998ecf8427e
+
+    '''
+
+    # Files modified within this many seconds of being hashed are not indexed.
+    # Their mtime cannot distinguish the hashed contents from a write made in
+    # the same clock tick.
+    RacyInterval = 2
+
+    def __init__(self, path):
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'CREATE TABLE IF NOT EXISTS hashes ('
+                    'path TEXT NOT NULL, '
+                    'algorithm TEXT NOT NULL, '
+                    'size INTEGER NOT NULL, '
+                    'mtime REAL NOT NULL, '
+                    'inode INTEGER NOT NULL, '
+                    'checksum TEXT NOT NULL, '
+                    'PRIMARY KEY (path, algorithm))')
+
+    @staticmethod
+    def _fingerprint(stat):
+        return (stat.st_size, stat.st_mtime, stat.st_ino)
+
+    def get(self, path, algorithm, stat=None):
+        '''
+        Returns the indexed checksum of a file, or None
+
+        None is returned if the file has not been indexed with ``algorithm``
+        or has changed since it was indexed.
+
+        Parameters
+        ----------
+        path : str
+            System path of the file
+
+        algorithm : str
+            Name of the hashing algorithm
+
+        stat : object
+            Result of :py:func:`os.stat` on ``path`` (optional)
+        '''
+
+        path = os.path.abspath(path)
+
+        if stat is None:
+            stat = os.stat(path)
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT size, mtime, inode, checksum FROM hashes '
+                'WHERE path = ? AND algorithm = ?',
+                (path, algorithm)).fetchone()
+
+        if row is None:
+            return None
+
+        if tuple(row[:3]) != self._fingerprint(stat):
+            return None
+
+        return row[3]
+
+    def set(self, path, algorithm, checksum, stat=None):
+        '''
+        Index the checksum of a file
+
+        ``stat`` should be taken before the file is hashed, so that changes
+        made while hashing invalidate the entry. Files modified within
+        ``RacyInterval`` seconds are not indexed.
+
+        Returns
+        -------
+        indexed : bool
+            True if the checksum was indexed
+        '''
+
+        path = os.path.abspath(path)
+
+        if stat is None:
+            stat = os.stat(path)
+
+        if time.time() - stat.st_mtime < self.RacyInterval:
+            return False
+
+        size, mtime, inode = self._fingerprint(stat)
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO hashes '
+                    '(path, algorithm, size, mtime, inode, checksum) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (path, algorithm, size, mtime, inode, checksum))
+
+        return True
+
+    def discard(self, path):
+        '''
+        Remove all entries for a file from the index
+        '''
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'DELETE FROM hashes WHERE path = ?',
+                    (os.path.abspath(path),))
+
+    def close(self):
+        self._conn.close()
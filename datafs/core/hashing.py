@@ -0,0 +1,179 @@
+'''
+Registry of file hashing algorithms
+
+Archive versions record the algorithm used to compute their checksum, so
+files may be written with a fast algorithm while older versions remain
+readable with the algorithm they were written with.
+
+The ``md5``, ``sha1`` and ``sha256`` algorithms are always available.
+``blake2b`` is available on python 3.6+ (or with :py:mod:`pyblake2`), and
+``xxh64``, ``xxh3_128`` and ``blake3`` are available when :py:mod:`xxhash` and
+:py:mod:`blake3` are installed.
+'''
+
+from __future__ import absolute_import
+
+from datafs._compat import open_filelike
+
+import hashlib
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import pyblake2
+except ImportError:
+    pyblake2 = None
+
+
+# Read buffers start small, so small files are cheap to hash, and grow with
+# each full read up to MaxBufferSize.
+MinBufferSize = 64 * 1024
+MaxBufferSize = 4 * 1024 * 1024
+
+_HASHERS = {}
+
+
+def register_algorithm(name, constructor):
+    '''
+    Register a hashing algorithm
+
+    Parameters
+    ----------
+    name : str
+        Name of the algorithm, as stored in archive version records
+
+    constructor : callable
+        Function returning a new hash object with ``update`` and
+        ``hexdigest`` methods (e.g. :py:func:`hashlib.sha256`)
+    '''
+
+    _HASHERS[name] = constructor
+
+
+def get_algorithms():
+    '''
+    Returns a sorted list of available algorithm names
+    '''
+
+    return sorted(_HASHERS.keys())
+
+
+def new_hasher(name):
+    '''
+    Returns a new hash object for algorithm ``name``
+
+    Raises
+    ------
+    ValueError
+        If the algorithm is not available
+    '''
+
+    if name not in _HASHERS:
+        raise ValueError(
+            'Hash algorithm "{}" not available. Choose from {}'.format(
+                name, get_algorithms()))
+
+    return _HASHERS[name]()
+
+
+def hash_file(f, algorithms):
+    '''
+    Compute the checksums of a file in a single pass
+
+    Parameters
+    ----------
+    f : file-like
+        File-like object or file path from which to compute checksum values
+
+    algorithms : list
+        Names of the algorithms to compute
+
+    Returns
+    -------
+    checksums : dict
+        Hex digests keyed by algorithm name
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        >>> import io
+        >>> hash_file(io.BytesIO(b'hello'), ['md5'])
+        {'md5': '5d41402abc4b2a76b9719d911017c592'}
+
+    '''
+
+    hashers = [(name, new_hasher(name)) for name in algorithms]
+
+    with open_filelike(f, 'rb') as f_obj:
+        for chunk in _iter_buffers(f_obj):
+            for _, hasher in hashers:
+                hasher.update(chunk)
+
+    return {name: hasher.hexdigest() for name, hasher in hashers}
+
+
+def _iter_buffers(f):
+    '''
+    Iterate over the contents of a binary file in growing buffers
+
+    Files supporting ``readinto`` are read into a reused buffer and yielded as
+    memoryviews, avoiding a copy per read.
+    '''
+
+    size = MinBufferSize
+
+    if not hasattr(f, 'readinto'):
+        while True:
+            data = f.read(size)
+
+            if not data:
+                return
+
+            yield data
+
+            if len(data) == size:
+                size = min(size * 2, MaxBufferSize)
+
+    buf = bytearray(size)
+    view = memoryview(buf)
+
+    while True:
+        nbytes = f.readinto(buf)
+
+        if not nbytes:
+            return
+
+        yield view[:nbytes]
+
+        if nbytes == len(buf) and len(buf) < MaxBufferSize:
+            buf = bytearray(min(len(buf) * 2, MaxBufferSize))
+            view = memoryview(buf)
+
+
+for _name in ['md5', 'sha1', 'sha256']:
+    register_algorithm(_name, getattr(hashlib, _name))
+
+if hasattr(hashlib, 'blake2b'):
+    register_algorithm('blake2b', hashlib.blake2b)
+
+elif pyblake2 is not None:
+    register_algorithm('blake2b', pyblake2.blake2b)
+
+if xxhash is not None:
+    register_algorithm('xxh64', xxhash.xxh64)
+
+    if hasattr(xxhash, 'xxh3_128'):
+        register_algorithm('xxh3_128', xxhash.xxh3_128)
+
+if blake3 is not None:
+    register_algorithm('blake3', blake3.blake3)
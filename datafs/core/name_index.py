@@ -0,0 +1,217 @@
+'''
+In-memory index of archive names
+
+The index holds a sorted list of every archive name in a manager's table, so
+prefix, pattern and "directory" queries are answered with a binary search
+rather than a manager request.
+'''
+
+from __future__ import absolute_import
+
+from datafs.core.patterns import glob_literals, match_archive_name
+
+import bisect
+import threading
+import time
+
+
+class NameIndex(object):
+    '''
+    Sorted index of the archive names in a manager table
+
+    The index is loaded with a single manager search the first time it is
+    queried, and is reloaded once it is older than ``ttl`` seconds. Archives
+    created and deleted through the index's
+    :py:class:`~datafs.core.data_api.DataAPI` are added and removed as they
+    change. Changes made by other clients are seen after the next reload.
+
+    Parameters
+    ----------
+    manager : object
+        :py:class:`~datafs.managers.manager.BaseDataManager` to load archive
+        names from
+
+    ttl : float
+        Seconds before the index is reloaded from the manager. If None, the
+        index is only reloaded by :py:meth:`refresh`.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        >>> from datafs.managers.manager_sqlite import SQLiteManager
+        >>> manager = SQLiteManager(':memory:', 'archives')
+        >>> manager.create_archive_table('archives')
+        >>> for name in ['data/a.nc', 'data/b.csv', 'data/sub/c.nc']:
+        ...     _ = manager.create_archive(name, 'local', name, True)
+        ...
+        >>> index = NameIndex(manager)
+        >>> for name in index.filter('*.nc'):
+        ...     print(name)
+        ...
+        data/a.nc
+        data/sub/c.nc
+        >>> for component in index.listdir('data'):
+        ...     print(component)
+        ...
+        a.nc
+        b.csv
+        sub
+
+    '''
+
+    def __init__(self, manager, ttl=None):
+        self.manager = manager
+        self.ttl = ttl
+
+        self._lock = threading.RLock()
+        self._names = None
+        self._loaded = None
+
+    @property
+    def expired(self):
+        '''
+        True if the index has not been loaded or is older than its ``ttl``
+        '''
+
+        if self._names is None:
+            return True
+
+        return (
+            self.ttl is not None and
+            (time.time() - self._loaded) >= self.ttl)
+
+    def refresh(self):
+        '''
+        Reload the archive names from the manager
+        '''
+
+        names = sorted(self.manager.search(tuple([])))
+
+        with self._lock:
+            self._names = names
+            self._loaded = time.time()
+
+    def _get_names(self):
+        if self.expired:
+            self.refresh()
+
+        return self._names
+
+    def add(self, archive_name):
+        '''
+        Add an archive name to the index
+        '''
+
+        with self._lock:
+            if self._names is None:
+                return
+
+            i = bisect.bisect_left(self._names, archive_name)
+
+            if i == len(self._names) or self._names[i] != archive_name:
+                self._names.insert(i, archive_name)
+
+    def discard(self, archive_name):
+        '''
+        Remove an archive name from the index if it is present
+        '''
+
+        with self._lock:
+            if self._names is None:
+                return
+
+            i = bisect.bisect_left(self._names, archive_name)
+
+            if i < len(self._names) and self._names[i] == archive_name:
+                del self._names[i]
+
+    def __contains__(self, archive_name):
+        names = self._get_names()
+
+        i = bisect.bisect_left(names, archive_name)
+
+        return i < len(names) and names[i] == archive_name
+
+    def __len__(self):
+        return len(self._get_names())
+
+    def _iter_prefix(self, names, prefix):
+        for i in range(bisect.bisect_left(names, prefix), len(names)):
+            if not names[i].startswith(prefix):
+                break
+
+            yield names[i]
+
+    def search(self, begins_with=None):
+        '''
+        Returns the sorted archive names starting with ``begins_with``
+        '''
+
+        with self._lock:
+            names = self._get_names()
+
+            if not begins_with:
+                return list(names)
+
+            return list(self._iter_prefix(names, begins_with))
+
+    def filter(self, pattern=None, engine='path', begins_with=None):
+        '''
+        Returns the sorted archive names matching a pattern
+
+        See :py:meth:`~datafs.managers.manager.BaseDataManager.filter`.
+        '''
+
+        if engine not in ('str', 'path', 'regex'):
+            raise ValueError(
+                'search engine "{}" not recognized. '.format(engine) +
+                'choose "str", "path", or "regex"')
+
+        prefix = begins_with or ''
+
+        if pattern and engine == 'path':
+            # Only names starting with the pattern's literal prefix are
+            # matched against the pattern
+            literal, _ = glob_literals(pattern)
+
+            if literal.startswith(prefix):
+                prefix = literal
+
+            elif not prefix.startswith(literal):
+                return []
+
+        names = self.search(prefix)
+
+        if not pattern:
+            return names
+
+        return [
+            archive_name for archive_name in names
+            if match_archive_name(archive_name, pattern, engine)]
+
+    def listdir(self, location):
+        '''
+        Returns the archive path components at a "directory" location
+
+        Parameters
+        ----------
+        location : str
+            Directory within the archive namespace. Use ``''`` for the root.
+
+        Returns
+        -------
+        list
+            Sorted names of the archives and directories at ``location``
+
+        '''
+
+        location = location.strip('/')
+
+        if location:
+            location += '/'
+
+        return sorted(set(
+            archive_name[len(location):].split('/', 1)[0]
+            for archive_name in self.search(location)))
@@ -0,0 +1,124 @@
+'''
+Archive name pattern matching
+
+Helpers for translating the :py:mod:`fnmatch` patterns accepted by
+:py:meth:`~datafs.core.data_api.DataAPI.filter` into database queries.
+'''
+
+from __future__ import absolute_import
+
+import fnmatch
+import re
+
+
+def split_glob(pattern):
+    '''
+    Split a :py:mod:`fnmatch` pattern into literal and wildcard tokens
+
+    Returns a list of ``(literal, text)`` tuples. Literal tokens hold the
+    characters they match and wildcard tokens hold an equivalent regular
+    expression. Character classes are parsed as :py:func:`fnmatch.translate`
+    parses them.
+    '''
+
+    tokens = []
+    i, n = 0, len(pattern)
+
+    while i < n:
+        c = pattern[i]
+        i += 1
+
+        if c == '*':
+            tokens.append((False, '.*'))
+
+        elif c == '?':
+            tokens.append((False, '.'))
+
+        elif c == '[':
+            j = i
+
+            if j < n and pattern[j] == '!':
+                j += 1
+
+            if j < n and pattern[j] == ']':
+                j += 1
+
+            while j < n and pattern[j] != ']':
+                j += 1
+
+            if j >= n:
+                tokens.append((True, '['))
+
+            else:
+                chars = pattern[i:j].replace('\\', '\\\\')
+                i = j + 1
+
+                if chars[0] == '!':
+                    chars = '^' + chars[1:]
+
+                elif chars[0] == '^':
+                    chars = '\\' + chars
+
+                tokens.append((False, '[{}]'.format(chars)))
+
+        else:
+            tokens.append((True, c))
+
+    return tokens
+
+
+def glob_to_regex(pattern):
+    '''
+    Translate a :py:mod:`fnmatch` pattern into an anchored regular expression
+
+    Unlike :py:func:`fnmatch.translate`, the expression starts with ``^``
+    followed by the pattern's literal prefix, so databases can resolve it with
+    an index.
+    '''
+
+    return '^' + ''.join(
+        re.escape(text) if literal else text
+        for literal, text in split_glob(pattern)) + '$'
+
+
+def glob_literals(pattern):
+    '''
+    Returns the literal prefix of a :py:mod:`fnmatch` pattern and the literal
+    substrings which follow its first wildcard
+
+    Every archive name matched by the pattern starts with the prefix and
+    contains each substring.
+    '''
+
+    runs = ['']
+    prefix = None
+
+    for literal, text in split_glob(pattern):
+        if literal:
+            runs[-1] += text
+
+        else:
+            if prefix is None:
+                prefix = runs.pop()
+
+            runs.append('')
+
+    if prefix is None:
+        prefix = runs.pop()
+
+    return prefix, [run for run in runs if run]
+
+
+def match_archive_name(archive_name, pattern, engine):
+    '''
+    Match an archive name with a
+    :py:meth:`~datafs.managers.manager.BaseDataManager.filter` engine
+    '''
+
+    if engine == 'str':
+        return pattern in archive_name
+
+    elif engine == 'path':
+        return fnmatch.fnmatch(archive_name, pattern)
+
+    return re.search(pattern, archive_name) is not None
@@ -177,6 +177,7 @@ def configure(ctx, helper, edit):
 @click.option('--versioned/--not-versioned', default=True)
 @click.option('-t', '--tag', multiple=True)
 @click.option('--helper', is_flag=True)
+@click.option('--chunked', is_flag=True)
 @click.pass_context
 def create(
         ctx,
@@ -184,7 +185,8 @@ def create(
         authority_name,
         versioned=True,
         tag=None,
-        helper=False):
+        helper=False,
+        chunked=False):
     '''
     Create an archive
     '''
@@ -201,7 +203,8 @@ def create(
         versioned=versioned,
         metadata=kwargs,
         tags=tags,
-        helper=helper)
+        helper=helper,
+        chunked=chunked)
 
     verstring = 'versioned archive' if versioned else 'archive'
     click.echo('created {} {}'.format(verstring, var))
@@ -338,20 +341,61 @@ def set_dependencies(ctx, archive_name, dependency=None):
     short_help='List the dependencies of an archive')
 @click.argument('archive_name')
 @click.option('--version', default=None)
+@click.option(
+    '--recursive',
+    is_flag=True,
+    help='List all dependencies, in the order they should be installed')
 @click.pass_context
-def get_dependencies(ctx, archive_name, version):
+def get_dependencies(ctx, archive_name, version, recursive):
     '''
     List the dependencies of an archive
+
+    With --recursive, the dependencies of dependencies are resolved as well,
+    and every archive is listed after its own dependencies.
     '''
 
     _generate_api(ctx)
 
-    var = ctx.obj.api.get_archive(archive_name)
+    deps = []
+
+    if recursive:
+        graph = ctx.obj.api.resolve_dependencies(
+            archive_name, version=version)
+
+        dependencies = [
+            node for node in graph.topological_order() if node != graph.root]
+
+    else:
+        var = ctx.obj.api.get_archive(archive_name)
+        dependencies = var.get_dependencies(version=version).items()
+
+    for arch, dep in dependencies:
+        if dep is None:
+            deps.append(arch)
+        else:
+            deps.append('{}=={}'.format(arch, dep))
+
+    click.echo('\n'.join(deps))
+
+
+@cli.command(short_help='List the archives which depend on an archive')
+@click.argument('archive_name')
+@click.option(
+    '--version',
+    default=None,
+    help='Only list archives which depend on this version')
+@click.pass_context
+def dependents(ctx, archive_name, version):
+    '''
+    List the archive versions which depend on an archive
+    '''
+
+    _generate_api(ctx)
 
     deps = []
 
-    dependencies = var.get_dependencies(version=version)
-    for arch, dep in dependencies.items():
+    for arch, dep in ctx.obj.api.get_dependents(
+            archive_name, version=version):
         if dep is None:
             deps.append(arch)
         else:
@@ -432,6 +476,65 @@ def download(ctx, archive_name, filepath, version):
     click.echo('downloaded{} to {}'.format(archstr, filepath))
 
 
+@click.command(short_help='Download many archives from a requirements file')
+@click.argument('requirements_file', type=click.File('r'))
+@click.argument('destination')
+@click.option(
+    '--workers',
+    type=int,
+    default=None,
+    help='Number of concurrent downloads')
+@click.pass_context
+def download_many(ctx, requirements_file, destination, workers=None):
+    '''
+    Download many archives from a requirements file
+
+    Each line of REQUIREMENTS_FILE gives an archive name and, optionally, a
+    version (e.g. ``my_archive==0.1.0``). Archives are downloaded concurrently
+    to their archive paths within DESTINATION.
+    '''
+
+    _generate_api(ctx)
+
+    versions = {}
+
+    for reqline in requirements_file:
+        if len(reqline.strip()) == 0:
+            continue
+
+        archive_name, version = _parse_requirement(reqline)
+        versions[archive_name] = version
+
+    archives = {}
+
+    for archive_name in versions.keys():
+        archive_path = ctx.obj.api._normalize_archive_name(archive_name)[1]
+        filepath = os.path.join(destination, *archive_path.split('/'))
+
+        if not os.path.isdir(os.path.dirname(filepath)):
+            os.makedirs(os.path.dirname(filepath))
+
+        archives[archive_name] = filepath
+
+    paths, failures = ctx.obj.api.batch_download(
+        archives,
+        versions=versions,
+        max_workers=workers)
+
+    for archive_name, filepath in sorted(paths.items()):
+        click.echo('downloaded {} to {}'.format(archive_name, filepath))
+
+    for archive_name, err in sorted(failures.items()):
+        click.echo(
+            'failed to download {}: {}'.format(archive_name, err), err=True)
+
+    if len(failures) > 0:
+        ctx.exit(1)
+
+
+cli.add_command(download_many, name='download-many')
+
+
 @cli.command(short_help='Echo the contents of an archive')
 @click.argument('archive_name')
 @click.option('--version', default=None)
@@ -635,5 +738,105 @@ def delete(ctx, archive_name):
     click.echo('deleted archive {}'.format(var))
 
 
+@cli.group(short_help='Manage the local cache')
+@click.pass_context
+def cache(ctx):
+    '''
+    Manage the local cache
+    '''
+
+    _generate_api(ctx)
+
+    if ctx.obj.api.cache is None:
+        raise click.ClickException('No cache is attached')
+
+
+@cache.command(short_help='Print cache statistics')
+@click.pass_context
+def stats(ctx):
+    '''
+    Print cache statistics
+    '''
+
+    stats = ctx.obj.api.cache.get_stats()
+
+    for name in sorted(stats.keys()):
+        click.echo('{}: {}'.format(name, stats[name]))
+
+
+@cache.command(short_help='Evict files until the cache fits a size limit')
+@click.option(
+    '--max-bytes',
+    type=int,
+    default=None,
+    help='Size limit in bytes (default: the configured limit)')
+@click.pass_context
+def prune(ctx, max_bytes=None):
+    '''
+    Evict unpinned files until the cache fits a size limit
+    '''
+
+    ctx.obj.api.cache.reconcile()
+    evicted = ctx.obj.api.cache.evict(max_bytes=max_bytes)
+
+    for path in evicted:
+        click.echo('evicted {}'.format(path))
+
+
+@cache.command(short_help='Exempt an archive version from eviction')
+@click.argument('archive_name')
+@click.option('--version', default=None)
+@click.pass_context
+def pin(ctx, archive_name, version):
+    '''
+    Cache an archive version and exempt it from eviction
+    '''
+
+    var = ctx.obj.api.get_archive(archive_name)
+
+    if version is None:
+        version = var.get_default_version()
+
+    var.cache(version=version)
+
+    # Fetch the file contents into the cache
+    with var.open('rb', version=version):
+        pass
+
+    ctx.obj.api.cache.pin(var.get_version_path(version))
+
+    click.echo('pinned {}'.format(var.get_version_path(version)))
+
+
+@cache.command(short_help='Allow an archive version to be evicted')
+@click.argument('archive_name')
+@click.option('--version', default=None)
+@click.pass_context
+def unpin(ctx, archive_name, version):
+    '''
+    Allow a cached archive version to be evicted
+    '''
+
+    var = ctx.obj.api.get_archive(archive_name)
+
+    if version is None:
+        version = var.get_default_version()
+
+    ctx.obj.api.cache.unpin(var.get_version_path(version))
+
+    click.echo('unpinned {}'.format(var.get_version_path(version)))
+
+
+@cache.command(short_help='Evict all unpinned files from the cache')
+@click.pass_context
+def clear(ctx):
+    '''
+    Evict all unpinned files from the cache
+    '''
+
+    evicted = ctx.obj.api.cache.clear()
+    click.echo('evicted {} files'.format(len(evicted)))
+
+
 if __name__ == '__main__':
     cli()
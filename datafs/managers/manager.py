@@ -1,8 +1,62 @@
 
 from __future__ import absolute_import
 
+import itertools
 import time
 from datafs.config.helpers import check_requirements
+from datafs.core.patterns import match_archive_name
+from datafs.core.versions import BumpableVersion
+
+
+def _normalize_dependency_version(version):
+    '''
+    Returns a version string which is equal for equal versions
+    '''
+
+    if version is None:
+        return None
+
+    try:
+        return str(BumpableVersion(str(version)))
+
+    except ValueError:
+        return str(version)
+
+
+def _get_archive_version(version_metadata):
+    '''
+    Returns the version of a version record, or None for unversioned archives
+    '''
+
+    version = version_metadata.get('version')
+
+    # Unversioned records store the string 'None' (see
+    # BaseDataManager._format_version_metadata)
+    if version is None or version == 'None':
+        return None
+
+    return version
+
+
+def _get_dependency_entries(archive_name, version_metadata):
+    '''
+    Returns the reverse dependency index entries of a version record
+
+    Each entry is a dictionary with the ``dependency`` archive name and its
+    ``version`` (None if not pinned), and the dependent ``archive`` and
+    ``archive_version``.
+    '''
+
+    archive_version = _get_archive_version(version_metadata)
+    dependencies = version_metadata.get('dependencies') or {}
+
+    return [
+        {
+            'dependency': dependency,
+            'version': _normalize_dependency_version(version),
+            'archive': archive_name,
+            'archive_version': archive_version}
+        for dependency, version in dependencies.items()]
 
 
 class BaseDataManager(object):
@@ -14,6 +68,9 @@ class BaseDataManager(object):
 
     TimestampFormat = '%Y%m%d-%H%M%S'
 
+    # Number of archives retrieved per request when iterating over listings
+    BatchPageSize = 100
+
     def __init__(self, table_name):
 
         self._table_name = table_name
@@ -23,6 +80,7 @@ class BaseDataManager(object):
         self._required_archive_metadata = None
         self._valid_top_level_domains = None
         self._required_archive_patterns = None
+        self._separate_versions = None
 
     @property
     def table_names(self):
@@ -49,6 +107,19 @@ class BaseDataManager(object):
 
         return self._required_archive_patterns
 
+    @property
+    def separate_versions(self):
+        '''
+        True if version records are stored in a separate versions table
+
+        See :py:meth:`create_archive_table`.
+        '''
+
+        if self._separate_versions is None:
+            self._refresh_spec()
+
+        return self._separate_versions
+
     def _refresh_spec(self):
         spec_documents = self._get_spec_documents(self._table_name)
 
@@ -57,14 +128,29 @@ class BaseDataManager(object):
         self._required_user_config = spec['required_user_config']
         self._required_archive_metadata = spec['required_archive_metadata']
         self._required_archive_patterns = spec['required_archive_patterns']
+        self._separate_versions = bool(spec.get('separate_versions', False))
 
-    def create_archive_table(self, table_name, raise_on_err=True):
+    def create_archive_table(
+            self,
+            table_name,
+            raise_on_err=True,
+            separate_versions=False):
         '''
 
         Parameters
         -----------
         table_name: str
 
+        raise_on_err: bool
+            Raise a KeyError if the table already exists (default True)
+
+        separate_versions: bool
+            Store version records in a separate ``table_name.versions``
+            table, one record per version, rather than in a list in each
+            archive's document (default False). Archive documents then keep
+            only a summary of the latest version, so they do not grow with
+            each update, and version histories can be retrieved in pages.
+
         Creates a table to store archives for your project
         Also creates and populates a table with basic spec for user and
         metadata config
@@ -81,18 +167,24 @@ class BaseDataManager(object):
             {'_id': 'required_archive_metadata', 'config': {}},
             {'_id': 'required_archive_patterns', 'config': []}]
 
-        if raise_on_err:
+        if separate_versions:
+            spec_documents.append(
+                {'_id': 'separate_versions', 'config': True})
+
+        try:
             self._create_archive_table(table_name)
             self._create_archive_table(table_name+'.spec')
+
+            if separate_versions:
+                self._create_versions_table(table_name)
+
             self._create_spec_config(table_name, spec_documents)
 
-        else:
-            try:
-                self._create_archive_table(table_name)
-                self._create_archive_table(table_name+'.spec')
-                self._create_spec_config(table_name, spec_documents)
-            except KeyError:
-                pass
+        except KeyError:
+            if raise_on_err:
+                raise
+
+        self._separate_versions = None
 
     def update_spec_config(self, document_name, spec):
         '''
@@ -197,6 +289,64 @@ class BaseDataManager(object):
 
             need to implement hash checking to prevent duplicate writes
         '''
+
+        self._format_version_metadata(version_metadata)
+
+        if self.separate_versions:
+            self._add_version_record(archive_name, version_metadata)
+
+        else:
+            self._update(archive_name, version_metadata)
+
+        if self._dependents_index_exists():
+            self._index_dependencies({archive_name: version_metadata})
+
+    def batch_update(self, version_records):
+        '''
+        Register new versions for many archives with bulk requests
+
+        Parameters
+        ----------
+        version_records : dict
+            version metadata dictionaries keyed by archive name
+
+        Returns
+        -------
+        failures : dict
+            exceptions raised while registering versions, keyed by archive
+            name. Archives which do not exist fail with a ``KeyError``.
+        '''
+
+        for version_metadata in version_records.values():
+            self._format_version_metadata(version_metadata)
+
+        if len(version_records) == 0:
+            return {}
+
+        if not self.separate_versions:
+            failures = self._batch_update(version_records)
+
+        else:
+            # Version records are numbered as they are added
+            failures = {}
+
+            for archive_name, version_metadata in version_records.items():
+                try:
+                    self._add_version_record(archive_name, version_metadata)
+
+                except KeyError as e:
+                    failures[archive_name] = e
+
+        if self._dependents_index_exists():
+            self._index_dependencies({
+                archive_name: version_metadata
+                for archive_name, version_metadata in version_records.items()
+                if archive_name not in failures})
+
+        return failures
+
+    def _format_version_metadata(self, version_metadata):
+
         version_metadata['updated'] = self.create_timestamp()
         version_metadata['version'] = str(
             version_metadata.get('version', None))
@@ -204,8 +354,6 @@ class BaseDataManager(object):
         if version_metadata.get('message') is not None:
             version_metadata['message'] = str(version_metadata['message'])
 
-        self._update(archive_name, version_metadata)
-
     def update_metadata(self, archive_name, archive_metadata):
         '''
         Update metadata for archive ``archive_name``
@@ -230,7 +378,8 @@ class BaseDataManager(object):
             metadata=None,
             user_config=None,
             tags=None,
-            helper=False):
+            helper=False,
+            chunked=False):
         '''
         Create a new data archive
 
@@ -250,7 +399,8 @@ class BaseDataManager(object):
             metadata=metadata,
             user_config=user_config,
             tags=tags,
-            helper=helper)
+            helper=helper,
+            chunked=chunked)
 
         if raise_on_err:
             self._create_archive(
@@ -263,6 +413,58 @@ class BaseDataManager(object):
 
         return self.get_archive(archive_name)
 
+    def batch_create_archives(self, archives):
+        '''
+        Create many archives with bulk requests
+
+        Parameters
+        ----------
+        archives : list
+            list of dictionaries of :py:meth:`create_archive` arguments. Each
+            must include ``archive_name``, ``authority_name``,
+            ``archive_path`` and ``versioned``.
+
+        Returns
+        -------
+        created : dict
+            archive specifications (as returned by :py:meth:`get_archive`)
+            of the new archives, keyed by archive name. Specifications are
+            built from the new documents, without reading them back.
+
+        failures : dict
+            exceptions raised while creating archives, keyed by archive name.
+            Archives which already exist fail with a ``KeyError``.
+        '''
+
+        archive_names = [archive['archive_name'] for archive in archives]
+
+        if len(set(archive_names)) != len(archive_names):
+            raise ValueError('Archive names must be unique')
+
+        documents = []
+        failures = {}
+
+        for archive in archives:
+            kwargs = dict(archive)
+            archive_name = kwargs.pop('archive_name')
+
+            try:
+                documents.append(
+                    self._create_archive_metadata(archive_name, **kwargs))
+
+            except AssertionError as e:
+                failures[archive_name] = e
+
+        if len(documents) > 0:
+            failures.update(self._batch_create_archive(documents))
+
+        created = {
+            document['_id']: self._format_archive_listing_as_constructor_spec(
+                dict(document))
+            for document in documents if document['_id'] not in failures}
+
+        return created, failures
+
     def _create_archive_metadata(
             self,
             archive_name,
@@ -273,7 +475,8 @@ class BaseDataManager(object):
             metadata=None,
             user_config=None,
             tags=None,
-            helper=False):
+            helper=False,
+            chunked=False):
 
         if metadata is None:
             metadata = {}
@@ -306,6 +509,9 @@ class BaseDataManager(object):
             'archive_metadata': metadata,
             'tags': tags
         }
+        if chunked:
+            archive_metadata['chunked'] = True
+
         archive_metadata.update(user_config)
 
         archive_metadata['creation_date'] = archive_metadata.get(
@@ -332,6 +538,112 @@ class BaseDataManager(object):
         except KeyError:
             raise KeyError('Archive "{}" not found'.format(archive_name))
 
+    def get_archive_listing(self, archive_name):
+        '''
+        Get the full archive listing for an archive name
+
+        The listing includes the archive's specification, metadata, tags, and
+        full version history. Used by
+        :py:class:`~datafs.core.data_archive.DataArchive` to build a snapshot
+        of the archive's state which can be shared between calls.
+
+        Returns
+        -------
+        archive_listing : dict
+            full archive document, including ``version_history``, ``tags``,
+            and ``archive_metadata``
+
+        Raises
+        ------
+        KeyError
+            A KeyError is raised when the ``archive_name`` is not found
+        '''
+
+        try:
+            listing = self._get_archive_listing(archive_name)
+
+        except KeyError:
+            raise KeyError('Archive "{}" not found'.format(archive_name))
+
+        if self.separate_versions:
+            listing['version_history'] = self._get_version_records(
+                archive_name)
+
+        return listing
+
+    def iter_batch_get_archive_listing(self, archive_names):
+        '''
+        Iterate over the listings of many archives, one page at a time
+
+        Archive names are read from ``archive_names`` as they are needed, and
+        listings are yielded as each page of up to :py:attr:`BatchPageSize`
+        archives is retrieved, so memory use does not grow with the number of
+        archives. Invalid archive names are skipped.
+
+        Parameters
+        ----------
+
+        archive_names : iterable
+
+            Iterable of archive names
+
+        Yields
+        ------
+
+        archive_listing : dict
+
+            Full archive listings
+        '''
+
+        for listings in self._iter_batch_get_archive_listing(archive_names):
+
+            if self.separate_versions:
+                histories = self._batch_get_version_records(
+                    [listing['_id'] for listing in listings])
+
+                for listing in listings:
+                    listing['version_history'] = histories[listing['_id']]
+
+            for listing in listings:
+                yield listing
+
+    def batch_get_archive_listing(self, archive_names):
+        '''
+        Returns a list of full archive listings from an iterable of archive
+        names
+
+        .. note ::
+
+            Invalid archive names will simply not be returned, so the response
+            may not be the same length as the supplied `archive_names`.
+
+        Parameters
+        ----------
+
+        archive_names : list
+
+            List of archive names
+
+        Returns
+        -------
+
+        archive_listings : list
+
+            List of archive listings
+
+        '''
+
+        listings = list(self._batch_get_archive_listing(archive_names))
+
+        if self.separate_versions:
+            histories = self._batch_get_version_records(
+                [listing['_id'] for listing in listings])
+
+            for listing in listings:
+                listing['version_history'] = histories[listing['_id']]
+
+        return listings
+
     def batch_get_archive(self, archive_names):
         '''
         Batched version of :py:meth:`~DynamoDBManager._get_archive_listing`
@@ -413,8 +725,96 @@ class BaseDataManager(object):
 
         self._delete_archive_record(archive_name)
 
-    def get_version_history(self, archive_name):
-        return self._get_version_history(archive_name)
+        if self.separate_versions:
+            self._delete_version_records(archive_name)
+
+        if self._dependents_index_exists():
+            self._unindex_dependencies(archive_name)
+
+    def get_version_history(self, archive_name, start=0, limit=None):
+        '''
+        Returns the version records of an archive, oldest first
+
+        Parameters
+        ----------
+        archive_name : str
+            name of the archive
+
+        start : int
+            index of the first version record to return (default 0)
+
+        limit : int
+            maximum number of records to return (default all)
+
+        Returns
+        -------
+        version_history : list
+            list of version record dictionaries
+        '''
+
+        return self._get_version_history(
+            archive_name, start=start, limit=limit)
+
+    def get_dependents(self, archive_name, version=None):
+        '''
+        Returns the archive versions which depend on an archive
+
+        Dependencies are looked up in the table's reverse dependency index.
+        Tables created without an index are answered by reading the version
+        history of every archive.
+
+        Parameters
+        ----------
+        archive_name : str
+            name of the dependency archive
+
+        version : str
+            version of the dependency archive. If given, only archive
+            versions which pin this version are returned. By default, all
+            archive versions which depend on any version are returned.
+
+        Returns
+        -------
+        dependents : list
+            sorted list of ``(archive_name, version)`` tuples. ``version`` is
+            None for unversioned archives.
+        '''
+
+        if version is not None:
+            version = _normalize_dependency_version(version)
+
+        if self._dependents_index_exists():
+            dependents = self._get_dependents(archive_name, version)
+
+        else:
+            dependents = self._scan_dependents(archive_name, version)
+
+        return sorted(
+            set(dependents),
+            key=lambda dependent: (dependent[0], dependent[1] or ''))
+
+    def _scan_dependents(self, archive_name, version=None):
+        '''
+        Find dependents by reading the version history of every archive
+        '''
+
+        for listing in self.iter_batch_get_archive_listing(
+                self.search(tuple([]))):
+
+            # Records written later for the same version replace earlier
+            # records (see DataArchive.set_dependencies)
+            records = {}
+
+            for record in listing.get('version_history', []):
+                records[_get_archive_version(record)] = record
+
+            for record in records.values():
+                for entry in _get_dependency_entries(listing['_id'], record):
+                    if entry['dependency'] != archive_name:
+                        continue
+
+                    if version is None or entry['version'] == version:
+                        yield entry['archive'], entry['archive_version']
 
     @classmethod
     def create_timestamp(cls):
@@ -441,6 +841,40 @@ class BaseDataManager(object):
 
         return self._search(search_terms, begins_with=begins_with)
 
+    def filter(self, pattern=None, engine='path', begins_with=None):
+        '''
+        Returns the names of archives matching a pattern
+
+        Parameters
+        ----------
+        pattern: str
+            pattern to match archive names against. If no pattern is given,
+            all archives starting with ``begins_with`` are returned.
+
+        engine: str
+            ``'str'`` matches archive names containing ``pattern``,
+            ``'path'`` matches names with :py:func:`fnmatch.fnmatch`, and
+            ``'regex'`` matches names with :py:func:`re.search`
+
+        begins_with: str
+            start of archive name
+
+        Returns
+        -------
+        generator
+
+        '''
+
+        if engine not in ('str', 'path', 'regex'):
+            raise ValueError(
+                'search engine "{}" not recognized. '.format(engine) +
+                'choose "str", "path", or "regex"')
+
+        if not pattern:
+            return self._search(tuple([]), begins_with=begins_with)
+
+        return self._filter(pattern, engine, begins_with=begins_with)
+
     def get_tags(self, archive_name):
         '''
         Returns the list of tags associated with an archive
@@ -461,12 +895,8 @@ class BaseDataManager(object):
             tags to add to the archive
 
         '''
-        updated_tag_list = list(self._get_tags(archive_name))
-        for tag in tags:
-            if tag not in updated_tag_list:
-                updated_tag_list.append(tag)
 
-        self._set_tags(archive_name, updated_tag_list)
+        self._add_tags(archive_name, tags)
 
     def delete_tags(self, archive_name, tags):
         '''
@@ -481,6 +911,47 @@ class BaseDataManager(object):
             tags to delete from the archive
 
         '''
+
+        self._delete_tags(archive_name, tags)
+
+    def _filter(self, pattern, engine, begins_with=None):
+        '''
+        Match archive names against a pattern
+
+        Managers should override this to match archive names in the
+        database. This implementation lists every archive starting with
+        ``begins_with`` and matches the names locally.
+        '''
+
+        return (
+            archive_name
+            for archive_name in self._search(
+                tuple([]), begins_with=begins_with)
+            if match_archive_name(archive_name, pattern, engine))
+
+    def _add_tags(self, archive_name, tags):
+        '''
+        Add tags to an archive's tag list
+
+        Managers should override this and :py:meth:`_delete_tags` with
+        atomic updates. This implementation reads the tag list and writes it
+        back with :py:meth:`_set_tags`, so concurrent changes may be lost.
+        '''
+
+        updated_tag_list = list(self._get_tags(archive_name))
+        for tag in tags:
+            if tag not in updated_tag_list:
+                updated_tag_list.append(tag)
+
+        self._set_tags(archive_name, updated_tag_list)
+
+    def _delete_tags(self, archive_name, tags):
+        '''
+        Remove tags from an archive's tag list
+
+        See :py:meth:`_add_tags`.
+        '''
+
         updated_tag_list = list(self._get_tags(archive_name))
         for tag in tags:
             if tag in updated_tag_list:
@@ -505,7 +976,10 @@ class BaseDataManager(object):
         return lowered_str_tags
 
     def _get_archive_spec(self, archive_name):
-        res = self._get_archive_listing(archive_name)
+        res = self._get_archive_listing(
+            archive_name,
+            projection=[
+                'authority_name', 'archive_path', 'versioned', 'chunked'])
 
         if res is None:
             raise KeyError
@@ -517,32 +991,67 @@ class BaseDataManager(object):
 
         res['archive_name'] = res.pop('_id')
 
-        spec = ['archive_name', 'authority_name', 'archive_path', 'versioned']
+        spec = [
+            'archive_name',
+            'authority_name',
+            'archive_path',
+            'versioned',
+            'chunked']
 
         return {k: v for k, v in res.items() if k in spec}
 
     def _get_archive_metadata(self, archive_name):
 
-        return self._get_archive_listing(archive_name)['archive_metadata']
+        return self._get_archive_listing(
+            archive_name, projection=['archive_metadata'])['archive_metadata']
 
     def _get_authority_name(self, archive_name):
 
-        return self._get_archive_listing(archive_name)['authority_name']
+        return self._get_archive_listing(
+            archive_name, projection=['authority_name'])['authority_name']
 
     def _get_archive_path(self, archive_name):
 
-        return self._get_archive_listing(archive_name)['archive_path']
+        return self._get_archive_listing(
+            archive_name, projection=['archive_path'])['archive_path']
+
+    def _get_version_history(self, archive_name, start=0, limit=None):
+
+        if self.separate_versions:
+            history = self._get_version_records(
+                archive_name, start=start, limit=limit)
 
-    def _get_version_history(self, archive_name):
+            if len(history) == 0:
+                # Raises a KeyError if the archive does not exist
+                self._get_archive_listing(archive_name, projection=[])
 
-        return self._get_archive_listing(archive_name)['version_history']
+            return history
+
+        history = self._get_archive_listing(
+            archive_name, projection=['version_history'])['version_history']
+
+        if limit is None:
+            return history[start:]
+
+        return history[start:start + limit]
 
     def _get_tags(self, archive_name):
 
-        return self._get_archive_listing(archive_name)['tags']
+        return self._get_archive_listing(
+            archive_name, projection=['tags'])['tags']
 
     def _get_latest_hash(self, archive_name):
 
+        if self.separate_versions:
+            latest = self._get_archive_listing(
+                archive_name, projection=['latest_version']).get(
+                    'latest_version', None)
+
+            if latest is None:
+                return None
+
+            return latest['checksum']
+
         version_history = self._get_version_history(archive_name)
 
         if len(version_history) == 0:
@@ -564,9 +1073,91 @@ class BaseDataManager(object):
         except KeyError:
             pass
 
+    def _iter_batch_get_archive_listing(self, archive_names):
+        '''
+        Yields lists of archive listings, one list per page of archive names
+
+        Managers may override this to retrieve pages more efficiently. This
+        implementation calls :py:meth:`_batch_get_archive_listing` on each
+        page.
+        '''
+
+        archive_names = iter(archive_names)
+
+        while True:
+            page = list(itertools.islice(archive_names, self.BatchPageSize))
+
+            if len(page) == 0:
+                break
+
+            yield list(self._batch_get_archive_listing(page))
+
+    def _batch_update(self, version_records):
+        '''
+        Append version records to many archives
+
+        Managers should override this with bulk writes. This implementation
+        updates archives one at a time.
+
+        Returns
+        -------
+        failures : dict
+            exceptions keyed by the names of archives which were not updated
+        '''
+
+        failures = {}
+
+        for archive_name, version_metadata in version_records.items():
+            try:
+                self._update(archive_name, version_metadata)
+
+            except KeyError as e:
+                failures[archive_name] = e
+
+        return failures
+
+    def _batch_create_archive(self, documents):
+        '''
+        Insert many archive documents
+
+        Managers should override this with bulk inserts. This implementation
+        creates archives one at a time.
+
+        Returns
+        -------
+        failures : dict
+            exceptions keyed by the names of archives which were not created
+        '''
+
+        failures = {}
+
+        for document in documents:
+            try:
+                self._create_archive(document['_id'], document)
+
+            except KeyError as e:
+                failures[document['_id']] = e
+
+        return failures
+
     # Private methods (to be implemented by subclasses of DataManager)
 
-    def _get_archive_listing(self, archive_name):
+    def _get_archive_listing(self, archive_name, projection=None):
+        '''
+        Return the document for ``archive_name``
+
+        Raises a KeyError if the archive does not exist.
+
+        Parameters
+        ----------
+        archive_name : str
+
+        projection : list, optional
+            Top-level fields to retrieve. The document's ``_id`` is always
+            returned. Fields not listed may be omitted from the result. By
+            default, the full document is returned.
+        '''
+
         raise NotImplementedError(
             'BaseDataManager cannot be used directly. Use a subclass.')
 
@@ -616,3 +1207,85 @@ class BaseDataManager(object):
     def _set_tags(self, archive_name, updated_tag_list):
         raise NotImplementedError(
             'BaseDataManager cannot be used directly. Use a subclass.')
+
+    def _get_spec_documents(self, table_name):
+        raise NotImplementedError(
+            'BaseDataManager cannot be used directly. Use a subclass.')
+
+    # Version record storage (separate_versions tables)
+
+    def _create_versions_table(self, table_name):
+        raise NotImplementedError(
+            'Separate version storage not supported by this manager')
+
+    def _add_version_record(self, archive_name, version_metadata):
+        '''
+        Store a version record and update the archive's ``latest_version``
+        summary
+        '''
+
+        raise NotImplementedError(
+            'Separate version storage not supported by this manager')
+
+    def _get_version_records(self, archive_name, start=0, limit=None):
+        raise NotImplementedError(
+            'Separate version storage not supported by this manager')
+
+    def _batch_get_version_records(self, archive_names):
+        '''
+        Returns a dictionary of version histories keyed by archive name
+
+        Override to retrieve the histories of many archives in fewer
+        requests.
+        '''
+
+        return {
+            archive_name: self._get_version_records(archive_name)
+            for archive_name in archive_names}
+
+    def _delete_version_records(self, archive_name):
+        raise NotImplementedError(
+            'Separate version storage not supported by this manager')
+
+    # Reverse dependency index
+
+    def _dependents_index_exists(self):
+        '''
+        Returns True if the table has a reverse dependency index
+
+        Managers without an index find dependents with
+        :py:meth:`_scan_dependents`.
+        '''
+
+        return False
+
+    def _index_dependencies(self, version_records):
+        '''
+        Replace the index entries of archive versions with the dependencies
+        of their new version records
+
+        Parameters
+        ----------
+        version_records : dict
+            version metadata dictionaries keyed by archive name
+        '''
+
+        raise NotImplementedError(
+            'Dependency index not supported by this manager')
+
+    def _unindex_dependencies(self, archive_name):
+        '''
+        Remove the index entries of all versions of an archive
+        '''
+
+        raise NotImplementedError(
+            'Dependency index not supported by this manager')
+
+    def _get_dependents(self, archive_name, version=None):
+        '''
+        Returns ``(archive_name, version)`` tuples of the indexed dependents
+        of an archive
+        '''
+
+        raise NotImplementedError(
+            'Dependency index not supported by this manager')
@@ -1,8 +1,25 @@
 import boto3
 
-from datafs.managers.manager import BaseDataManager
-from boto3.dynamodb.conditions import Attr, Key
+from datafs.managers.manager import (
+    BaseDataManager,
+    _get_archive_version,
+    _get_dependency_entries)
+from datafs.core.patterns import glob_literals, match_archive_name
+from boto3.dynamodb.conditions import Attr, ConditionExpressionBuilder, Key
+from botocore.exceptions import ClientError
 from functools import reduce
+from multiprocessing.pool import ThreadPool
+
+import collections
+import itertools
+import random
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 
 class DynamoDBManager(BaseDataManager):
@@ -21,8 +38,42 @@ class DynamoDBManager(BaseDataManager):
         Keyword arguments used in initializing a dynamodb
         :py:class:`~boto3.resources.factory.dynamodb.ServiceResource` object
 
+    Archive tags are indexed in a companion table, ``table_name.tags``, with
+    one item per (tag, archive) pair, so tag searches are answered with
+    queries instead of table scans. Tables created without a tag index are
+    searched with scans.
+
+    Tags are stored as a string set, so they can be added and removed
+    atomically, and are returned in sorted order. Tag lists written by
+    earlier versions of DataFS are converted to sets the first time an
+    archive's tags are changed.
+
+    Tables created with ``separate_versions=True`` store version records in
+    a ``table_name.versions`` table keyed by archive name and sequence
+    number, so archive items do not grow towards the DynamoDB item size limit
+    as versions are added.
+
+    The dependencies of each archive version are indexed in a
+    ``table_name.dependents`` table keyed by the dependent archive, with a
+    global secondary index on the dependency archive, so
+    :py:meth:`~datafs.managers.manager.BaseDataManager.get_dependents` is
+    answered with a query. Tables created without this index are scanned.
+
     """
 
+    # Maximum number of items written in one transaction
+    TransactionSize = 25
+
+    # Base and maximum delays (seconds) between retries of unprocessed keys
+    RetryDelay = 0.05
+    RetryMaxDelay = 5
+
+    # Maximum number of BatchGetItem pages requested concurrently
+    MaxInFlightPages = 4
+
+    # Number of segments scanned in parallel when searches scan the table
+    ScanSegments = 1
+
     def __init__(
             self,
             table_name,
@@ -36,8 +87,20 @@ class DynamoDBManager(BaseDataManager):
 
         self._session = boto3.Session(**session_args)
         self._resource = self._session.resource('dynamodb', **resource_args)
+        self._tag_table_name = table_name + '.tags'
+        self._versions_table_name = table_name + '.versions'
+        self._dependents_table_name = table_name + '.dependents'
+
         self._table = self._resource.Table(self._table_name)
         self._spec_table = self._resource.Table(self._spec_table_name)
+        self._tag_table = self._resource.Table(self._tag_table_name)
+        self._versions_table = self._resource.Table(
+            self._versions_table_name)
+        self._dependents_table = self._resource.Table(
+            self._dependents_table_name)
+
+        self._has_tag_index = None
+        self._has_dependents_index = None
 
     @property
     def config(self):
@@ -57,33 +120,196 @@ class DynamoDBManager(BaseDataManager):
 
         """
 
+        if len(search_terms) > 0 and self._tag_index_exists():
+            return self._search_tag_index(search_terms, begins_with)
+
+        return self._scan(search_terms, begins_with)
+
+    def _search_tag_index(self, search_terms, begins_with=None):
+        '''
+        Query the tag index for each search term and intersect the results
+        '''
+
+        matches = None
+
+        for tag in set(search_terms):
+            archive_names = set(self._query_tag_index(tag, begins_with))
+
+            if matches is None:
+                matches = archive_names
+            else:
+                matches &= archive_names
+
+            if len(matches) == 0:
+                break
+
+        for archive_name in matches:
+            yield archive_name
+
+    def _query_tag_index(self, tag, begins_with=None):
+
+        condition = Key('tag').eq(tag)
+
+        if begins_with:
+            condition = condition & Key('_id').begins_with(begins_with)
+
         kwargs = dict(
+            KeyConditionExpression=condition,
             ProjectionExpression='#id',
             ExpressionAttributeNames={"#id": "_id"})
 
-        if len(search_terms) > 0:
-            kwargs['FilterExpression'] = reduce(
-                lambda x, y: x & y,
-                [Attr('tags').contains(arg) for arg in search_terms])
+        while True:
+            res = self._tag_table.query(**kwargs)
+            for r in res['Items']:
+                yield r['_id']
+            if 'LastEvaluatedKey' in res:
+                kwargs['ExclusiveStartKey'] = res['LastEvaluatedKey']
+            else:
+                break
+
+    def _filter(self, pattern, engine, begins_with=None):
+
+        if engine == 'str':
+            return self._scan(
+                tuple([]), begins_with, [Attr('_id').contains(pattern)])
+
+        conditions = []
+
+        if engine == 'path':
+            # Scan only names with the pattern's literal prefix and
+            # substrings, and check the wildcards here
+            prefix, substrings = glob_literals(pattern)
+
+            if prefix:
+                conditions.append(Key('_id').begins_with(prefix))
+
+            conditions.extend(
+                Attr('_id').contains(substring) for substring in substrings)
+
+        return (
+            archive_name
+            for archive_name in self._scan(
+                tuple([]), begins_with, conditions)
+            if match_archive_name(archive_name, pattern, engine))
+
+    def _scan(self, search_terms, begins_with=None, conditions=()):
+        '''
+        Scan the archive table for archives matching a search
+
+        Additional filter ``conditions`` on the archive documents may be
+        given.
+
+        If :py:attr:`ScanSegments` is greater than 1, the table is divided
+        into segments which are scanned in parallel, and archive names are
+        yielded as each segment's pages arrive.
+        '''
+
+        filters = [Attr('tags').contains(arg) for arg in search_terms]
 
         if begins_with:
-            if 'FilterExpression' in kwargs:
-                kwargs['FilterExpression'] = kwargs[
-                    'FilterExpression'] & Key('_id').begins_with(begins_with)
+            filters.append(Key('_id').begins_with(begins_with))
 
-            else:
-                kwargs['FilterExpression'] = Key(
-                    '_id').begins_with(begins_with)
+        filters.extend(conditions)
+
+        kwargs = dict(
+            TableName=self._table_name,
+            ProjectionExpression='#id',
+            ExpressionAttributeNames={"#id": "_id"})
+
+        if len(filters) > 0:
+            # Scans may run on several threads, which should not share the
+            # client's expression builder, so the expression is built here
+            expression = ConditionExpressionBuilder().build_expression(
+                reduce(lambda x, y: x & y, filters))
+
+            kwargs['FilterExpression'] = expression.condition_expression
+
+            kwargs['ExpressionAttributeNames'].update(
+                expression.attribute_name_placeholders)
+
+            kwargs['ExpressionAttributeValues'] = (
+                expression.attribute_value_placeholders)
+
+        if self.ScanSegments > 1:
+            pages = self._parallel_scan(kwargs, self.ScanSegments)
+        else:
+            pages = self._scan_pages(kwargs)
+
+        for page in pages:
+            for archive_name in page:
+                yield archive_name
+
+    def _scan_pages(self, kwargs):
+        '''
+        Yields lists of archive names, one list per page of a scan
+        '''
+
+        client = self._resource.meta.client
+        kwargs = dict(kwargs)
 
         while True:
-            res = self._table.scan(**kwargs)
-            for r in res['Items']:
-                yield r['_id']
+            res = client.scan(**kwargs)
+
+            yield [item['_id'] for item in res['Items']]
+
             if 'LastEvaluatedKey' in res:
                 kwargs['ExclusiveStartKey'] = res['LastEvaluatedKey']
             else:
                 break
 
+    def _parallel_scan(self, kwargs, segments):
+        '''
+        Scan ``segments`` segments of the table on separate threads
+
+        Yields pages of archive names in the order they are received.
+        '''
+
+        results = queue.Queue()
+        stop = threading.Event()
+
+        def scan_segment(segment):
+            try:
+                for page in self._scan_pages(
+                        dict(kwargs, Segment=segment, TotalSegments=segments)):
+
+                    if stop.is_set():
+                        break
+
+                    results.put(('page', page))
+
+            except Exception as e:
+                results.put(('error', e))
+
+            finally:
+                results.put(('done', None))
+
+        threads = [
+            threading.Thread(target=scan_segment, args=(segment,))
+            for segment in range(segments)]
+
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        try:
+            remaining = segments
+
+            while remaining > 0:
+                kind, value = results.get()
+
+                if kind == 'done':
+                    remaining -= 1
+
+                elif kind == 'error':
+                    raise value
+
+                else:
+                    yield value
+
+        finally:
+            # Stop scanning if the caller stops iterating or on errors
+            stop.set()
+
     def _update(self, archive_name, version_metadata):
         '''
         Updates the version specific metadata attribute in DynamoDB
@@ -111,8 +337,269 @@ class DynamoDBManager(BaseDataManager):
             ExpressionAttributeValues={':v': [version_metadata]},
             ReturnValues='ALL_NEW')
 
+    def _add_version_record(self, archive_name, version_metadata):
+        '''
+        Stores a version record in the versions table
+
+        The archive's version count and latest version summary are updated
+        first, reserving the record's sequence number.
+        '''
+
+        try:
+            res = self._table.update_item(
+                Key={'_id': archive_name},
+                UpdateExpression=(
+                    "SET latest_version = :v ADD version_count :one"),
+                ConditionExpression=Attr('_id').exists(),
+                ExpressionAttributeValues={
+                    ':v': version_metadata, ':one': 1},
+                ReturnValues='UPDATED_NEW')
+
+        except self._table.meta.client.exceptions.\
+                ConditionalCheckFailedException:
+            raise KeyError('Archive "{}" not found'.format(archive_name))
+
+        self._versions_table.put_item(Item={
+            '_id': archive_name,
+            'seq': int(res['Attributes']['version_count']) - 1,
+            'record': version_metadata})
+
+    def _get_version_records(self, archive_name, start=0, limit=None):
+
+        kwargs = {
+            'KeyConditionExpression': (
+                Key('_id').eq(archive_name) & Key('seq').gte(start))}
+
+        records = []
+
+        while limit is None or len(records) < limit:
+
+            if limit is not None:
+                kwargs['Limit'] = limit - len(records)
+
+            res = self._versions_table.query(**kwargs)
+            records.extend(item['record'] for item in res['Items'])
+
+            if 'LastEvaluatedKey' in res:
+                kwargs['ExclusiveStartKey'] = res['LastEvaluatedKey']
+            else:
+                break
+
+        return records
+
+    def _delete_version_records(self, archive_name):
+
+        kwargs = {
+            'KeyConditionExpression': Key('_id').eq(archive_name),
+            'ProjectionExpression': '#id, seq',
+            'ExpressionAttributeNames': {'#id': '_id'}}
+
+        with self._versions_table.batch_writer() as batch:
+            while True:
+                res = self._versions_table.query(**kwargs)
+
+                for item in res['Items']:
+                    batch.delete_item(
+                        Key={'_id': archive_name, 'seq': item['seq']})
+
+                if 'LastEvaluatedKey' in res:
+                    kwargs['ExclusiveStartKey'] = res['LastEvaluatedKey']
+                else:
+                    break
+
+    def _batch_update(self, version_records):
+        '''
+        Append version records in transactions of up to
+        :py:attr:`TransactionSize` archives
+
+        A transaction is cancelled if any of its archives do not exist, in
+        which case its archives are updated one at a time.
+        '''
+
+        # The resource's client serializes attribute values itself
+        client = self._resource.meta.client
+
+        archive_names = list(version_records.keys())
+        failures = {}
+
+        for i in range(0, len(archive_names), self.TransactionSize):
+            chunk = archive_names[i:i + self.TransactionSize]
+
+            updates = []
+
+            for archive_name in chunk:
+                updates.append({'Update': {
+                    'TableName': self._table_name,
+                    'Key': {'_id': archive_name},
+                    'UpdateExpression': (
+                        'SET version_history = '
+                        'list_append(version_history, :v)'),
+                    'ConditionExpression': 'attribute_exists(#id)',
+                    'ExpressionAttributeNames': {'#id': '_id'},
+                    'ExpressionAttributeValues': {
+                        ':v': [version_records[archive_name]]}}})
+
+            try:
+                client.transact_write_items(TransactItems=updates)
+
+            except ClientError as e:
+                if e.response['Error']['Code'] != (
+                        'TransactionCanceledException'):
+                    raise
+
+                for archive_name in chunk:
+                    try:
+                        self._table.update_item(
+                            Key={'_id': archive_name},
+                            UpdateExpression=(
+                                'SET version_history = '
+                                'list_append(version_history, :v)'),
+                            ConditionExpression=Attr('_id').exists(),
+                            ExpressionAttributeValues={
+                                ':v': [version_records[archive_name]]})
+
+                    except client.exceptions.ConditionalCheckFailedException:
+                        failures[archive_name] = KeyError(
+                            'Archive "{}" not found'.format(archive_name))
+
+        return failures
+
     def _get_table_names(self):
-        return [t.name for t in self._resource.tables.all()]
+        names = [t.name for t in self._resource.tables.all()]
+
+        # Hide tag index, version and dependency index tables
+        return [
+            name for name in names
+            if not (name.endswith('.tags') and name[:-5] in names)
+            and not (name.endswith('.versions') and name[:-9] in names)
+            and not (name.endswith('.dependents') and name[:-11] in names)]
+
+    def _tag_index_exists(self):
+        if self._has_tag_index is None:
+            self._has_tag_index = self._tag_table_name in [
+                t.name for t in self._resource.tables.all()]
+
+        return self._has_tag_index
+
+    def _index_tags(self, archive_name, tags):
+        '''
+        Add entries for an archive to the tag index
+        '''
+
+        if not self._tag_index_exists():
+            return
+
+        with self._tag_table.batch_writer() as batch:
+            for tag in set(tags):
+                batch.put_item(Item={'tag': tag, '_id': archive_name})
+
+    def _unindex_tags(self, archive_name, tags):
+        '''
+        Remove entries for an archive from the tag index
+        '''
+
+        if not self._tag_index_exists():
+            return
+
+        with self._tag_table.batch_writer() as batch:
+            for tag in set(tags):
+                batch.delete_item(Key={'tag': tag, '_id': archive_name})
+
+    def _dependents_index_exists(self):
+        if self._has_dependents_index is None:
+            self._has_dependents_index = self._dependents_table_name in [
+                t.name for t in self._resource.tables.all()]
+
+        return self._has_dependents_index
+
+    def _index_dependencies(self, version_records):
+        '''
+        Replace the dependency index items of archive versions
+
+        Items are keyed by the dependent archive and an ``entry`` made of the
+        dependent version and the dependency name, so the items of one
+        archive version are found with a ``begins_with`` query.
+        '''
+
+        with self._dependents_table.batch_writer() as batch:
+            for archive_name, version_metadata in version_records.items():
+                archive_version = _get_archive_version(version_metadata)
+                prefix = '{}:'.format(archive_version or '')
+
+                items = {}
+
+                for entry in _get_dependency_entries(
+                        archive_name, version_metadata):
+
+                    item = {
+                        '_id': archive_name,
+                        'entry': prefix + entry['dependency'],
+                        'dependency': entry['dependency']}
+
+                    if entry['version'] is not None:
+                        item['version'] = entry['version']
+
+                    if archive_version is not None:
+                        item['archive_version'] = archive_version
+
+                    items[item['entry']] = item
+
+                # Items with unchanged keys are overwritten
+                for key in self._query_dependency_entries(
+                        archive_name, prefix):
+                    if key not in items:
+                        batch.delete_item(
+                            Key={'_id': archive_name, 'entry': key})
+
+                for item in items.values():
+                    batch.put_item(Item=item)
+
+    def _unindex_dependencies(self, archive_name):
+
+        keys = list(self._query_dependency_entries(archive_name))
+
+        with self._dependents_table.batch_writer() as batch:
+            for key in keys:
+                batch.delete_item(Key={'_id': archive_name, 'entry': key})
+
+    def _query_dependency_entries(self, archive_name, prefix=None):
+
+        condition = Key('_id').eq(archive_name)
+
+        if prefix:
+            condition = condition & Key('entry').begins_with(prefix)
+
+        kwargs = dict(
+            KeyConditionExpression=condition,
+            ProjectionExpression='#entry',
+            ExpressionAttributeNames={'#entry': 'entry'})
+
+        while True:
+            res = self._dependents_table.query(**kwargs)
+            for r in res['Items']:
+                yield r['entry']
+            if 'LastEvaluatedKey' in res:
+                kwargs['ExclusiveStartKey'] = res['LastEvaluatedKey']
+            else:
+                break
+
+    def _get_dependents(self, archive_name, version=None):
+
+        kwargs = dict(
+            IndexName='dependency',
+            KeyConditionExpression=Key('dependency').eq(archive_name))
+
+        if version is not None:
+            kwargs['FilterExpression'] = Attr('version').eq(version)
+
+        while True:
+            res = self._dependents_table.query(**kwargs)
+            for r in res['Items']:
+                yield r['_id'], r.get('archive_version')
+            if 'LastEvaluatedKey' in res:
+                kwargs['ExclusiveStartKey'] = res['LastEvaluatedKey']
+            else:
+                break
 
     def _create_archive_table(self, table_name):
         '''
@@ -134,15 +621,64 @@ class DynamoDBManager(BaseDataManager):
         if table_name in self._get_table_names():
             raise KeyError('Table "{}" already exists'.format(table_name))
 
+        self._create_table(
+            table_name,
+            KeySchema=[{'AttributeName': '_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[
+                {'AttributeName': '_id', 'AttributeType': 'S'}])
+
+        if not table_name.endswith('.spec'):
+            self._create_table(
+                table_name + '.tags',
+                KeySchema=[
+                    {'AttributeName': 'tag', 'KeyType': 'HASH'},
+                    {'AttributeName': '_id', 'KeyType': 'RANGE'}],
+                AttributeDefinitions=[
+                    {'AttributeName': 'tag', 'AttributeType': 'S'},
+                    {'AttributeName': '_id', 'AttributeType': 'S'}])
+
+            self._create_table(
+                table_name + '.dependents',
+                KeySchema=[
+                    {'AttributeName': '_id', 'KeyType': 'HASH'},
+                    {'AttributeName': 'entry', 'KeyType': 'RANGE'}],
+                AttributeDefinitions=[
+                    {'AttributeName': '_id', 'AttributeType': 'S'},
+                    {'AttributeName': 'entry', 'AttributeType': 'S'},
+                    {'AttributeName': 'dependency', 'AttributeType': 'S'}],
+                GlobalSecondaryIndexes=[{
+                    'IndexName': 'dependency',
+                    'KeySchema': [
+                        {'AttributeName': 'dependency', 'KeyType': 'HASH'},
+                        {'AttributeName': '_id', 'KeyType': 'RANGE'}],
+                    'Projection': {'ProjectionType': 'ALL'},
+                    'ProvisionedThroughput': {
+                        'ReadCapacityUnits': 123,
+                        'WriteCapacityUnits': 123}}])
+
+            self._has_tag_index = None
+            self._has_dependents_index = None
+
+    def _create_versions_table(self, table_name):
+
+        self._create_table(
+            table_name + '.versions',
+            KeySchema=[
+                {'AttributeName': '_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'seq', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[
+                {'AttributeName': '_id', 'AttributeType': 'S'},
+                {'AttributeName': 'seq', 'AttributeType': 'N'}])
+
+    def _create_table(self, table_name, **kwargs):
+
         try:
             table = self._resource.create_table(
                 TableName=table_name,
-                KeySchema=[{'AttributeName': '_id', 'KeyType': 'HASH'}],
-                AttributeDefinitions=[
-                    {'AttributeName': '_id', 'AttributeType': 'S'}],
                 ProvisionedThroughput={
                     'ReadCapacityUnits': 123,
-                    'WriteCapacityUnits': 123})
+                    'WriteCapacityUnits': 123},
+                **kwargs)
 
             table.meta.client.get_waiter('table_exists').wait(
                 TableName=table_name)
@@ -150,7 +686,8 @@ class DynamoDBManager(BaseDataManager):
         except ValueError:
             # Error handling for windows incompatability issue
             msg = 'Table creation failed'
-            assert table_name in self._get_table_names(), msg
+            assert table_name in [
+                t.name for t in self._resource.tables.all()], msg
 
     def _create_spec_config(self, table_name, spec_documents):
         '''
@@ -193,17 +730,32 @@ class DynamoDBManager(BaseDataManager):
 
     def _delete_table(self, table_name):
 
-        try:
-            self._resource.Table(table_name).delete()
+        existing = [t.name for t in self._resource.tables.all()]
 
-        except ValueError:
-            # Error handling for windows incompatability issue
-            msg = 'Table deletion failed'
-            assert table_name not in self._get_table_names(), msg
+        tables = [table_name] + [
+            table_name + suffix
+            for suffix in ('.tags', '.versions', '.dependents')
+            if table_name + suffix in existing]
+
+        for name in tables:
+            try:
+                self._resource.Table(name).delete()
+
+            except ValueError:
+                # Error handling for windows incompatability issue
+                msg = 'Table deletion failed'
+                assert name not in [
+                    t.name for t in self._resource.tables.all()], msg
+
+        self._has_tag_index = None
+        self._has_dependents_index = None
 
     def _update_metadata(self, archive_name, archive_metadata):
         """
-        Appends the updated_metada dict to the Metadata Attribute list
+        Updates the archive_metadata attribute in a single request
+
+        Each key is set or removed with its own update path, so other keys
+        are not read or rewritten.
 
         Parameters
         ----------
@@ -218,18 +770,50 @@ class DynamoDBManager(BaseDataManager):
 
         """
 
-        archive_metadata_current = self._get_archive_metadata(archive_name)
-        archive_metadata_current.update(archive_metadata)
-        for k, v in archive_metadata_current.items():
-            if v is None:
-                del archive_metadata_current[k]
+        names = {'#m': 'archive_metadata'}
+        values = {}
+        set_paths = []
+        remove_paths = []
 
-        # add the updated archive_metadata object to Dynamo
-        self._table.update_item(
-            Key={'_id': archive_name},
-            UpdateExpression="SET archive_metadata = :v",
-            ExpressionAttributeValues={':v': archive_metadata_current},
-            ReturnValues='ALL_NEW')
+        for i, (key, val) in enumerate(archive_metadata.items()):
+
+            # Attribute names are substituted to allow any metadata key
+            names['#k{}'.format(i)] = key
+
+            if val is None:
+                remove_paths.append('#m.#k{}'.format(i))
+
+            else:
+                values[':v{}'.format(i)] = val
+                set_paths.append('#m.#k{0} = :v{0}'.format(i))
+
+        command = []
+
+        if len(set_paths) > 0:
+            command.append('SET ' + ', '.join(set_paths))
+
+        if len(remove_paths) > 0:
+            command.append('REMOVE ' + ', '.join(remove_paths))
+
+        if len(command) == 0:
+            return
+
+        kwargs = {}
+
+        if len(values) > 0:
+            kwargs['ExpressionAttributeValues'] = values
+
+        try:
+            self._table.update_item(
+                Key={'_id': archive_name},
+                UpdateExpression=' '.join(command),
+                ConditionExpression=Attr('archive_metadata').exists(),
+                ExpressionAttributeNames=names,
+                **kwargs)
+
+        except self._table.meta.client.exceptions.\
+                ConditionalCheckFailedException:
+            raise KeyError('Archive "{}" not found'.format(archive_name))
 
     def _create_archive(
             self,
@@ -250,30 +834,137 @@ class DynamoDBManager(BaseDataManager):
 
         '''
 
-        archive_exists = False
-
         try:
-            self.get_archive(archive_name)
-            archive_exists = True
-        except KeyError:
-            pass
+            self._table.put_item(
+                Item=self._format_item(metadata),
+                ConditionExpression=Attr('_id').not_exists())
 
-        if archive_exists:
+        except self._table.meta.client.exceptions.\
+                ConditionalCheckFailedException:
             raise KeyError(
                 "{} already exists. Use get_archive() to view".format(
                     archive_name))
 
-        self._table.put_item(Item=metadata)
+        self._index_tags(archive_name, metadata.get('tags', []))
+
+    def _batch_create_archive(self, documents):
+        '''
+        Create archives with conditional puts, written in transactions of
+        up to :py:attr:`TransactionSize` archives
+
+        A transaction is cancelled if any of its archives already exist, in
+        which case its archives are created one at a time.
+        '''
+
+        # The resource's client serializes attribute values itself
+        client = self._resource.meta.client
 
-    def _get_archive_listing(self, archive_name):
+        failures = {}
+        created = []
+
+        for i in range(0, len(documents), self.TransactionSize):
+            chunk = documents[i:i + self.TransactionSize]
+
+            puts = []
+
+            for document in chunk:
+                puts.append({'Put': {
+                    'TableName': self._table_name,
+                    'Item': self._format_item(document),
+                    'ConditionExpression': 'attribute_not_exists(#id)',
+                    'ExpressionAttributeNames': {'#id': '_id'}}})
+
+            try:
+                client.transact_write_items(TransactItems=puts)
+                created.extend(chunk)
+
+            except ClientError as e:
+                if e.response['Error']['Code'] != (
+                        'TransactionCanceledException'):
+                    raise
+
+                for document in chunk:
+                    try:
+                        self._table.put_item(
+                            Item=self._format_item(document),
+                            ConditionExpression=Attr('_id').not_exists())
+
+                        created.append(document)
+
+                    except client.exceptions.ConditionalCheckFailedException:
+                        failures[document['_id']] = KeyError(
+                            'Archive "{}" already exists'.format(
+                                document['_id']))
+
+        if self._tag_index_exists():
+            with self._tag_table.batch_writer() as batch:
+                for document in created:
+                    for tag in set(document.get('tags', [])):
+                        batch.put_item(
+                            Item={'tag': tag, '_id': document['_id']})
+
+        return failures
+
+    @staticmethod
+    def _format_item(metadata):
+        '''
+        Format an archive document as a DynamoDB item
+        '''
+
+        item = dict(metadata)
+        tags = item.pop('tags', [])
+
+        # DynamoDB does not store empty sets
+        if len(tags) > 0:
+            item['tags'] = set(tags)
+
+        return item
+
+    def _get_archive_listing(self, archive_name, projection=None):
         '''
         Return full document for ``{_id:'archive_name'}``
 
+        If ``projection`` is a list of fields, only those fields are
+        retrieved.
+
         .. note::
 
             DynamoDB specific results - do not expose to user
         '''
-        return self._table.get_item(Key={'_id': archive_name})['Item']
+
+        kwargs = {}
+
+        if projection is not None:
+            # Attribute names are substituted to avoid reserved words
+            names = {
+                '#f{}'.format(i): field
+                for i, field in enumerate(['_id'] + list(projection))}
+
+            kwargs['ProjectionExpression'] = ', '.join(sorted(names))
+            kwargs['ExpressionAttributeNames'] = names
+
+        res = self._table.get_item(
+            Key={'_id': archive_name}, **kwargs)['Item']
+
+        if projection is None or 'tags' in projection:
+            self._format_tags(res)
+
+        return res
+
+    @staticmethod
+    def _format_tags(listing):
+        '''
+        Convert an archive's tag set to a sorted list
+        '''
+
+        tags = listing.get('tags', [])
+
+        if isinstance(tags, set):
+            tags = sorted(tags)
+
+        listing['tags'] = tags
+
+        return listing
 
     def _batch_get_archive_listing(self, archive_names):
         '''
@@ -303,48 +994,215 @@ class DynamoDBManager(BaseDataManager):
 
         '''
 
-        archive_names = list(archive_names)
+        return [
+            listing
+            for listings in self._iter_batch_get_archive_listing(archive_names)
+            for listing in listings]
 
-        MAX_QUERY_LENGTH = 100
+    def _iter_batch_get_archive_listing(self, archive_names):
+        '''
+        Retrieve pages of up to 100 archives (the ``BatchGetItem`` limit)
 
-        archives = []
+        Up to :py:attr:`MaxInFlightPages` pages are requested concurrently,
+        on a pool of threads sharing the resource's boto3 client. Pages are
+        yielded in order. Keys which are not processed, e.g. because the
+        table's capacity is exceeded, are retried with exponential backoff
+        and jitter.
+        '''
 
-        for query_index in range(0, len(archive_names), MAX_QUERY_LENGTH):
-            current_query = {
-                'Keys': [{'_id': i} for i in archive_names[
-                    query_index: query_index+MAX_QUERY_LENGTH]]}
+        archive_names = iter(archive_names)
+        page_size = min(self.BatchPageSize, 100)
 
-            attempts = 0
-            res = {}
+        pages = iter(
+            lambda: list(itertools.islice(archive_names, page_size)), [])
 
-            while True:
+        # Fetch the first page before starting a pool for the rest
+        first_page = next(pages, None)
 
-                if attempts > 0 and len(res.get('UnprocessedKeys', {})) > 0:
-                    current_query = res['UnprocessedKeys'][self._table_name]
+        if first_page is None:
+            return
 
-                elif attempts > 0 and len(res.get('UnprocessedKeys', {})) == 0:
-                    break
+        yield self._get_page(first_page)
+
+        if self.MaxInFlightPages <= 1:
+            for page in pages:
+                yield self._get_page(page)
+
+            return
+
+        pool = None
+        pending = collections.deque()
 
-                res = self._resource.batch_get_item(
-                    RequestItems={self._table_name: current_query})
+        try:
+            for page in pages:
+                if pool is None:
+                    pool = ThreadPool(self.MaxInFlightPages)
+
+                pending.append(pool.apply_async(self._get_page, (page,)))
+
+                if len(pending) >= self.MaxInFlightPages:
+                    yield pending.popleft().get()
+
+            while len(pending) > 0:
+                yield pending.popleft().get()
+
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
-                archives.extend(res['Responses'][self._table_name])
+    def _get_page(self, archive_names):
 
-                attempts += 1
+        # boto3 clients, unlike resources, can be shared between threads.
+        # The resource's client still serializes attribute values.
+        client = self._resource.meta.client
 
-        return archives
+        request = {'Keys': [{'_id': name} for name in archive_names]}
+        listings = []
+        attempt = 0
+
+        while True:
+            res = client.batch_get_item(
+                RequestItems={self._table_name: request})
+
+            listings.extend(res['Responses'].get(self._table_name, []))
+
+            unprocessed = res.get('UnprocessedKeys', {}).get(
+                self._table_name, None)
+
+            if not unprocessed:
+                break
+
+            request = unprocessed
+
+            # Full jitter: wait a random time up to the exponential limit
+            time.sleep(random.uniform(0, min(
+                self.RetryMaxDelay, self.RetryDelay * 2 ** attempt)))
+
+            attempt += 1
+
+        return [self._format_tags(listing) for listing in listings]
 
     def _delete_archive_record(self, archive_name):
 
-        return self._table.delete_item(Key={'_id': archive_name})
+        res = self._table.delete_item(
+            Key={'_id': archive_name},
+            ReturnValues='ALL_OLD')
+
+        self._unindex_tags(
+            archive_name, res.get('Attributes', {}).get('tags', []))
+
+        return res
 
     def _get_spec_documents(self, table_name):
         return self._resource.Table(table_name + '.spec').scan()['Items']
 
+    def _add_tags(self, archive_name, tags):
+
+        tags = set(tags)
+        previous_tags = self._update_tag_set(archive_name, 'ADD', tags)
+
+        self._index_tags(
+            archive_name, [tag for tag in tags if tag not in previous_tags])
+
+    def _delete_tags(self, archive_name, tags):
+
+        tags = set(tags)
+        previous_tags = self._update_tag_set(archive_name, 'DELETE', tags)
+
+        self._unindex_tags(
+            archive_name, [tag for tag in tags if tag in previous_tags])
+
+    def _update_tag_set(self, archive_name, action, tags):
+        '''
+        Add or remove tags with a single atomic ``ADD`` or ``DELETE`` update
+
+        Returns the archive's previous tags.
+        '''
+
+        if len(tags) == 0:
+            # Empty sets are not valid update values
+            return self._get_tags(archive_name)
+
+        for attempt in range(2):
+            try:
+                res = self._table.update_item(
+                    Key={'_id': archive_name},
+                    UpdateExpression='{} tags :t'.format(action),
+                    ConditionExpression=Attr('_id').exists(),
+                    ExpressionAttributeValues={':t': tags},
+                    ReturnValues='UPDATED_OLD')
+
+                return res.get('Attributes', {}).get('tags', set())
+
+            except ClientError as e:
+                code = e.response['Error']['Code']
+
+                if code == 'ConditionalCheckFailedException':
+                    raise KeyError(
+                        'Archive "{}" not found'.format(archive_name))
+
+                # Set operations fail on tags stored as a list
+                if code != 'ValidationException' or attempt > 0:
+                    raise
+
+                self._convert_tag_list(archive_name)
+
+    def _convert_tag_list(self, archive_name):
+        '''
+        Convert a tag list written by an earlier version of DataFS to a set
+        '''
+
+        item = self._table.get_item(
+            Key={'_id': archive_name},
+            ProjectionExpression='tags')['Item']
+
+        tags = item.get('tags', None)
+
+        if not isinstance(tags, list):
+            return
+
+        if len(tags) > 0:
+            kwargs = {
+                'UpdateExpression': 'SET tags = :t',
+                'ExpressionAttributeValues': {':t': set(tags)}}
+
+        else:
+            kwargs = {'UpdateExpression': 'REMOVE tags'}
+
+        try:
+            # Skip the conversion if the tags were changed concurrently
+            self._table.update_item(
+                Key={'_id': archive_name},
+                ConditionExpression=Attr('tags').eq(tags),
+                **kwargs)
+
+        except ClientError as e:
+            if e.response['Error']['Code'] != (
+                    'ConditionalCheckFailedException'):
+                raise
+
     def _set_tags(self, archive_name, updated_tag_list):
 
-        self._table.update_item(
+        if len(updated_tag_list) > 0:
+            kwargs = {
+                'UpdateExpression': 'SET tags = :t',
+                'ExpressionAttributeValues': {':t': set(updated_tag_list)}}
+
+        else:
+            kwargs = {'UpdateExpression': 'REMOVE tags'}
+
+        res = self._table.update_item(
                 Key={'_id': archive_name},
-                UpdateExpression="SET tags = :t",
-                ExpressionAttributeValues={':t': updated_tag_list},
-                ReturnValues='ALL_NEW')
+                ReturnValues='UPDATED_OLD',
+                **kwargs)
+
+        previous_tags = res.get('Attributes', {}).get('tags', [])
+
+        self._unindex_tags(
+            archive_name,
+            [tag for tag in previous_tags if tag not in updated_tag_list])
+
+        self._index_tags(
+            archive_name,
+            [tag for tag in updated_tag_list if tag not in previous_tags])
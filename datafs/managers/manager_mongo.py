@@ -1,10 +1,21 @@
 
 from __future__ import absolute_import
 
-from datafs.managers.manager import BaseDataManager
+from datafs.managers.manager import (
+    BaseDataManager,
+    _get_archive_version,
+    _get_dependency_entries)
+from datafs.core.patterns import glob_to_regex
 
-from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError
+from pymongo import (
+    DeleteMany,
+    InsertOne,
+    MongoClient,
+    ReturnDocument,
+    UpdateOne)
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import re
 
 
 class MongoDBManager(BaseDataManager):
@@ -21,8 +32,20 @@ class MongoDBManager(BaseDataManager):
     client_kwargs : dict
         Keyword arguments used in initializing a
         :py:class:`pymongo.MongoClient` object
+
+    Tables created with ``separate_versions=True`` store version records in
+    a ``table_name.versions`` collection, one document per version, indexed
+    by archive and sequence number.
+
+    The dependencies of each archive version are indexed in a
+    ``table_name.dependents`` collection, one document per dependency, so
+    :py:meth:`~datafs.managers.manager.BaseDataManager.get_dependents` is
+    answered with an indexed query.
     '''
 
+    # Number of archive names retrieved per round trip in searches
+    SearchBatchSize = 1000
+
     def __init__(self, database_name, table_name, client_kwargs=None):
         super(MongoDBManager, self).__init__(table_name)
 
@@ -39,6 +62,8 @@ class MongoDBManager(BaseDataManager):
         self._db = None
         self._coll = None
         self._spec_coll = None
+        self._indexed = False
+        self._has_dependents_index = None
 
     @property
     def config(self):
@@ -67,12 +92,45 @@ class MongoDBManager(BaseDataManager):
 
         self.db.create_collection(table_name)
 
+        if not table_name.endswith('.spec'):
+            self._create_indexes(self.db[table_name])
+
+            dependents = self.db[table_name + '.dependents']
+            dependents.create_index([('dependency', 1), ('version', 1)])
+            dependents.create_index([('archive', 1), ('archive_version', 1)])
+
+            self._has_dependents_index = None
+
+    def _create_versions_table(self, table_name):
+        versions = self.db[table_name + '.versions']
+        versions.create_index([('archive', 1), ('seq', 1)], unique=True)
+
     def _delete_table(self, table_name):
         if table_name not in self._get_table_names():
             raise KeyError('Table "{}" not found'.format(table_name))
 
         self.db.drop_collection(table_name)
 
+        for suffix in ('.versions', '.dependents'):
+            if table_name + suffix in self._get_table_names():
+                self.db.drop_collection(table_name + suffix)
+
+        if table_name == self.table_name:
+            self._indexed = False
+
+        self._has_dependents_index = None
+
+    @staticmethod
+    def _create_indexes(collection):
+        '''
+        Index archive tags
+
+        ``tags`` is an array, so this is a multikey index with an entry for
+        each tag. Creating an existing index has no effect.
+        '''
+
+        collection.create_index('tags')
+
     @property
     def collection(self):
         table_name = self.table_name
@@ -80,6 +138,11 @@ class MongoDBManager(BaseDataManager):
         if table_name not in self._get_table_names():
             raise KeyError('Table "{}" not found'.format(table_name))
 
+        if not self._indexed:
+            # Index tables created before tags were indexed
+            self._create_indexes(self.db[table_name])
+            self._indexed = True
+
         return self.db[table_name]
 
     @property
@@ -92,6 +155,14 @@ class MongoDBManager(BaseDataManager):
 
         return self.db[spec_table_name]
 
+    @property
+    def versions_collection(self):
+        return self.db[self.table_name + '.versions']
+
+    @property
+    def dependents_collection(self):
+        return self.db[self.table_name + '.dependents']
+
     @property
     def db(self):
         if self._db is None:
@@ -106,19 +177,136 @@ class MongoDBManager(BaseDataManager):
             {"_id": archive_name},
             {"$push": {"version_history": version_metadata}})
 
+    def _batch_update(self, version_records):
+
+        archive_names = list(version_records.keys())
+
+        res = self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": archive_name},
+                    {"$push": {
+                        "version_history": version_records[archive_name]}})
+                for archive_name in archive_names],
+            ordered=False)
+
+        if res.matched_count == len(archive_names):
+            return {}
+
+        # Find the archives which were not matched
+        found = set(
+            r['_id'] for r in self.collection.find(
+                {'_id': {'$in': archive_names}}, {'_id': 1}))
+
+        return {
+            archive_name: KeyError(
+                'Archive "{}" not found'.format(archive_name))
+            for archive_name in archive_names if archive_name not in found}
+
+    def _add_version_record(self, archive_name, version_metadata):
+
+        # Reserve a sequence number and update the summary in one operation
+        res = self.collection.find_one_and_update(
+            {"_id": archive_name},
+            {
+                "$inc": {"version_count": 1},
+                "$set": {"latest_version": version_metadata}},
+            projection={"version_count": 1},
+            return_document=ReturnDocument.AFTER)
+
+        if res is None:
+            raise KeyError('Archive "{}" not found'.format(archive_name))
+
+        self.versions_collection.insert_one({
+            'archive': archive_name,
+            'seq': res['version_count'] - 1,
+            'record': version_metadata})
+
+    def _get_version_records(self, archive_name, start=0, limit=None):
+
+        res = self.versions_collection.find(
+            {'archive': archive_name, 'seq': {'$gte': start}},
+            {'record': 1}).sort('seq', 1)
+
+        if limit is not None:
+            res = res.limit(limit)
+
+        return [r['record'] for r in res]
+
+    def _batch_get_version_records(self, archive_names):
+
+        histories = {archive_name: [] for archive_name in archive_names}
+
+        res = self.versions_collection.find(
+            {'archive': {'$in': list(histories)}}).sort('seq', 1)
+
+        for r in res:
+            histories[r['archive']].append(r['record'])
+
+        return histories
+
+    def _delete_version_records(self, archive_name):
+        self.versions_collection.delete_many({'archive': archive_name})
+
+    def _dependents_index_exists(self):
+        if self._has_dependents_index is None:
+            self._has_dependents_index = (
+                self.table_name + '.dependents' in self._get_table_names())
+
+        return self._has_dependents_index
+
+    def _index_dependencies(self, version_records):
+
+        requests = []
+
+        for archive_name, version_metadata in version_records.items():
+            requests.append(DeleteMany({
+                'archive': archive_name,
+                'archive_version': _get_archive_version(version_metadata)}))
+
+            requests.extend(
+                InsertOne(entry) for entry in
+                _get_dependency_entries(archive_name, version_metadata))
+
+        if len(requests) > 0:
+            self.dependents_collection.bulk_write(requests, ordered=True)
+
+    def _unindex_dependencies(self, archive_name):
+        self.dependents_collection.delete_many({'archive': archive_name})
+
+    def _get_dependents(self, archive_name, version=None):
+
+        query = {'dependency': archive_name}
+
+        if version is not None:
+            query['version'] = version
+
+        res = self.dependents_collection.find(
+            query, {'_id': 0, 'archive': 1, 'archive_version': 1})
+
+        for r in res:
+            yield r['archive'], r.get('archive_version')
+
     def _update_metadata(self, archive_name, archive_metadata):
 
+        update = {}
+
         for key, val in archive_metadata.items():
+            field = "archive_metadata.{}".format(key)
 
             if val is None:
-                self.collection.update(
-                    {"_id": archive_name},
-                    {"$unset": {"archive_metadata.{}".format(key): ""}})
+                update.setdefault("$unset", {})[field] = ""
 
             else:
-                self.collection.update(
-                    {"_id": archive_name},
-                    {"$set": {"archive_metadata.{}".format(key): val}})
+                update.setdefault("$set", {})[field] = val
+
+        if len(update) == 0:
+            return
+
+        res = self.collection.update_one({"_id": archive_name}, update)
+
+        if res.matched_count == 0:
+            raise KeyError('Archive "{}" not found'.format(archive_name))
 
     def _update_spec_config(self, document_name, spec):
 
@@ -136,6 +324,27 @@ class MongoDBManager(BaseDataManager):
         except DuplicateKeyError:
             raise KeyError('Archive "{}" already exists'.format(archive_name))
 
+    def _batch_create_archive(self, documents):
+
+        failures = {}
+
+        try:
+            # Unordered inserts continue past existing archives
+            self.collection.insert_many(documents, ordered=False)
+
+        except BulkWriteError as e:
+            for error in e.details['writeErrors']:
+                archive_name = documents[error['index']]['_id']
+
+                if error['code'] == 11000:
+                    failures[archive_name] = KeyError(
+                        'Archive "{}" already exists'.format(archive_name))
+
+                else:
+                    failures[archive_name] = ValueError(error['errmsg'])
+
+        return failures
+
     def _create_spec_config(self, table_name, spec_documents):
 
         if self._spec_coll is None:
@@ -143,16 +352,22 @@ class MongoDBManager(BaseDataManager):
 
         self.spec_collection.insert_many(spec_documents)
 
-    def _get_archive_listing(self, archive_name):
+    def _get_archive_listing(self, archive_name, projection=None):
         '''
         Return full document for ``{_id:'archive_name'}``
 
+        If ``projection`` is a list of fields, only those fields are
+        returned.
+
         .. note::
 
             MongoDB specific results - do not expose to user
         '''
 
-        res = self.collection.find_one({'_id': archive_name})
+        if projection is not None:
+            projection = {field: 1 for field in ['_id'] + list(projection)}
+
+        res = self.collection.find_one({'_id': archive_name}, projection)
 
         if res is None:
             raise KeyError
@@ -200,19 +415,63 @@ class MongoDBManager(BaseDataManager):
 
     def _search(self, search_terms, begins_with=None):
 
-        if len(search_terms) == 0:
-            query = {}
-        elif len(search_terms) == 1:
-            query = {'tags': {'$in': [search_terms[0]]}}
+        query = {}
+
+        if len(search_terms) > 0:
+            query['tags'] = {'$all': list(search_terms)}
+
+        if begins_with:
+            # Anchored prefix expressions are resolved with the _id index
+            query['_id'] = {'$regex': '^' + re.escape(begins_with)}
+
+        res = self.collection.find(query, {"_id": 1}).batch_size(
+            self.SearchBatchSize)
+
+        for r in res:
+            yield r['_id']
+
+    def _filter(self, pattern, engine, begins_with=None):
+
+        if engine == 'str':
+            regex = re.escape(pattern)
+
+        elif engine == 'path':
+            # Translated patterns are anchored, so their literal prefix is
+            # resolved with the _id index
+            regex = glob_to_regex(pattern)
+
         else:
-            query = {
-                '$and': [{'tags': {'$in': [tag]}} for tag in search_terms]}
+            regex = pattern
+
+        conditions = [{'_id': {'$regex': regex}}]
+
+        if begins_with:
+            conditions.append(
+                {'_id': {'$regex': '^' + re.escape(begins_with)}})
 
-        res = self.collection.find(query, {"_id": 1})
+        res = self.collection.find(
+            {'$and': conditions}, {"_id": 1}).batch_size(self.SearchBatchSize)
 
         for r in res:
-            if (not begins_with) or r['_id'].startswith(begins_with):
-                yield r['_id']
+            yield r['_id']
+
+    def _add_tags(self, archive_name, tags):
+
+        res = self.collection.update_one(
+            {"_id": archive_name},
+            {"$addToSet": {"tags": {"$each": list(tags)}}})
+
+        if res.matched_count == 0:
+            raise KeyError('Archive "{}" not found'.format(archive_name))
+
+    def _delete_tags(self, archive_name, tags):
+
+        res = self.collection.update_one(
+            {"_id": archive_name},
+            {"$pullAll": {"tags": list(tags)}})
+
+        if res.matched_count == 0:
+            raise KeyError('Archive "{}" not found'.format(archive_name))
 
     def _set_tags(self, archive_name, updated_tag_list):
 
@@ -0,0 +1,758 @@
+from __future__ import absolute_import
+
+from datafs.managers.manager import (
+    BaseDataManager,
+    _get_archive_version,
+    _get_dependency_entries)
+from datafs.core.patterns import glob_literals, glob_to_regex
+
+import json
+import re
+import sqlite3
+import threading
+
+
+def _quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _escape_glob(pattern):
+    return ''.join(
+        '[{}]'.format(c) if c in '*?[' else c for c in pattern)
+
+
+def _regexp(pattern, value):
+    return re.search(pattern, value) is not None
+
+
+class SQLiteManager(BaseDataManager):
+    '''
+    Parameters
+    ----------
+
+    database : str
+        Path to the SQLite database file. Use ``':memory:'`` for a
+        non-persistent database.
+
+    table_name: str
+        Name of the data archive table
+
+    connect_kwargs : dict
+        Keyword arguments used in :py:func:`sqlite3.connect`
+
+    Each archive table is stored as four SQL tables: the archive documents
+    (``table_name``), their version histories (``table_name.versions``),
+    their tags (``table_name.tags``), and the dependencies of each archive
+    version (``table_name.dependents``). Tags and dependencies are indexed,
+    so tag searches and dependent lookups do not scan the archive table.
+    Version records are always stored separately, so the
+    ``separate_versions`` option of :py:meth:`create_archive_table` has no
+    effect.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        >>> manager = SQLiteManager(':memory:', 'my-table')
+        >>> manager.create_archive_table('my-table')
+        >>> 'my-table' in manager.table_names
+        True
+
+    '''
+
+    # Maximum number of bound parameters per query
+    MaxQueryLength = 500
+
+    def __init__(self, database, table_name, connect_kwargs=None):
+        super(SQLiteManager, self).__init__(table_name)
+
+        if connect_kwargs is None:
+            connect_kwargs = {}
+
+        self._database = database
+        self._connect_kwargs = connect_kwargs
+
+        kwargs = dict(check_same_thread=False, cached_statements=256)
+        kwargs.update(connect_kwargs)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(database, **kwargs)
+
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA foreign_keys=ON')
+
+        # SQLite provides the REGEXP operator but no implementation
+        self._conn.create_function('REGEXP', 2, _regexp)
+
+    @property
+    def config(self):
+        config = {
+            'database': self._database,
+            'table_name': self._table_name,
+            'connect_kwargs': self._connect_kwargs
+        }
+
+        return config
+
+    @property
+    def database(self):
+        return self._database
+
+    @property
+    def table_name(self):
+        return self._table_name
+
+    def _execute(self, query, params=()):
+        try:
+            with self._lock:
+                return self._conn.execute(query, params).fetchall()
+
+        except sqlite3.OperationalError as e:
+            if 'no such table' in str(e):
+                raise KeyError(str(e))
+
+            raise
+
+    def _get_sql_tables(self):
+        return set(row[0] for row in self._execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"))
+
+    def _get_table_names(self):
+        tables = self._get_sql_tables()
+
+        return sorted(
+            t for t in tables
+            if not (
+                t.rsplit('.', 1)[-1] in ('versions', 'tags', 'dependents') and
+                t.rsplit('.', 1)[0] in tables))
+
+    def _create_archive_table(self, table_name):
+        if table_name in self._get_table_names():
+            raise KeyError('Table "{}" already exists'.format(table_name))
+
+        table = _quote(table_name)
+
+        if table_name.endswith('.spec'):
+            with self._lock:
+                with self._conn:
+                    self._conn.execute(
+                        'CREATE TABLE {} ('
+                        '_id TEXT PRIMARY KEY, '
+                        'config TEXT NOT NULL)'.format(table))
+
+            return
+
+        versions = _quote(table_name + '.versions')
+        tags = _quote(table_name + '.tags')
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'CREATE TABLE {} ('
+                    '_id TEXT PRIMARY KEY, '
+                    'document TEXT NOT NULL)'.format(table))
+
+                self._conn.execute(
+                    'CREATE TABLE {} ('
+                    'archive_id TEXT NOT NULL '
+                    'REFERENCES {} (_id) ON DELETE CASCADE, '
+                    'seq INTEGER NOT NULL, '
+                    'version TEXT, '
+                    'checksum TEXT, '
+                    'algorithm TEXT, '
+                    'updated TEXT, '
+                    'record TEXT NOT NULL, '
+                    'PRIMARY KEY (archive_id, seq))'.format(versions, table))
+
+                self._conn.execute(
+                    'CREATE TABLE {} ('
+                    'archive_id TEXT NOT NULL '
+                    'REFERENCES {} (_id) ON DELETE CASCADE, '
+                    'tag TEXT NOT NULL, '
+                    'position INTEGER NOT NULL, '
+                    'PRIMARY KEY (archive_id, tag))'.format(tags, table))
+
+                self._conn.execute(
+                    'CREATE INDEX {} ON {} (tag, archive_id)'.format(
+                        _quote(table_name + '.tags.tag_index'), tags))
+
+                self._create_dependents_table(table_name)
+
+    def _create_dependents_table(self, table_name):
+
+        dependents = _quote(table_name + '.dependents')
+
+        self._conn.execute(
+            'CREATE TABLE {} ('
+            'archive_id TEXT NOT NULL '
+            'REFERENCES {} (_id) ON DELETE CASCADE, '
+            'archive_version TEXT, '
+            'dependency TEXT NOT NULL, '
+            'version TEXT)'.format(dependents, _quote(table_name)))
+
+        self._conn.execute(
+            'CREATE INDEX {} ON {} (dependency, version)'.format(
+                _quote(table_name + '.dependents.dependency_index'),
+                dependents))
+
+        self._conn.execute(
+            'CREATE INDEX {} ON {} (archive_id, archive_version)'.format(
+                _quote(table_name + '.dependents.archive_index'),
+                dependents))
+
+    def _delete_table(self, table_name):
+        if table_name not in self._get_table_names():
+            raise KeyError('Table "{}" not found'.format(table_name))
+
+        tables = self._get_sql_tables()
+
+        with self._lock:
+            with self._conn:
+                for suffix in ['.dependents', '.tags', '.versions', '']:
+                    if table_name + suffix in tables:
+                        self._conn.execute(
+                            'DROP TABLE {}'.format(
+                                _quote(table_name + suffix)))
+
+    @property
+    def _tables(self):
+        return (
+            _quote(self._table_name),
+            _quote(self._table_name + '.versions'),
+            _quote(self._table_name + '.tags'))
+
+    def _dependents_index_exists(self):
+        return self._table_name + '.dependents' in self._get_sql_tables()
+
+    def _index_dependencies(self, version_records):
+
+        dependents = _quote(self._table_name + '.dependents')
+
+        with self._lock:
+            with self._conn:
+                for archive_name, version_metadata in version_records.items():
+                    self._conn.execute(
+                        'DELETE FROM {} WHERE archive_id = ? '
+                        'AND archive_version IS ?'.format(dependents),
+                        (
+                            archive_name,
+                            _get_archive_version(version_metadata)))
+
+                    self._conn.executemany(
+                        'INSERT INTO {} '
+                        '(archive_id, archive_version, dependency, version) '
+                        'VALUES (?, ?, ?, ?)'.format(dependents),
+                        [
+                            (
+                                entry['archive'],
+                                entry['archive_version'],
+                                entry['dependency'],
+                                entry['version'])
+                            for entry in _get_dependency_entries(
+                                archive_name, version_metadata)])
+
+    def _unindex_dependencies(self, archive_name):
+        # Index entries are deleted with their archive (ON DELETE CASCADE)
+        pass
+
+    def _get_dependents(self, archive_name, version=None):
+
+        query = 'SELECT archive_id, archive_version FROM {} '.format(
+            _quote(self._table_name + '.dependents'))
+
+        if version is None:
+            res = self._execute(
+                query + 'WHERE dependency = ?', (archive_name,))
+
+        else:
+            res = self._execute(
+                query + 'WHERE dependency = ? AND version = ?',
+                (archive_name, version))
+
+        return [tuple(row) for row in res]
+
+    def _check_archive(self, archive_name):
+
+        table, _, _ = self._tables
+
+        res = self._execute(
+            'SELECT 1 FROM {} WHERE _id = ?'.format(table),
+            (archive_name,))
+
+        if len(res) == 0:
+            raise KeyError('Archive "{}" not found'.format(archive_name))
+
+    def _check_table(self, table_name=None):
+        if table_name is None:
+            table_name = self._table_name
+
+        if table_name not in self._get_sql_tables():
+            raise KeyError('Table "{}" not found'.format(table_name))
+
+    # Private methods (to be implemented!)
+
+    def _update(self, archive_name, version_metadata):
+
+        self._check_table()
+
+        try:
+            with self._lock:
+                with self._conn:
+                    self._insert_version(archive_name, version_metadata)
+
+        except sqlite3.IntegrityError:
+            raise KeyError('Archive "{}" not found'.format(archive_name))
+
+    def _insert_version(self, archive_name, version_metadata):
+
+        _, versions, _ = self._tables
+
+        self._conn.execute(
+            'INSERT INTO {0} '
+            '(archive_id, seq, version, checksum, algorithm, updated, '
+            'record) '
+            'SELECT ?, COALESCE(MAX(seq) + 1, 0), ?, ?, ?, ?, ? '
+            'FROM {0} WHERE archive_id = ?'.format(versions),
+            (
+                archive_name,
+                version_metadata.get('version'),
+                version_metadata.get('checksum'),
+                version_metadata.get('algorithm'),
+                version_metadata.get('updated'),
+                json.dumps(version_metadata),
+                archive_name))
+
+    def _update_metadata(self, archive_name, archive_metadata):
+
+        table, _, _ = self._tables
+
+        with self._lock:
+            with self._conn:
+                document = self._get_document(archive_name)
+
+                current = document['archive_metadata']
+                current.update(archive_metadata)
+
+                for key, val in list(current.items()):
+                    if val is None:
+                        del current[key]
+
+                self._conn.execute(
+                    'UPDATE {} SET document = ? WHERE _id = ?'.format(table),
+                    (json.dumps(document), archive_name))
+
+    def _update_spec_config(self, document_name, spec):
+
+        self._check_table(self._spec_table_name)
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO {} (_id, config) '
+                    'VALUES (?, ?)'.format(_quote(self._spec_table_name)),
+                    (document_name, json.dumps(spec)))
+
+    def _create_archive(
+            self,
+            archive_name,
+            metadata):
+
+        self._check_table()
+
+        with self._lock:
+            with self._conn:
+                if not self._insert_archive(archive_name, metadata):
+                    raise KeyError(
+                        'Archive "{}" already exists'.format(archive_name))
+
+    def _batch_update(self, version_records):
+
+        self._check_table()
+
+        failures = {}
+
+        # All versions are inserted in a single transaction
+        with self._lock:
+            with self._conn:
+                for archive_name, version_metadata in version_records.items():
+                    try:
+                        self._insert_version(archive_name, version_metadata)
+
+                    except sqlite3.IntegrityError:
+                        failures[archive_name] = KeyError(
+                            'Archive "{}" not found'.format(archive_name))
+
+        return failures
+
+    def _batch_create_archive(self, documents):
+
+        self._check_table()
+
+        failures = {}
+
+        # All archives are inserted in a single transaction
+        with self._lock:
+            with self._conn:
+                for metadata in documents:
+                    archive_name = metadata['_id']
+
+                    if not self._insert_archive(archive_name, metadata):
+                        failures[archive_name] = KeyError(
+                            'Archive "{}" already exists'.format(
+                                archive_name))
+
+        return failures
+
+    def _insert_archive(self, archive_name, metadata):
+        '''
+        Insert an archive document, its tags and its versions
+
+        Returns False if the archive already exists.
+        '''
+
+        table, _, _ = self._tables
+
+        document = {
+            k: v for k, v in metadata.items()
+            if k not in ['_id', 'version_history', 'tags']}
+
+        res = self._conn.execute(
+            'INSERT OR IGNORE INTO {} (_id, document) '
+            'VALUES (?, ?)'.format(table),
+            (archive_name, json.dumps(document)))
+
+        if res.rowcount == 0:
+            return False
+
+        self._insert_tags(archive_name, metadata.get('tags', []))
+
+        for version_metadata in metadata.get('version_history', []):
+            self._insert_version(archive_name, version_metadata)
+
+        return True
+
+    def _create_spec_config(self, table_name, spec_documents):
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT INTO {} (_id, config) VALUES (?, ?)'.format(
+                        _quote(table_name + '.spec')),
+                    [
+                        (doc['_id'], json.dumps(doc['config']))
+                        for doc in spec_documents])
+
+    def _get_document(self, archive_name):
+
+        table, _, _ = self._tables
+
+        res = self._execute(
+            'SELECT document FROM {} WHERE _id = ?'.format(table),
+            (archive_name,))
+
+        if len(res) == 0:
+            raise KeyError
+
+        return json.loads(res[0][0])
+
+    def _get_archive_listing(self, archive_name, projection=None):
+        '''
+        Return full document for ``{_id:'archive_name'}``
+
+        Version histories and tags are only read if they are included in
+        ``projection`` (default all fields).
+
+        .. note::
+
+            SQLite specific results - do not expose to user
+        '''
+
+        with self._lock:
+            res = self._get_document(archive_name)
+            res['_id'] = archive_name
+
+            if projection is None or 'version_history' in projection:
+                res['version_history'] = self._get_version_history(
+                    archive_name)
+
+            if projection is None or 'tags' in projection:
+                res['tags'] = self._get_tags(archive_name)
+
+        return res
+
+    def _batch_get_archive_listing(self, archive_names):
+        '''
+        Batched version of :py:meth:`~SQLiteManager._get_archive_listing`
+
+        Returns a list of full archive listings from an iterable of archive
+        names
+
+        .. note ::
+
+            Invalid archive names will simply not be returned, so the response
+            may not be the same length as the supplied `archive_names`.
+
+        Parameters
+        ----------
+
+        archive_names : list
+
+            List of archive names
+
+        Returns
+        -------
+
+        archive_listings : list
+
+            List of archive listings
+
+        '''
+
+        table, versions, tags = self._tables
+
+        archive_names = list(archive_names)
+        archives = []
+
+        for query_index in range(0, len(archive_names), self.MaxQueryLength):
+            names = archive_names[
+                query_index: query_index + self.MaxQueryLength]
+
+            placeholders = ', '.join('?' for _ in names)
+
+            with self._lock:
+                documents = self._execute(
+                    'SELECT _id, document FROM {} '
+                    'WHERE _id IN ({})'.format(table, placeholders),
+                    names)
+
+                version_rows = self._execute(
+                    'SELECT archive_id, record FROM {} '
+                    'WHERE archive_id IN ({}) '
+                    'ORDER BY archive_id, seq'.format(versions, placeholders),
+                    names)
+
+                tag_rows = self._execute(
+                    'SELECT archive_id, tag FROM {} '
+                    'WHERE archive_id IN ({}) '
+                    'ORDER BY archive_id, position'.format(
+                        tags, placeholders),
+                    names)
+
+            listings = {}
+
+            for archive_name, document in documents:
+                res = json.loads(document)
+                res['_id'] = archive_name
+                res['version_history'] = []
+                res['tags'] = []
+                listings[archive_name] = res
+
+            for archive_name, record in version_rows:
+                listings[archive_name]['version_history'].append(
+                    json.loads(record))
+
+            for archive_name, tag in tag_rows:
+                listings[archive_name]['tags'].append(tag)
+
+            archives.extend(listings.values())
+
+        return archives
+
+    def _delete_archive_record(self, archive_name):
+
+        table, _, _ = self._tables
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'DELETE FROM {} WHERE _id = ?'.format(table),
+                    (archive_name,))
+
+    def _search(self, search_terms, begins_with=None):
+
+        table, _, tags = self._tables
+
+        query = 'SELECT _id FROM {}'.format(table)
+        conditions = []
+        params = []
+
+        if begins_with:
+            # GLOB is case sensitive, so prefix matches can use the primary
+            # key index
+            conditions.append('_id GLOB ?')
+            params.append(_escape_glob(begins_with) + '*')
+
+        search_terms = list(set(search_terms))
+
+        if len(search_terms) > 0:
+            conditions.append(
+                '_id IN (SELECT archive_id FROM {} WHERE tag IN ({}) '
+                'GROUP BY archive_id HAVING COUNT(*) = ?)'.format(
+                    tags, ', '.join('?' for _ in search_terms)))
+
+            params.extend(search_terms)
+            params.append(len(search_terms))
+
+        if len(conditions) > 0:
+            query += ' WHERE ' + ' AND '.join(conditions)
+
+        for row in self._execute(query, params):
+            yield row[0]
+
+    def _filter(self, pattern, engine, begins_with=None):
+
+        table, _, _ = self._tables
+
+        conditions = []
+        params = []
+
+        if begins_with:
+            conditions.append('_id GLOB ?')
+            params.append(_escape_glob(begins_with) + '*')
+
+        if engine == 'str':
+            conditions.append('_id GLOB ?')
+            params.append('*' + _escape_glob(pattern) + '*')
+
+        else:
+            if engine == 'path':
+                prefix, _ = glob_literals(pattern)
+
+                if prefix:
+                    # Literal prefixes are matched with the primary key index
+                    conditions.append('_id GLOB ?')
+                    params.append(_escape_glob(prefix) + '*')
+
+                pattern = glob_to_regex(pattern)
+
+            # Raise errors in the pattern here rather than from the query
+            re.compile(pattern)
+
+            conditions.append('_id REGEXP ?')
+            params.append(pattern)
+
+        query = 'SELECT _id FROM {} WHERE {}'.format(
+            table, ' AND '.join(conditions))
+
+        for row in self._execute(query, params):
+            yield row[0]
+
+    def _insert_tags(self, archive_name, tag_list):
+
+        _, _, tags = self._tables
+
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO {} (archive_id, tag, position) '
+            'VALUES (?, ?, ?)'.format(tags),
+            [(archive_name, tag, i) for i, tag in enumerate(tag_list)])
+
+    def _add_tags(self, archive_name, tag_list):
+
+        _, _, tags = self._tables
+
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        'INSERT OR IGNORE INTO {0} '
+                        '(archive_id, tag, position) '
+                        'SELECT ?, ?, COALESCE(MAX(position) + 1, 0) '
+                        'FROM {0} WHERE archive_id = ?'.format(tags),
+                        [
+                            (archive_name, tag, archive_name)
+                            for tag in tag_list])
+
+            except sqlite3.IntegrityError:
+                raise KeyError('Archive "{}" not found'.format(archive_name))
+
+    def _delete_tags(self, archive_name, tag_list):
+
+        _, _, tags = self._tables
+
+        with self._lock:
+            with self._conn:
+                res = self._conn.executemany(
+                    'DELETE FROM {} WHERE archive_id = ? AND tag = ?'.format(
+                        tags),
+                    [(archive_name, tag) for tag in tag_list])
+
+            if res.rowcount < 1:
+                self._check_archive(archive_name)
+
+    def _set_tags(self, archive_name, updated_tag_list):
+
+        _, _, tags = self._tables
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'DELETE FROM {} WHERE archive_id = ?'.format(tags),
+                    (archive_name,))
+
+                self._insert_tags(archive_name, updated_tag_list)
+
+    def _get_spec_documents(self, table_name):
+
+        res = self._execute(
+            'SELECT _id, config FROM {}'.format(
+                _quote(table_name + '.spec')))
+
+        return [
+            {'_id': doc_id, 'config': json.loads(config)}
+            for doc_id, config in res]
+
+    def _get_archive_metadata(self, archive_name):
+
+        return self._get_document(archive_name)['archive_metadata']
+
+    @property
+    def separate_versions(self):
+        return False
+
+    def _create_versions_table(self, table_name):
+        pass
+
+    def _get_version_history(self, archive_name, start=0, limit=None):
+
+        _, versions, _ = self._tables
+
+        res = self._execute(
+            'SELECT record FROM {} WHERE archive_id = ? '
+            'ORDER BY seq LIMIT ? OFFSET ?'.format(versions),
+            (archive_name, -1 if limit is None else limit, start))
+
+        if len(res) == 0:
+            self._check_archive(archive_name)
+
+        return [json.loads(row[0]) for row in res]
+
+    def _get_tags(self, archive_name):
+
+        _, _, tags = self._tables
+
+        res = self._execute(
+            'SELECT tag FROM {} WHERE archive_id = ? '
+            'ORDER BY position'.format(tags),
+            (archive_name,))
+
+        if len(res) == 0:
+            self._check_archive(archive_name)
+
+        return [row[0] for row in res]
+
+    def _get_latest_hash(self, archive_name):
+
+        _, versions, _ = self._tables
+
+        res = self._execute(
+            'SELECT checksum FROM {} WHERE archive_id = ? '
+            'ORDER BY seq DESC LIMIT 1'.format(versions),
+            (archive_name,))
+
+        if len(res) == 0:
+            self._check_archive(archive_name)
+            return None
+
+        return res[0][0]
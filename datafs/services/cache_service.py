@@ -0,0 +1,387 @@
+from __future__ import absolute_import
+
+from datafs.services.service import DataService
+
+import fs.path
+import sqlite3
+import threading
+import time
+
+
+class CacheService(DataService):
+    '''
+    Local cache with access tracking and size-bounded eviction
+
+    The size, last access time, and hit count of each cached file are
+    tracked in a SQLite index in the cache directory. Whenever a file is
+    written to the cache, unpinned files are evicted until the cache fits
+    within ``max_bytes``.
+
+    Parameters
+    ----------
+    fs : object
+        :py:mod:`pyFilesystem` filesystem to use as the cache
+
+    max_bytes : int
+        Maximum total size of cached files in bytes. If None (default), the
+        cache is not limited.
+
+    policy : str
+        Eviction policy. ``'lru'`` (default) evicts the least recently used
+        files first. ``'lfu'`` evicts the least frequently used files first,
+        and then the least recently used.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        >>> from fs.memoryfs import MemoryFS
+        >>> cache = CacheService(MemoryFS(), max_bytes=10)
+        >>> _ = cache.fs.setcontents('a', b'12345')
+        >>> cache.record_write('a')
+        []
+        >>> _ = cache.fs.setcontents('b', b'12345678')
+        >>> cache.record_write('b') == ['a']
+        True
+        >>> cache.get_stats()['evictions']
+        1
+
+    '''
+
+    IndexName = '.datafs_cache.db'
+
+    POLICIES = ('lru', 'lfu')
+
+    STATS = ('hits', 'misses', 'evictions', 'bytes_evicted')
+
+    def __init__(self, fs, max_bytes=None, policy='lru'):
+        DataService.__init__(self, fs)
+
+        if policy not in self.POLICIES:
+            raise ValueError(
+                'Cache policy "{}" not recognized. Choose from {}'.format(
+                    policy, self.POLICIES))
+
+        self.max_bytes = max_bytes
+        self.policy = policy
+
+        if self.fs.hassyspath(''):
+            db_path = self.fs.getsyspath(self.IndexName)
+        else:
+            db_path = ':memory:'
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'CREATE TABLE IF NOT EXISTS entries ('
+                    'path TEXT PRIMARY KEY, '
+                    'size INTEGER NOT NULL, '
+                    'last_access REAL NOT NULL, '
+                    'hits INTEGER NOT NULL DEFAULT 0, '
+                    'pinned INTEGER NOT NULL DEFAULT 0)')
+
+                self._conn.execute(
+                    'CREATE TABLE IF NOT EXISTS stats ('
+                    'name TEXT PRIMARY KEY, '
+                    'value INTEGER NOT NULL)')
+
+                for stat in self.STATS:
+                    self._conn.execute(
+                        'INSERT OR IGNORE INTO stats (name, value) '
+                        'VALUES (?, 0)', (stat,))
+
+        self.reconcile()
+
+    def upload(self, filepath, service_path, remove=False):
+        DataService.upload(self, filepath, service_path, remove=remove)
+        self.record_write(service_path)
+
+    def _increment(self, **counts):
+        for name, value in counts.items():
+            self._conn.execute(
+                'UPDATE stats SET value = value + ? WHERE name = ?',
+                (value, name))
+
+    @staticmethod
+    def _normpath(path):
+        return fs.path.relpath(fs.path.normpath(path))
+
+    @staticmethod
+    def _is_index_file(path):
+        # Index databases kept in the cache directory (such as this one and
+        # the API's hash index) are not cache entries
+        return path.startswith('.datafs_')
+
+    def record_access(self, path, hit=True):
+        '''
+        Record a read of ``path`` from the cache
+
+        Parameters
+        ----------
+        path : str
+            Path of the file on the cache filesystem
+
+        hit : bool
+            True if the cached file was up to date, False if it had to be
+            fetched from the authority
+        '''
+
+        path = self._normpath(path)
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'UPDATE entries SET last_access = ?, hits = hits + 1 '
+                    'WHERE path = ?',
+                    (time.time(), path))
+
+                if hit:
+                    self._increment(hits=1)
+                else:
+                    self._increment(misses=1)
+
+    def record_write(self, path):
+        '''
+        Record a file written to the cache and enforce the size limit
+
+        The file at ``path`` is never evicted by this call.
+
+        Returns
+        -------
+        evicted : list
+            Paths of the files evicted from the cache
+        '''
+
+        path = self._normpath(path)
+        size = self.fs.getsize(path)
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR IGNORE INTO entries (path, size, last_access) '
+                    'VALUES (?, ?, ?)',
+                    (path, size, time.time()))
+
+                self._conn.execute(
+                    'UPDATE entries SET size = ?, last_access = ? '
+                    'WHERE path = ?',
+                    (size, time.time(), path))
+
+            return self.evict(protect=path)
+
+    def discard(self, path):
+        '''
+        Remove ``path`` from the index without counting an eviction
+        '''
+
+        path = self._normpath(path)
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'DELETE FROM entries WHERE path = ?', (path,))
+
+    def pin(self, path):
+        '''
+        Exempt ``path`` from eviction
+        '''
+
+        self._set_pinned(path, True)
+
+    def unpin(self, path):
+        '''
+        Allow ``path`` to be evicted
+        '''
+
+        self._set_pinned(path, False)
+
+    def _set_pinned(self, path, pinned):
+
+        path = self._normpath(path)
+
+        if not self.fs.isfile(path):
+            raise ValueError('"{}" is not cached'.format(path))
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR IGNORE INTO entries (path, size, last_access) '
+                    'VALUES (?, ?, ?)',
+                    (path, self.fs.getsize(path), time.time()))
+
+                self._conn.execute(
+                    'UPDATE entries SET pinned = ? WHERE path = ?',
+                    (int(pinned), path))
+
+    def is_pinned(self, path):
+
+        path = self._normpath(path)
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT pinned FROM entries WHERE path = ?',
+                (path,)).fetchone()
+
+        return row is not None and bool(row[0])
+
+    def evict(self, max_bytes=None, protect=None):
+        '''
+        Evict unpinned files until the cache fits within ``max_bytes``
+
+        Parameters
+        ----------
+        max_bytes : int
+            Size limit in bytes (default ``self.max_bytes``). If both are
+            None, nothing is evicted.
+
+        protect : str
+            Path of a file which should not be evicted (optional)
+
+        Returns
+        -------
+        evicted : list
+            Paths of the files evicted from the cache
+        '''
+
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+
+        if max_bytes is None:
+            return []
+
+        if protect is not None:
+            protect = self._normpath(protect)
+
+        if self.policy == 'lfu':
+            order = 'hits, last_access'
+        else:
+            order = 'last_access'
+
+        evicted = []
+
+        with self._lock:
+            with self._conn:
+                total = self._get_total_bytes()
+
+                if total <= max_bytes:
+                    return evicted
+
+                candidates = self._conn.execute(
+                    'SELECT path, size FROM entries WHERE pinned = 0 '
+                    'ORDER BY {}'.format(order)).fetchall()
+
+                for path, size in candidates:
+                    if total <= max_bytes:
+                        break
+
+                    if path == protect:
+                        continue
+
+                    if self.fs.isfile(path):
+                        self.fs.remove(path)
+
+                    self._conn.execute(
+                        'DELETE FROM entries WHERE path = ?', (path,))
+
+                    total -= size
+                    evicted.append(path)
+
+                    self._increment(evictions=1, bytes_evicted=size)
+
+        return evicted
+
+    def clear(self):
+        '''
+        Evict all unpinned files from the cache
+
+        Returns
+        -------
+        evicted : list
+            Paths of the files evicted from the cache
+        '''
+
+        self.reconcile()
+        return self.evict(max_bytes=0)
+
+    def reconcile(self):
+        '''
+        Synchronize the index with the files on the cache filesystem
+
+        Index entries of removed files are dropped, and files added to the
+        cache without being recorded are indexed using their modification
+        time as their last access.
+        '''
+
+        with self._lock:
+            with self._conn:
+                indexed = set(
+                    row[0] for row in self._conn.execute(
+                        'SELECT path FROM entries'))
+
+                present = set()
+
+                for path in self.fs.walkfiles('/'):
+                    path = self._normpath(path)
+
+                    if self._is_index_file(path):
+                        continue
+
+                    present.add(path)
+
+                    if path in indexed:
+                        continue
+
+                    info = self.fs.getinfo(path)
+
+                    modified = info.get('modified_time', None)
+                    if modified is not None:
+                        last_access = time.mktime(modified.timetuple())
+                    else:
+                        last_access = time.time()
+
+                    self._conn.execute(
+                        'INSERT INTO entries (path, size, last_access) '
+                        'VALUES (?, ?, ?)',
+                        (path, info.get('size', 0), last_access))
+
+                for path in indexed - present:
+                    self._conn.execute(
+                        'DELETE FROM entries WHERE path = ?', (path,))
+
+    def _get_total_bytes(self):
+        return self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def get_stats(self):
+        '''
+        Returns cache statistics
+
+        Returns
+        -------
+        stats : dict
+            Dictionary with the cumulative number of ``hits``, ``misses``,
+            ``evictions`` and ``bytes_evicted``, the current number of
+            ``entries``, ``pinned`` entries and total ``bytes``, and the
+            ``max_bytes`` limit
+        '''
+
+        with self._lock:
+            stats = dict(self._conn.execute(
+                'SELECT name, value FROM stats').fetchall())
+
+            stats['entries'], stats['pinned'] = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(pinned), 0) '
+                'FROM entries').fetchone()
+
+            stats['bytes'] = self._get_total_bytes()
+
+        stats['max_bytes'] = self.max_bytes
+
+        return stats
+
+    def close(self):
+        self._conn.close()
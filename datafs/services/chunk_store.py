@@ -0,0 +1,259 @@
+from __future__ import absolute_import
+
+import hashlib
+import fs.path
+
+
+def _build_gear_table():
+    '''
+    Build the 256-entry table of pseudo-random 32-bit values for gear hashing
+
+    Values are derived from md5 digests so that chunk boundaries are stable
+    across platforms and python versions.
+    '''
+
+    return [
+        int(hashlib.md5(str(i).encode('ascii')).hexdigest()[:8], 16)
+        for i in range(256)]
+
+
+_GEAR = _build_gear_table()
+
+
+def iter_chunks(f, min_size, avg_size, max_size):
+    '''
+    Split a binary file-like object into content-defined chunks
+
+    Chunk boundaries are found with a gear rolling hash, so an edit to a file
+    only changes the chunks around the edit. Chunks which are unaffected by
+    the edit keep their boundaries (and therefore their checksums), even if
+    data is inserted or removed before them.
+
+    Parameters
+    ----------
+    f : file-like
+        Binary file-like object to read from
+
+    min_size : int
+        Minimum chunk size in bytes. No boundaries are searched for in the
+        first ``min_size`` bytes of a chunk.
+
+    avg_size : int
+        Target average chunk size in bytes. Rounded down to a power of two.
+
+    max_size : int
+        Maximum chunk size in bytes
+
+    Yields
+    ------
+    chunk : bytes
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        >>> import io
+        >>> import random
+        >>> rand = random.Random(0)
+        >>> data = bytes(bytearray(rand.randint(0, 255) for _ in range(20000)))
+        >>> chunks = list(iter_chunks(io.BytesIO(data), 256, 1024, 4096))
+        >>> b''.join(chunks) == data
+        True
+        >>> all(len(c) <= 4096 for c in chunks)
+        True
+
+    Inserting data near the start of a file only changes the first chunk:
+
+    .. code-block:: python
+
+        >>> edited = b'inserted' + data
+        >>> edited_chunks = list(
+        ...     iter_chunks(io.BytesIO(edited), 256, 1024, 4096))
+        >>> len(set(chunks) - set(edited_chunks))
+        1
+
+    '''
+
+    bits = max(avg_size.bit_length() - 1, 1)
+    mask = ((1 << bits) - 1) << (32 - bits)
+
+    gear = _GEAR
+    buf = bytearray()
+    eof = False
+
+    while True:
+
+        while not eof and len(buf) < max_size:
+            data = f.read(max_size)
+
+            if not data:
+                eof = True
+            else:
+                buf.extend(data)
+
+        if len(buf) == 0:
+            return
+
+        end = min(len(buf), max_size)
+        cut = end
+
+        if end > min_size:
+            h = 0
+            pos = min_size
+
+            for byte in buf[min_size:end]:
+                pos += 1
+                h = ((h << 1) + gear[byte]) & 0xFFFFFFFF
+
+                if not h & mask:
+                    cut = pos
+                    break
+
+        yield bytes(buf[:cut])
+        del buf[:cut]
+
+
+class ChunkStore(object):
+    '''
+    Deduplicating store of content-addressed file chunks
+
+    Files are split with :py:func:`iter_chunks` and each chunk is stored once,
+    under its sha256 checksum, in a shared directory on a
+    :py:mod:`pyFilesystem` filesystem. A file is described by its manifest,
+    the ordered list of its chunks.
+
+    Parameters
+    ----------
+    filesystem : object
+        :py:mod:`pyFilesystem` filesystem on which to store chunks
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        >>> import io
+        >>> from fs.memoryfs import MemoryFS
+        >>> store = ChunkStore(MemoryFS())
+        >>> manifest = store.store(io.BytesIO(b'some data'))
+        >>> manifest[0]['size']
+        9
+        >>> out = io.BytesIO()
+        >>> store.assemble(manifest, out)
+        >>> out.getvalue() == b'some data'
+        True
+
+    '''
+
+    ChunkDirectory = '.chunks'
+
+    MinChunkSize = 256 * 1024
+    AvgChunkSize = 1024 * 1024
+    MaxChunkSize = 4 * 1024 * 1024
+
+    def __init__(self, filesystem):
+        self.fs = filesystem
+
+    def get_chunk_path(self, checksum):
+        '''
+        Returns the storage path of a chunk given its checksum
+        '''
+
+        return fs.path.join(self.ChunkDirectory, checksum[:2], checksum)
+
+    def has_chunk(self, checksum):
+        return self.fs.isfile(self.get_chunk_path(checksum))
+
+    def store(self, f):
+        '''
+        Split a file into chunks and store all chunks not already present
+
+        Parameters
+        ----------
+        f : file-like
+            Binary file-like object to store
+
+        Returns
+        -------
+        manifest : list
+            List of ``{'checksum': sha256 hexdigest, 'size': bytes}`` chunk
+            descriptions, in file order
+        '''
+
+        manifest = []
+
+        for chunk in iter_chunks(
+                f,
+                self.MinChunkSize,
+                self.AvgChunkSize,
+                self.MaxChunkSize):
+
+            checksum = hashlib.sha256(chunk).hexdigest()
+
+            if not self.has_chunk(checksum):
+                self._put_chunk(checksum, chunk)
+
+            manifest.append({'checksum': checksum, 'size': len(chunk)})
+
+        return manifest
+
+    def store_file(self, filesystem, path):
+        '''
+        Store a file from a :py:mod:`pyFilesystem` filesystem
+
+        Returns
+        -------
+        manifest : list
+            See :py:meth:`~ChunkStore.store`
+        '''
+
+        with filesystem.open(path, 'rb') as f:
+            return self.store(f)
+
+    def assemble(self, manifest, f):
+        '''
+        Write the chunks listed in a manifest to a binary file-like object
+
+        Raises
+        ------
+        IOError
+            If a stored chunk is missing or does not match its checksum
+        '''
+
+        for chunk_spec in manifest:
+            checksum = chunk_spec['checksum']
+            path = self.get_chunk_path(checksum)
+
+            if not self.fs.isfile(path):
+                raise IOError('Chunk "{}" not found'.format(checksum))
+
+            chunk = self.fs.getcontents(path, 'rb')
+
+            if hashlib.sha256(chunk).hexdigest() != checksum:
+                raise IOError('Chunk "{}" is corrupt'.format(checksum))
+
+            f.write(chunk)
+
+    def restore(self, manifest, filesystem, path):
+        '''
+        Reassemble a file from its manifest onto a filesystem
+        '''
+
+        filesystem.makedir(
+            fs.path.dirname(path), recursive=True, allow_recreate=True)
+
+        with filesystem.open(path, 'wb') as f:
+            self.assemble(manifest, f)
+
+    def _put_chunk(self, checksum, chunk):
+        path = self.get_chunk_path(checksum)
+        tmp_path = path + '.tmp'
+
+        self.fs.makedir(
+            fs.path.dirname(path), recursive=True, allow_recreate=True)
+
+        # write then rename so an interrupted upload never leaves a partial
+        # chunk under a valid checksum
+        self.fs.setcontents(tmp_path, chunk)
+        self.fs.rename(tmp_path, path)
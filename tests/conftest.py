@@ -44,7 +44,7 @@ def pytest_generate_tests(metafunc):
 
     if 'mgr_name' in metafunc.fixturenames:
 
-        metafunc.parametrize('mgr_name', ['mongo', 'dynamo'])
+        metafunc.parametrize('mgr_name', ['mongo', 'dynamo', 'sqlite'])
         # metafunc.parametrize('mgr_name', ['mongo'])
 
     if 'fs_name' in metafunc.fixturenames:
@@ -473,6 +473,12 @@ def api_with_diverse_archives(request):
                         for item in new_archives:
                             batch.put_item(Item=item)
 
+                    with api.manager._tag_table.batch_writer() as batch:
+                        for item in new_archives:
+                            for tag in set(item['tags']):
+                                batch.put_item(
+                                    Item={'tag': tag, '_id': item['_id']})
+
                 else:
                     raise ValueError('Manager "{}" not recognized'.format(
                         request.param))
@@ -2,10 +2,12 @@
 from contextlib import contextmanager
 from datafs.managers.manager_dynamo import DynamoDBManager
 from datafs.managers.manager_mongo import MongoDBManager
+from datafs.managers.manager_sqlite import SQLiteManager
 from distutils.version import StrictVersion
 
 import os
 import shutil
+import tempfile
 import time
 
 has_special_dependencies = False
@@ -99,5 +101,24 @@ def prep_manager(mgr_name, table_name='my-new-data-table'):
                 table_name,
                 raise_on_err=False)
 
+    elif mgr_name == 'sqlite':
+
+        # Managers share a database, like the mongo and dynamo test servers
+        manager_sqlite = SQLiteManager(
+            os.path.join(tempfile.gettempdir(), 'datafs-test.db'),
+            table_name)
+
+        manager_sqlite.create_archive_table(
+            table_name,
+            raise_on_err=False)
+
+        try:
+            yield manager_sqlite
+
+        finally:
+            manager_sqlite.delete_table(
+                table_name,
+                raise_on_err=False)
+
     else:
         raise ValueError('Manager "{}" not recognized'.format(mgr_name))
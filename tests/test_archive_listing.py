@@ -0,0 +1,114 @@
+from __future__ import absolute_import
+
+from datafs._compat import u
+
+import pytest
+
+
+@pytest.yield_fixture
+def counted_api(api):
+    '''
+    Count the number of full archive listings fetched from the manager
+    '''
+
+    calls = []
+    get_archive_listing = api.manager.get_archive_listing
+
+    def counter(archive_name):
+        calls.append(archive_name)
+        return get_archive_listing(archive_name)
+
+    api.manager.get_archive_listing = counter
+    api.LISTING_CALLS = calls
+
+    yield api
+
+
+def test_update_uses_one_listing(counted_api, tempdir):
+
+    archive = counted_api.create('listing_archive')
+
+    fp = tempdir + '/test_file.txt'
+
+    with open(fp, 'w+') as f:
+        f.write('update 1')
+
+    del counted_api.LISTING_CALLS[:]
+    archive.update(fp, dependencies={})
+    assert len(counted_api.LISTING_CALLS) == 1
+
+    with open(fp, 'w+') as f:
+        f.write('update 2')
+
+    del counted_api.LISTING_CALLS[:]
+    archive.update(fp)
+    assert len(counted_api.LISTING_CALLS) == 1
+
+    assert archive.get_latest_version() == '0.0.2'
+
+
+def test_open_uses_one_listing(counted_api):
+
+    archive = counted_api.create('listing_archive')
+
+    del counted_api.LISTING_CALLS[:]
+
+    with archive.open('w+') as f:
+        f.write(u('write 1'))
+
+    assert len(counted_api.LISTING_CALLS) == 1
+
+    del counted_api.LISTING_CALLS[:]
+
+    with archive.open('r') as f:
+        assert f.read() == u('write 1')
+
+    assert len(counted_api.LISTING_CALLS) == 1
+
+
+def test_listing_ttl_and_refresh(counted_api):
+
+    archive = counted_api.create('listing_archive')
+
+    with archive.open('w+') as f:
+        f.write(u('write 1'))
+
+    # Without a TTL, each operation sees the latest state of the manager
+    del counted_api.LISTING_CALLS[:]
+
+    for _ in range(3):
+        archive.get_latest_version()
+
+    assert len(counted_api.LISTING_CALLS) == 3
+
+    # With a TTL, repeated reads share a snapshot
+    counted_api.ListingTTL = 60
+    archive.refresh()
+    del counted_api.LISTING_CALLS[:]
+
+    for _ in range(3):
+        assert archive.get_latest_version() == '0.0.1'
+        archive.get_version_hash()
+
+    assert len(counted_api.LISTING_CALLS) == 1
+
+    archive.refresh()
+    archive.get_latest_version()
+    assert len(counted_api.LISTING_CALLS) == 2
+
+    # Writes through the archive invalidate the snapshot
+    with archive.open('w+') as f:
+        f.write(u('write 2'))
+
+    assert archive.get_latest_version() == '0.0.2'
+
+    # Writes from another archive object are not seen until refresh
+    other = counted_api.get_archive('listing_archive')
+
+    with other.open('w+') as f:
+        f.write(u('write 3'))
+
+    assert archive.get_latest_version() == '0.0.2'
+
+    archive.refresh()
+    assert archive.get_latest_version() == '0.0.3'
@@ -0,0 +1,87 @@
+from __future__ import absolute_import
+
+from datafs._compat import u
+
+import pytest
+
+
+def test_batch_create(api):
+
+    api.create('existing_archive')
+
+    def no_reads(*args, **kwargs):
+        raise AssertionError('Archive read back from the manager')
+
+    api.manager.get_archive = no_reads
+
+    archives, failures = api.batch_create(
+        {
+            'batch/archive0': {},
+            'batch/archive1': {'tags': ['tag1', 'Tag2']},
+            'batch/archive2': {
+                'versioned': False,
+                'metadata': {'description': 'archive 2'}},
+            'existing_archive': {},
+            'bad_authority://batch/archive3': {}},
+        tags=['default'])
+
+    del api.manager.get_archive
+
+    assert sorted(archives) == [
+        'batch/archive0', 'batch/archive1', 'batch/archive2']
+
+    assert sorted(failures) == [
+        'bad_authority://batch/archive3', 'existing_archive']
+
+    assert isinstance(failures['existing_archive'], KeyError)
+    assert isinstance(failures['bad_authority://batch/archive3'], ValueError)
+
+    assert not archives['batch/archive2'].versioned
+    assert archives['batch/archive0'].authority_name == 'filesys'
+
+    assert archives['batch/archive0'].get_tags() == ['default']
+    assert sorted(archives['batch/archive1'].get_tags()) == ['tag1', 'tag2']
+    assert archives['batch/archive2'].get_metadata() == {
+        'description': 'archive 2'}
+
+    assert sorted(api.search('default')) == [
+        'batch/archive0', 'batch/archive2']
+
+    with archives['batch/archive1'].open('w+') as f:
+        f.write(u('batch contents'))
+
+    with api.get_archive('batch/archive1').open('r') as f:
+        assert f.read() == u('batch contents')
+
+
+def test_batch_create_required_metadata(api):
+
+    api.manager.set_required_archive_metadata({'description': 'Describe'})
+
+    archives, failures = api.batch_create(
+        ['batch/archive{}'.format(i) for i in range(60)],
+        metadata={'description': 'batch archive'})
+
+    assert len(archives) == 60
+    assert failures == {}
+
+    archives, failures = api.batch_create(
+        {
+            'batch/archive0': {},
+            'batch/archive60': {'metadata': {}},
+            'batch/archive61': {}},
+        metadata={'description': 'batch archive'})
+
+    assert sorted(archives) == ['batch/archive61']
+    assert isinstance(failures['batch/archive0'], KeyError)
+    assert isinstance(failures['batch/archive60'], AssertionError)
+
+    assert len(list(api.filter(prefix='batch/'))) == 61
+
+    with pytest.raises(ValueError):
+        api.manager.batch_create_archives([
+            {
+                'archive_name': 'a',
+                'authority_name': 'filesys',
+                'archive_path': 'a',
+                'versioned': True}] * 2)
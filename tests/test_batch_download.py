@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+
+from datafs._compat import u
+
+import os
+import pytest
+
+
+@pytest.yield_fixture
+def archives_to_download(api):
+
+    archives = {}
+
+    for i in range(5):
+        archive = api.create('batch/archive{}'.format(i))
+
+        with archive.open('w+') as f:
+            f.write(u('archive {} version 0.0.1'.format(i)))
+
+        with archive.open('w+') as f:
+            f.write(u('archive {} version 0.0.2'.format(i)))
+
+        archives[archive.archive_name] = archive
+
+    yield archives
+
+
+def test_batch_download(api, archives_to_download, tempdir):
+
+    calls = []
+    batch_get_archive_listing = api.manager.batch_get_archive_listing
+
+    def counter(archive_names):
+        calls.append(archive_names)
+        return batch_get_archive_listing(archive_names)
+
+    api.manager.batch_get_archive_listing = counter
+
+    filepaths = {
+        archive_name: os.path.join(tempdir, '{}.txt'.format(i))
+        for i, archive_name in enumerate(sorted(archives_to_download))}
+
+    paths, failures = api.batch_download(filepaths, max_workers=3)
+
+    assert len(calls) == 1
+    assert failures == {}
+    assert paths == filepaths
+
+    for i, archive_name in enumerate(sorted(archives_to_download)):
+        with open(paths[archive_name], 'r') as f:
+            assert f.read() == 'archive {} version 0.0.2'.format(i)
+
+    # Specific versions may be requested, and missing archives are reported
+    filepaths['batch/missing'] = os.path.join(tempdir, 'missing.txt')
+
+    paths, failures = api.batch_download(
+        filepaths, versions={'batch/archive0': '0.0.1'})
+
+    assert set(failures.keys()) == {'batch/missing'}
+    assert isinstance(failures['batch/missing'], KeyError)
+
+    with open(paths['batch/archive0'], 'r') as f:
+        assert f.read() == 'archive 0 version 0.0.1'
+
+    with open(paths['batch/archive1'], 'r') as f:
+        assert f.read() == 'archive 1 version 0.0.2'
+
+
+def test_batch_download_verifies_checksum(
+        api, archives_to_download, tempdir):
+
+    # Corrupt the authority's copy of one archive
+    archive = archives_to_download['batch/archive2']
+    archive.authority.fs.setcontents(
+        archive.get_version_path(), b'corrupted data')
+
+    filepaths = {
+        archive_name: os.path.join(tempdir, '{}.txt'.format(i))
+        for i, archive_name in enumerate(sorted(archives_to_download))}
+
+    paths, failures = api.batch_download(filepaths)
+
+    assert set(failures.keys()) == {'batch/archive2'}
+    assert isinstance(failures['batch/archive2'], IOError)
+    assert not os.path.exists(filepaths['batch/archive2'])
+    assert len(paths) == 4
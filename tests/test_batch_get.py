@@ -0,0 +1,134 @@
+from __future__ import absolute_import
+
+from datafs.managers import manager_dynamo
+from tests.resources import prep_manager
+
+import threading
+import time
+
+
+def test_iter_batch_get_archive(api, monkeypatch):
+
+    monkeypatch.setattr(api.manager, 'BatchPageSize', 3)
+
+    names = ['batch/archive{}'.format(i) for i in range(8)]
+    api.batch_create(names, tags=['batch'])
+
+    consumed = []
+
+    def archive_names():
+        for name in names + ['batch/missing']:
+            consumed.append(name)
+            yield name
+
+    archives = api.iter_batch_get_archive(archive_names(), default_versions={
+        'batch/archive0': '0.0.1'})
+
+    # Names are consumed one page at a time
+    first = next(archives)
+    assert len(consumed) == 3
+
+    archives = [first] + list(archives)
+
+    assert sorted(a.archive_name for a in archives) == names
+    assert len(consumed) == 9
+
+    for archive in archives:
+        if archive.archive_name == 'batch/archive0':
+            assert archive._default_version == '0.0.1'
+        else:
+            assert archive._default_version is None
+
+        assert archive.get_tags() == ['batch']
+
+
+def test_dynamo_unprocessed_keys(monkeypatch):
+
+    with prep_manager('dynamo', table_name='batch-get-test') as manager:
+
+        names = ['archive{}'.format(i) for i in range(5)]
+
+        for name in names:
+            manager.create_archive(
+                name, authority_name='auth', archive_path=name, versioned=True)
+
+        client = manager._resource.meta.client
+        batch_get_item = client.batch_get_item
+        requests = []
+
+        def throttled(RequestItems):
+            '''
+            Leave all but one key unprocessed
+            '''
+
+            keys = RequestItems[manager._table_name]['Keys']
+            requests.append(len(keys))
+
+            res = batch_get_item(RequestItems={
+                manager._table_name: {'Keys': keys[:1]}})
+
+            if len(keys) > 1:
+                res['UnprocessedKeys'] = {
+                    manager._table_name: {'Keys': keys[1:]}}
+
+            return res
+
+        delays = []
+
+        monkeypatch.setattr(client, 'batch_get_item', throttled)
+        monkeypatch.setattr(manager_dynamo.time, 'sleep', delays.append)
+
+        listings = manager.batch_get_archive_listing(names)
+
+        assert sorted(listing['_id'] for listing in listings) == names
+        assert requests == [5, 4, 3, 2, 1]
+
+        # Delays are randomized below an exponentially increasing limit
+        assert len(delays) == 4
+
+        for attempt, delay in enumerate(delays):
+            assert 0 <= delay <= manager.RetryDelay * 2 ** attempt
+
+
+def test_dynamo_concurrent_pages(monkeypatch):
+
+    with prep_manager('dynamo', table_name='concurrent-get-test') as manager:
+
+        names = ['archive{}'.format(i) for i in range(9)]
+
+        for name in names:
+            manager.create_archive(
+                name, authority_name='auth', archive_path=name, versioned=True)
+
+        monkeypatch.setattr(manager, 'BatchPageSize', 2)
+        monkeypatch.setattr(manager, 'MaxInFlightPages', 3)
+
+        client = manager._resource.meta.client
+        batch_get_item = client.batch_get_item
+
+        lock = threading.Lock()
+        in_flight = {'current': 0, 'max': 0}
+
+        def slow(**kwargs):
+            with lock:
+                in_flight['current'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['current'])
+
+            time.sleep(0.2)
+
+            try:
+                return batch_get_item(**kwargs)
+
+            finally:
+                with lock:
+                    in_flight['current'] -= 1
+
+        monkeypatch.setattr(client, 'batch_get_item', slow)
+
+        pages = list(manager._iter_batch_get_archive_listing(names))
+
+        # Pages are returned in order
+        assert [sorted(item['_id'] for item in page) for page in pages] == [
+            names[i:i + 2] for i in range(0, 9, 2)]
+
+        assert in_flight['max'] == 3
@@ -0,0 +1,73 @@
+from __future__ import absolute_import
+
+from datafs._compat import u
+
+import os
+
+
+def test_batch_update(api, tempdir):
+
+    filepaths = {}
+
+    for i in range(5):
+        archive = api.create('batch/archive{}'.format(i))
+
+        filepaths[archive.archive_name] = os.path.join(
+            tempdir, '{}.txt'.format(i))
+
+        with open(filepaths[archive.archive_name], 'w+') as f:
+            f.write('archive {} contents'.format(i))
+
+    # A file matching the latest version is not registered again
+    unchanged = api.create('batch/unchanged')
+    unchanged.update(filepaths['batch/archive0'])
+
+    filepaths['batch/unchanged'] = filepaths['batch/archive0']
+    filepaths['batch/missing'] = filepaths['batch/archive0']
+
+    calls = []
+    batch_update = api.manager.batch_update
+
+    def counter(version_records):
+        calls.append(sorted(version_records))
+        return batch_update(version_records)
+
+    api.manager.batch_update = counter
+
+    updated, failures = api.batch_update(
+        filepaths, max_workers=3, bumpversion='minor', message='batch')
+
+    assert calls == [['batch/archive{}'.format(i) for i in range(5)]]
+
+    assert updated == dict(
+        [('batch/archive{}'.format(i), True) for i in range(5)] +
+        [('batch/unchanged', False)])
+
+    assert list(failures.keys()) == ['batch/missing']
+    assert isinstance(failures['batch/missing'], KeyError)
+
+    for i in range(5):
+        archive = api.get_archive('batch/archive{}'.format(i))
+
+        assert archive.get_versions() == ['0.1']
+        assert archive.get_history()[-1]['message'] == 'batch'
+
+        with archive.open('r') as f:
+            assert f.read() == u('archive {} contents'.format(i))
+
+    assert unchanged.get_versions() == ['0.0.1']
+
+
+def test_batch_update_manager_failures(api):
+
+    api.create('batch/archive')
+
+    failures = api.manager.batch_update({
+        'batch/archive': {'version': '0.0.1', 'checksum': 'abc'},
+        'batch/missing': {'version': '0.0.1', 'checksum': 'abc'}})
+
+    assert list(failures.keys()) == ['batch/missing']
+    assert isinstance(failures['batch/missing'], KeyError)
+
+    assert api.manager.get_latest_hash('batch/archive') == 'abc'
+    assert api.manager.batch_update({}) == {}
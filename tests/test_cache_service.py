@@ -0,0 +1,214 @@
+from __future__ import absolute_import
+
+from datafs.services.cache_service import CacheService
+from datafs.datafs import cli
+from datafs import get_api
+from datafs._compat import u
+from tests.resources import prep_manager
+
+from click.testing import CliRunner
+from fs.osfs import OSFS
+
+import os
+import pytest
+import traceback
+
+
+def _write(service, path, contents):
+    service.fs.setcontents(path, contents)
+    return service.record_write(path)
+
+
+def test_lru_eviction(cache):
+
+    service = CacheService(cache, max_bytes=20)
+
+    assert _write(service, 'a', b'0123456789') == []
+    assert _write(service, 'b', b'0123456789') == []
+
+    # Reading "a" makes "b" the least recently used file
+    service.record_access('a')
+
+    assert _write(service, 'c', b'0123456789') == ['b']
+    assert sorted(cache.listdir()) == ['.datafs_cache.db', 'a', 'c']
+
+    # A file larger than the limit is not evicted by its own write
+    assert sorted(_write(service, 'd', b'0' * 30)) == ['a', 'c']
+    assert cache.isfile('d')
+
+    stats = service.get_stats()
+    assert stats['hits'] == 1
+    assert stats['evictions'] == 3
+    assert stats['bytes_evicted'] == 30
+    assert stats['entries'] == 1
+    assert stats['bytes'] == 30
+
+
+def test_lfu_eviction(cache):
+
+    service = CacheService(cache, max_bytes=20, policy='lfu')
+
+    _write(service, 'a', b'0123456789')
+    _write(service, 'b', b'0123456789')
+
+    for _ in range(3):
+        service.record_access('a')
+
+    service.record_access('b')
+
+    # "b" is more recently used, but "a" is used more often
+    assert _write(service, 'c', b'0123456789') == ['b']
+
+    with pytest.raises(ValueError):
+        CacheService(cache, policy='not-a-policy')
+
+
+def test_pinned_files_not_evicted(cache):
+
+    service = CacheService(cache, max_bytes=20)
+
+    _write(service, 'a', b'0123456789')
+    service.pin('a')
+    assert service.is_pinned('a')
+
+    _write(service, 'b', b'0123456789')
+    assert _write(service, 'c', b'0123456789') == ['b']
+
+    assert service.clear() == ['c']
+    assert sorted(cache.listdir()) == ['.datafs_cache.db', 'a']
+
+    service.unpin('a')
+    assert service.clear() == ['a']
+
+    with pytest.raises(ValueError):
+        service.pin('a')
+
+
+def test_index_persists(cache):
+
+    service = CacheService(cache)
+    _write(service, 'a', b'0123456789')
+    service.record_access('a', hit=False)
+    service.pin('a')
+    service.close()
+
+    # Files added outside the service are picked up on startup
+    cache.setcontents('b', b'01234')
+
+    service = CacheService(cache, max_bytes=10)
+
+    stats = service.get_stats()
+    assert stats['misses'] == 1
+    assert stats['entries'] == 2
+    assert stats['pinned'] == 1
+    assert stats['bytes'] == 15
+
+    assert service.evict() == ['b']
+
+
+def test_api_cache_limit(api, cache, opener):
+
+    api.attach_cache(cache, max_bytes=30)
+
+    archives = []
+
+    for i in range(3):
+        archive = api.create('cached_archive_{}'.format(i), versioned=False)
+        archive.cache()
+
+        with opener(archive, 'w+') as f:
+            f.write(u('archive {} contents'.format(i)))
+
+        archives.append(archive)
+
+    # Each file is 18 bytes, so only the most recent write fits
+    assert not cache.isfile(archives[0].get_version_path())
+    assert not cache.isfile(archives[1].get_version_path())
+    assert cache.isfile(archives[2].get_version_path())
+
+    assert api.cache.get_stats()['evictions'] == 2
+
+    # Evicted files are read from the authority
+    for i, archive in enumerate(archives):
+        with opener(archive, 'r') as f:
+            assert f.read() == u('archive {} contents'.format(i))
+
+    assert api.cache.get_stats()['hits'] > 0
+
+
+@pytest.yield_fixture
+def cache_config(tempdir, temp_file):
+
+    authority_dir = os.path.join(tempdir, 'authority').replace(os.sep, '/')
+    cache_dir = os.path.join(tempdir, 'cache').replace(os.sep, '/')
+
+    os.makedirs(authority_dir)
+    os.makedirs(cache_dir)
+
+    with prep_manager('mongo', table_name='cache-cli-table'):
+
+        with open(temp_file, 'w+') as f:
+            f.write('''
+default-profile: myapi
+profiles:
+  myapi:
+    api:
+      user_config: {{}}
+    authorities:
+      local:
+        service: OSFS
+        args: ["{authority}"]
+    cache:
+      service: OSFS
+      args: ["{cache}"]
+      max_bytes: 100
+    manager:
+      class: MongoDBManager
+      kwargs:
+        database_name: MyDatabase
+        table_name: cache-cli-table
+'''.format(authority=authority_dir, cache=cache_dir))
+
+        yield temp_file, cache_dir
+
+
+def test_cache_cli(cache_config):
+
+    config_file, cache_dir = cache_config
+
+    api = get_api(config_file=config_file)
+    assert api.cache.max_bytes == 100
+
+    arch = api.create('cli_cached')
+
+    with arch.open('w+') as f:
+        f.write(u('cached contents'))
+
+    api.close()
+
+    runner = CliRunner()
+    prefix = ['--config-file', config_file, '--profile', 'myapi', 'cache']
+
+    def invoke(*args):
+        result = runner.invoke(cli, prefix + list(args))
+
+        if result.exit_code != 0:
+            traceback.print_exception(*result.exc_info)
+            raise OSError('Errors encountered during execution')
+
+        return result.output
+
+    assert 'pinned cli_cached/0.0.1' in invoke('pin', 'cli_cached')
+
+    cache = OSFS(cache_dir)
+    assert cache.getcontents('cli_cached/0.0.1') == b'cached contents'
+
+    assert 'pinned: 1' in invoke('stats')
+    assert 'max_bytes: 100' in invoke('stats')
+
+    assert 'evicted 0 files' in invoke('clear')
+    assert cache.isfile('cli_cached/0.0.1')
+
+    invoke('unpin', 'cli_cached')
+    assert 'evicted cli_cached/0.0.1' in invoke('prune', '--max-bytes', '0')
+    assert not cache.isfile('cli_cached/0.0.1')
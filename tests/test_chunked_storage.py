@@ -0,0 +1,125 @@
+from __future__ import absolute_import
+
+from datafs.services.chunk_store import ChunkStore
+from datafs._compat import u
+
+import os
+import random
+import pytest
+
+
+@pytest.yield_fixture
+def small_chunks(monkeypatch):
+    '''
+    Use small chunk sizes so that test files span many chunks
+    '''
+
+    monkeypatch.setattr(ChunkStore, 'MinChunkSize', 256)
+    monkeypatch.setattr(ChunkStore, 'AvgChunkSize', 1024)
+    monkeypatch.setattr(ChunkStore, 'MaxChunkSize', 4096)
+
+    yield
+
+
+def _random_text(n, seed=0):
+    rand = random.Random(seed)
+    return ''.join(rand.choice('abcdefghij \n') for _ in range(n))
+
+
+def _count_chunks(archive):
+    return len(list(
+        archive.authority.fs.walkfiles(ChunkStore.ChunkDirectory)))
+
+
+def test_chunked_update_deduplicates(api, small_chunks, tempdir):
+
+    archive = api.create('chunked_archive', chunked=True)
+    assert archive.chunked
+    assert api.get_archive('chunked_archive').chunked
+
+    contents = _random_text(50000)
+
+    fp = os.path.join(tempdir, 'test_file.txt')
+
+    with open(fp, 'w+') as f:
+        f.write(contents)
+
+    archive.update(fp)
+
+    first_count = _count_chunks(archive)
+    assert first_count > 10
+
+    manifest = archive.get_version_manifest()
+    assert sum(c['size'] for c in manifest) == len(contents)
+
+    # versions are not stored as whole files on the authority
+    assert not archive.authority.fs.isfile(archive.get_version_path())
+
+    # a small edit only adds a few chunks
+    with open(fp, 'w+') as f:
+        f.write(contents[:20000] + 'a small edit' + contents[20000:])
+
+    archive.update(fp)
+
+    assert archive.get_latest_version() == '0.0.2'
+    assert 0 < _count_chunks(archive) - first_count <= 3
+
+    with archive.open('r', version='0.0.1') as f:
+        assert f.read() == u(contents)
+
+    with archive.open('r') as f:
+        assert f.read() == u(
+            contents[:20000] + 'a small edit' + contents[20000:])
+
+
+def test_chunked_read_write(api, small_chunks, opener, tempdir):
+
+    archive = api.create('chunked_archive', chunked=True)
+
+    contents = _random_text(10000)
+
+    with opener(archive, 'w+') as f:
+        f.write(u(contents))
+
+    with opener(archive, 'r') as f:
+        assert f.read() == u(contents)
+
+    with opener(archive, 'a') as f:
+        f.write(u('appended'))
+
+    assert archive.get_latest_version() == '0.0.2'
+
+    with opener(archive, 'r') as f:
+        assert f.read() == u(contents + 'appended')
+
+    with opener(archive, 'r', version='0.0.1') as f:
+        assert f.read() == u(contents)
+
+    fp = os.path.join(tempdir, 'test_file.txt')
+    archive.download(fp, version='0.0.1')
+
+    with open(fp, 'r') as f:
+        assert f.read() == contents
+
+
+def test_chunked_cache(api, small_chunks, cache, opener):
+
+    api.attach_cache(cache)
+
+    archive = api.create('chunked_archive', versioned=False, chunked=True)
+    archive.cache()
+
+    with opener(archive, 'w+') as f:
+        f.write(u('cached contents'))
+
+    assert archive.is_cached()
+
+    with opener(archive, 'r') as f:
+        assert f.read() == u('cached contents')
+
+    # the cached copy is used even if chunks are unavailable
+    archive.authority.fs.removedir(
+        ChunkStore.ChunkDirectory, recursive=True, force=True)
+
+    with opener(archive, 'r') as f:
+        assert f.read() == u('cached contents')
@@ -963,6 +963,68 @@ def test_dependency_parsing(sample_config):
     api.delete_archive('dep_archive')
 
 
+@pytest.mark.cli
+def test_recursive_dependencies(sample_config):
+    '''
+    List the dependencies of an archive's dependencies from the CLI
+    '''
+
+    profile, temp_file = sample_config
+
+    api = get_api(profile=profile, config_file=temp_file)
+
+    runner = CliRunner()
+
+    prefix = [
+        '--config-file', '{}'.format(temp_file),
+        '--profile',
+        'myapi']
+
+    dependencies = {
+        'rec_base': {},
+        'rec_inputs': {'rec_base': None},
+        'rec_model': {'rec_inputs': '0.0.1', 'rec_base': '0.0.1'}}
+
+    for archive_name in ['rec_base', 'rec_inputs', 'rec_model']:
+        archive = api.create(archive_name)
+
+        with archive.open(
+                'w+',
+                bumpversion='patch',
+                dependencies=dependencies[archive_name]) as f:
+            f.write(u(archive_name))
+
+    result = runner.invoke(
+        cli, prefix + [
+            'get-dependencies', 'rec_model', '--recursive'])
+
+    if result.exit_code != 0:
+        traceback.print_exception(*result.exc_info)
+        raise OSError('Errors encountered during execution')
+
+    assert result.output.split() == [
+        'rec_base==0.0.1', 'rec_inputs==0.0.1']
+
+    result = runner.invoke(
+        cli, prefix + ['dependents', 'rec_base'])
+
+    if result.exit_code != 0:
+        traceback.print_exception(*result.exc_info)
+        raise OSError('Errors encountered during execution')
+
+    assert result.output.split() == [
+        'rec_inputs==0.0.1', 'rec_model==0.0.1']
+
+    result = runner.invoke(
+        cli, prefix + ['dependents', 'rec_inputs', '--version', '0.0.2'])
+
+    assert result.exit_code == 0
+    assert result.output.strip() == ''
+
+    for archive_name in ['rec_base', 'rec_inputs', 'rec_model']:
+        api.delete_archive(archive_name)
+
+
 @pytest.mark.cli
 def test_update_metadata(sample_config, monkeypatch):
     '''
@@ -1454,3 +1516,66 @@ def test_cli_log_with_various_messages(sample_config):
 
     finally:
         arch.delete()
+
+
+@pytest.mark.cli
+def test_download_many(preloaded_config):
+    '''
+    Test "download-many" CLI command with preloaded archive/config file
+    '''
+
+    profile, temp_file = preloaded_config
+
+    runner = CliRunner()
+
+    prefix = [
+        '--config-file', '{}'.format(temp_file),
+        '--profile', 'myapi']
+
+    with runner.isolated_filesystem():
+
+        with open('requirements_data_download.txt', 'w+') as reqs:
+            reqs.write('/req/arch1==0.1\n')
+            reqs.write('/req/arch2\n')
+            reqs.write('\n')
+            reqs.write('/req/arch3==1.1a1\n')
+
+        result = runner.invoke(
+            cli,
+            prefix + [
+                'download-many',
+                'requirements_data_download.txt',
+                'data',
+                '--workers',
+                '2'])
+
+        if result.exit_code != 0:
+            traceback.print_exception(*result.exc_info)
+            raise OSError('Errors encountered during execution')
+
+        with open(os.path.join('data', 'req', 'arch1'), 'r') as f:
+            assert f.read() == 'this is archive /req/arch1 version 0.1'
+
+        with open(os.path.join('data', 'req', 'arch2'), 'r') as f:
+            assert f.read() == 'this is archive /req/arch2 version 0.0.1'
+
+        with open(os.path.join('data', 'req', 'arch3'), 'r') as f:
+            assert f.read() == 'this is archive /req/arch3 version 1.1a1'
+
+        # Missing archives are reported and set the exit code
+        with open('requirements_data_download.txt', 'w+') as reqs:
+            reqs.write('/req/arch1\n')
+            reqs.write('/req/not_an_archive\n')
+
+        result = runner.invoke(
+            cli,
+            prefix + [
+                'download-many',
+                'requirements_data_download.txt',
+                'data'])
+
+        assert result.exit_code == 1
+        assert 'failed to download req/not_an_archive' in result.output
+
+        with open(os.path.join('data', 'req', 'arch1'), 'r') as f:
+            assert f.read() == 'this is archive /req/arch1 version 1.1'
@@ -0,0 +1,103 @@
+from __future__ import absolute_import
+
+from datafs._compat import u
+
+import pytest
+
+
+def _write(archive, contents, dependencies=None):
+    with archive.open(
+            'w+', bumpversion='patch', dependencies=dependencies) as f:
+        f.write(u(contents))
+
+
+@pytest.fixture
+def pipeline(api):
+
+    base = api.create('base')
+    _write(base, 'base 1')
+    _write(base, 'base 2')
+
+    params = api.create('params', versioned=False)
+    _write(params, 'params')
+
+    inputs = api.create('inputs')
+    _write(inputs, 'inputs', dependencies={'base': '0.0.1'})
+
+    model = api.create('model')
+    _write(model, 'model', dependencies={
+        'inputs': '0.0.1', 'base': None, 'params': None})
+
+    report = api.create('report')
+    _write(report, 'report', dependencies={'model': '0.0.1'})
+
+    return api
+
+
+def test_resolve_dependencies(pipeline, monkeypatch):
+
+    api = pipeline
+
+    requests = []
+    batch_get = api.manager.batch_get_archive_listing
+
+    def counter(archive_names):
+        requests.append(sorted(archive_names))
+        return batch_get(archive_names)
+
+    monkeypatch.setattr(api.manager, 'batch_get_archive_listing', counter)
+
+    graph = api.resolve_dependencies('report')
+
+    # One batch request per level of the graph
+    assert requests == [
+        ['report'], ['model'], ['base', 'inputs', 'params'], ['base']]
+
+    assert graph.root == ('report', '0.0.1')
+    assert len(graph) == 6
+
+    # Unpinned dependencies resolve to the latest version
+    assert sorted(graph.get_dependencies(('model', '0.0.1'))) == [
+        ('base', '0.0.2'), ('inputs', '0.0.1'), ('params', None)]
+
+    assert graph.get_dependencies(('inputs', '0.0.1')) == [('base', '0.0.1')]
+    assert graph.get_archive(('params', None)).archive_name == 'params'
+
+    assert graph.topological_order() == [
+        ('base', '0.0.1'),
+        ('base', '0.0.2'),
+        ('inputs', '0.0.1'),
+        ('params', None),
+        ('model', '0.0.1'),
+        ('report', '0.0.1')]
+
+    assert list(graph) == graph.topological_order()
+
+    shallow = api.resolve_dependencies(api.get_archive('report'), depth=1)
+    assert shallow.nodes == [('report', '0.0.1'), ('model', '0.0.1')]
+    assert shallow.get_dependencies(('model', '0.0.1')) == []
+
+
+def test_resolve_dependency_errors(pipeline):
+
+    api = pipeline
+
+    cycle_a = api.create('cycle_a')
+    cycle_b = api.create('cycle_b')
+    _write(cycle_a, 'a', dependencies={'cycle_b': '0.0.1'})
+    _write(cycle_b, 'b', dependencies={'cycle_a': None})
+
+    with pytest.raises(ValueError) as excinfo:
+        api.resolve_dependencies('cycle_a')
+
+    assert 'cycle_a==0.0.1' in str(excinfo.value)
+
+    broken = api.create('broken')
+    _write(broken, 'broken', dependencies={
+        'base': None, 'missing': '1.0'})
+
+    with pytest.raises(KeyError):
+        api.resolve_dependencies('broken')
+
+    with pytest.raises(ValueError):
+        api.resolve_dependencies('report', version='9.9')
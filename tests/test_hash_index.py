@@ -0,0 +1,102 @@
+from __future__ import absolute_import
+
+from datafs.core.hash_index import HashIndex
+from datafs._compat import u, string_types
+
+import os
+import time
+import pytest
+
+
+@pytest.yield_fixture
+def no_racy_interval(monkeypatch):
+    monkeypatch.setattr(HashIndex, 'RacyInterval', 0)
+    yield
+
+
+def test_hash_index(tempdir, no_racy_interval):
+
+    index = HashIndex(os.path.join(tempdir, 'index.db'))
+
+    fp = os.path.join(tempdir, 'test_file.txt')
+
+    with open(fp, 'w+') as f:
+        f.write('some contents')
+
+    assert index.get(fp, 'md5') is None
+
+    assert index.set(fp, 'md5', 'my checksum')
+    assert index.get(fp, 'md5') == 'my checksum'
+    assert index.get(fp, 'sha256') is None
+
+    # Changing the file invalidates its entry
+    with open(fp, 'w+') as f:
+        f.write('other contents')
+
+    os.utime(fp, (time.time() - 10, time.time() - 10))
+
+    assert index.get(fp, 'md5') is None
+
+    index.set(fp, 'md5', 'new checksum')
+    index.close()
+
+    # The index persists
+    index = HashIndex(os.path.join(tempdir, 'index.db'))
+    assert index.get(fp, 'md5') == 'new checksum'
+
+    index.discard(fp)
+    assert index.get(fp, 'md5') is None
+
+
+def test_racily_clean_files_not_indexed(tempdir):
+
+    index = HashIndex(':memory:')
+
+    fp = os.path.join(tempdir, 'test_file.txt')
+
+    with open(fp, 'w+') as f:
+        f.write('just written')
+
+    assert not index.set(fp, 'md5', 'my checksum')
+    assert index.get(fp, 'md5') is None
+
+
+def test_cached_reads_use_hash_index(api, cache, opener, no_racy_interval):
+
+    api.attach_cache(cache)
+    assert api.hash_index is not None
+
+    archive = api.create('indexed_archive', versioned=False)
+    archive.cache()
+
+    with opener(archive, 'w+') as f:
+        f.write(u('indexed contents'))
+
+    hashed = []
+    hash_file = api.hash_file
+
+    def counter(f, *args, **kwargs):
+        hashed.append(f)
+        return hash_file(f, *args, **kwargs)
+
+    api.hash_file = counter
+
+    with opener(archive, 'r') as f:
+        assert f.read() == u('indexed contents')
+
+    del hashed[:]
+
+    for _ in range(3):
+        with opener(archive, 'r') as f:
+            assert f.read() == u('indexed contents')
+
+    # The cached file is not rehashed. Temporary copies made by
+    # get_local_path are still hashed to detect changes.
+    assert not any(isinstance(f, string_types) for f in hashed)
+
+    # Writes are still detected
+    with opener(archive, 'w+') as f:
+        f.write(u('new contents'))
+
+    with opener(archive, 'r') as f:
+        assert f.read() == u('new contents')
@@ -0,0 +1,119 @@
+from __future__ import absolute_import
+
+from datafs.core import hashing
+from datafs._compat import u
+
+import io
+import os
+import hashlib
+import pytest
+
+
+class _ReadOnlyFile(object):
+    '''
+    File-like object without a ``readinto`` method
+    '''
+
+    def __init__(self, data):
+        self._f = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._f.read(size)
+
+
+def test_hash_registry():
+
+    assert 'md5' in hashing.get_algorithms()
+    assert 'sha256' in hashing.get_algorithms()
+
+    with pytest.raises(ValueError):
+        hashing.new_hasher('not-an-algorithm')
+
+
+def test_hash_file_buffers(monkeypatch):
+
+    monkeypatch.setattr(hashing, 'MinBufferSize', 16)
+    monkeypatch.setattr(hashing, 'MaxBufferSize', 256)
+
+    data = os.urandom(10000)
+
+    expected = {
+        'md5': hashlib.md5(data).hexdigest(),
+        'sha256': hashlib.sha256(data).hexdigest()}
+
+    assert hashing.hash_file(io.BytesIO(data), ['md5', 'sha256']) == expected
+    assert hashing.hash_file(_ReadOnlyFile(data), ['md5', 'sha256']) == (
+        expected)
+
+
+def test_api_hash_file(api):
+
+    data = b'hash this'
+
+    assert api.hash_file(io.BytesIO(data)) == {
+        'algorithm': 'md5',
+        'checksum': hashlib.md5(data).hexdigest()}
+
+    assert api.hash_file(
+        io.BytesIO(data),
+        algorithm='sha256',
+        extra_algorithms=['md5']) == {
+            'algorithm': 'sha256',
+            'checksum': hashlib.sha256(data).hexdigest(),
+            'checksums': {
+                'sha256': hashlib.sha256(data).hexdigest(),
+                'md5': hashlib.md5(data).hexdigest()}}
+
+
+def test_mixed_algorithm_history(api, cache, opener, tempdir):
+
+    api.attach_cache(cache)
+
+    archive = api.create('mixed_hashes')
+
+    with opener(archive, 'w+') as f:
+        f.write(u('written with md5'))
+
+    archive.cache()
+
+    api.HashAlgorithm = 'sha256'
+
+    # Reading a version written with md5 still validates the cached copy
+    for _ in range(2):
+        with opener(archive, 'r') as f:
+            assert f.read() == u('written with md5')
+
+    with open(cache.getsyspath(archive.get_version_path()), 'r') as f:
+        assert f.read() == 'written with md5'
+
+    # Re-uploading identical contents is recognized across algorithms
+    fp = os.path.join(tempdir, 'test_file.txt')
+
+    with open(fp, 'w+') as f:
+        f.write('written with md5')
+
+    archive.update(fp)
+    assert archive.get_latest_version() == '0.0.1'
+
+    with opener(archive, 'w+') as f:
+        f.write(u('written with sha256'))
+
+    history = archive.get_history()
+    assert [v['algorithm'] for v in history] == ['md5', 'sha256']
+
+    with opener(archive, 'r', version='0.0.1') as f:
+        assert f.read() == u('written with md5')
+
+    with opener(archive, 'r') as f:
+        assert f.read() == u('written with sha256')
+
+    archive.download(fp, version='0.0.1')
+
+    with open(fp, 'r') as f:
+        assert f.read() == 'written with md5'
+
+    paths, failures = api.batch_download({'mixed_hashes': fp})
+    assert failures == {}
+
+    with open(fp, 'r') as f:
+        assert f.read() == 'written with sha256'
@@ -1,8 +1,11 @@
 
 from __future__ import absolute_import
 from datafs.managers.manager import BaseDataManager
+from datafs.core.patterns import match_archive_name
 from botocore.exceptions import ClientError
+from tests.resources import prep_manager
 import pytest
+import zlib
 
 
 @pytest.fixture
@@ -112,6 +115,368 @@ def test_table_deletion(api):
         api.manager._update_spec_config('required_user_config', {})
 
 
+def test_search(api):
+
+    api.create('proj.a/one', tags=['climate', 'model'])
+    api.create('proj.a/two', tags=['climate'])
+    api.create('projXa/three', tags=['climate', 'model'])
+
+    def search(*tags, **kwargs):
+        return sorted(api.manager.search(tags, **kwargs))
+
+    assert search('climate', 'model') == ['proj.a/one', 'projXa/three']
+    assert search('model', 'climate', 'climate') == [
+        'proj.a/one', 'projXa/three']
+
+    # Prefixes are matched literally
+    assert search(begins_with='proj.a') == ['proj.a/one', 'proj.a/two']
+    assert search('model', begins_with='proj.a/') == ['proj.a/one']
+    assert search('unused') == []
+
+
+def test_mongo_tags_index():
+
+    with prep_manager('mongo', table_name='index-test') as manager:
+        assert 'tags_1' in manager.collection.index_information()
+
+        # Indexes are added to existing tables
+        manager.collection.drop_index('tags_1')
+        manager._indexed = False
+
+        assert 'tags_1' in manager.collection.index_information()
+
+
+def test_dynamo_tag_index():
+
+    with prep_manager('dynamo', table_name='tag-index-test') as manager:
+
+        assert 'tag-index-test.tags' not in manager.table_names
+
+        for archive_name, tags in [
+                ('a/one', ['x', 'y']),
+                ('a/two', ['x']),
+                ('b/three', ['x', 'y'])]:
+
+            manager.create_archive(
+                archive_name,
+                authority_name='auth',
+                archive_path=archive_name,
+                versioned=True,
+                tags=tags)
+
+        def no_scan(*args, **kwargs):
+            raise AssertionError('Tag search scanned the archive table')
+
+        manager._scan = no_scan
+
+        def search(*tags, **kwargs):
+            return sorted(manager.search(tags, **kwargs))
+
+        assert search('x', 'y') == ['a/one', 'b/three']
+        assert search('x', begins_with='a/') == ['a/one', 'a/two']
+
+        manager.add_tags('a/two', ['y'])
+        manager.delete_tags('b/three', ['y'])
+        assert search('y') == ['a/one', 'a/two']
+
+        manager.delete_archive_record('a/one')
+        assert search('x') == ['a/two', 'b/three']
+
+        # Tables without a tag index are scanned
+        del manager._scan
+        manager._tag_table.delete()
+        manager._has_tag_index = None
+
+        assert search('x', 'y') == ['a/two']
+
+
+def test_dynamo_parallel_scan(monkeypatch):
+
+    with prep_manager('dynamo', table_name='parallel-scan-test') as manager:
+
+        for i in range(20):
+            manager.create_archive(
+                'archive{}'.format(i),
+                authority_name='auth',
+                archive_path='archive{}'.format(i),
+                versioned=True,
+                tags=['even' if i % 2 == 0 else 'odd'])
+
+        expected = sorted(manager._scan(['even']))
+        assert len(expected) == 10
+
+        client = manager._resource.meta.client
+        scan = client.scan
+        segments = []
+
+        def segmented_scan(Segment, TotalSegments, **kwargs):
+            '''
+            Assign items to segments by hash, as DynamoDB does
+            '''
+
+            segments.append(Segment)
+
+            res = scan(**kwargs)
+            res['Items'] = [
+                item for item in res['Items']
+                if zlib.crc32(item['_id'].encode('utf-8')) %
+                TotalSegments == Segment]
+
+            return res
+
+        monkeypatch.setattr(client, 'scan', segmented_scan)
+        monkeypatch.setattr(manager, 'ScanSegments', 4)
+
+        assert sorted(manager._scan(['even'])) == expected
+        assert sorted(set(segments)) == [0, 1, 2, 3]
+
+        assert sorted(manager._scan([], begins_with='archive1')) == [
+            'archive1'] + ['archive1{}'.format(i) for i in range(10)]
+
+
+def test_filter(mgr_name, monkeypatch):
+
+    names = [
+        'data/a.nc',
+        'data/b.csv',
+        'data/sub/c.nc',
+        'Data/upper.nc',
+        'other/data.nc',
+        'star*name',
+        'q?name',
+        'br[a]cket']
+
+    with prep_manager(mgr_name, table_name='filter-test') as manager:
+
+        for name in names:
+            manager.create_archive(
+                name, authority_name='auth', archive_path=name, versioned=True)
+
+        assert sorted(manager.filter()) == sorted(names)
+        assert sorted(manager.filter(begins_with='data/')) == [
+            'data/a.nc', 'data/b.csv', 'data/sub/c.nc']
+
+        with pytest.raises(ValueError):
+            manager.filter('*', engine='glob')
+
+        def full_search(*args, **kwargs):
+            raise AssertionError('Patterns should be matched by the manager')
+
+        monkeypatch.setattr(manager, '_search', full_search)
+
+        cases = [
+            ('*.nc', 'path', None),
+            ('data/*', 'path', None),
+            ('data/?.*', 'path', None),
+            ('*[bc].*', 'path', None),
+            ('*/[!a-c].nc', 'path', None),
+            ('star[*]*', 'path', None),
+            ('q?name', 'path', None),
+            ('br[[]a]cket', 'path', None),
+            ('*.nc', 'path', 'data/sub'),
+            ('.nc', 'str', None),
+            ('*', 'str', None),
+            ('[a]', 'str', None),
+            ('ata', 'str', 'other/'),
+            (r'^data/.*\.nc$', 'regex', None),
+            ('name$', 'regex', None),
+            ('[A-Z]', 'regex', 'Data')]
+
+        for pattern, engine, begins_with in cases:
+            expected = sorted(
+                name for name in names
+                if (begins_with is None or name.startswith(begins_with)) and
+                match_archive_name(name, pattern, engine))
+
+            assert sorted(manager.filter(
+                pattern, engine=engine, begins_with=begins_with)) == expected
+
+
+def test_dependents_index(mgr_name, monkeypatch):
+
+    with prep_manager(mgr_name, table_name='dependents-test') as manager:
+
+        for archive_name in ['base', 'model', 'report', 'params']:
+            manager.create_archive(
+                archive_name,
+                authority_name='auth',
+                archive_path=archive_name,
+                versioned=(archive_name != 'params'))
+
+        def record(version, dependencies):
+            return {
+                'version': version,
+                'checksum': 'abc',
+                'algorithm': 'md5',
+                'dependencies': dependencies}
+
+        manager.update('model', record('0.0.1', {'base': '0.1'}))
+        manager.update('params', record(None, {'base': None}))
+
+        manager.batch_update({
+            'model': record('0.0.2', {'base': '0.2.0', 'params': None}),
+            'report': record('0.0.1', {'model': '0.0.2', 'base': '0.1.0'})})
+
+        # Setting dependencies appends a record for the same version
+        manager.update('report', record('0.0.1', {'model': '0.0.2'}))
+
+        expected = {
+            ('base', None): [
+                ('model', '0.0.1'), ('model', '0.0.2'), ('params', None)],
+            ('base', '0.1.0'): [('model', '0.0.1')],
+            ('base', '0.2'): [('model', '0.0.2')],
+            ('model', None): [('report', '0.0.1')],
+            ('params', None): [('model', '0.0.2')],
+            ('report', None): []}
+
+        def check(expected):
+            for (archive_name, version), dependents in expected.items():
+                assert manager.get_dependents(
+                    archive_name, version=version) == dependents
+
+        check(expected)
+
+        manager.delete_archive_record('model')
+
+        expected = {
+            ('base', None): [('params', None)],
+            ('base', '0.1'): [],
+            ('model', None): [('report', '0.0.1')]}
+
+        check(expected)
+
+        # Tables without an index are scanned
+        monkeypatch.setattr(
+            manager, '_dependents_index_exists', lambda: False)
+
+        check(expected)
+
+
+def test_projected_listing(mgr_name):
+
+    with prep_manager(mgr_name, table_name='projection-test') as manager:
+
+        manager.create_archive(
+            'arch',
+            authority_name='auth',
+            archive_path='arch/path',
+            versioned=True,
+            metadata={'description': 'projected'},
+            tags=['a'])
+
+        manager.update('arch', {'version': '0.0.1', 'checksum': 'abc'})
+
+        listing = manager._get_archive_listing('arch', projection=['tags'])
+
+        assert listing['_id'] == 'arch'
+        assert list(listing['tags']) == ['a']
+        assert 'version_history' not in listing
+
+        assert manager.get_tags('arch') == ['a']
+        assert manager.get_metadata('arch') == {'description': 'projected'}
+        assert manager.get_latest_hash('arch') == 'abc'
+        assert manager._get_authority_name('arch') == 'auth'
+        assert manager._get_archive_path('arch') == 'arch/path'
+        assert manager._get_archive_spec('arch') == {
+            'archive_name': 'arch',
+            'authority_name': 'auth',
+            'archive_path': 'arch/path',
+            'versioned': True}
+
+        with pytest.raises(KeyError):
+            manager._get_archive_listing('missing', projection=['tags'])
+
+
+def test_atomic_tags(mgr_name):
+
+    with prep_manager(mgr_name, table_name='atomic-tags-test') as manager:
+
+        manager.create_archive(
+            'arch',
+            authority_name='auth',
+            archive_path='arch',
+            versioned=True,
+            tags=['a'])
+
+        def no_set_tags(*args, **kwargs):
+            raise AssertionError('Tags were read and rewritten')
+
+        manager._set_tags = no_set_tags
+
+        manager.add_tags('arch', ['b', 'c', 'a'])
+        manager.add_tags('arch', ['c', 'd'])
+        assert sorted(manager.get_tags('arch')) == ['a', 'b', 'c', 'd']
+
+        manager.delete_tags('arch', ['a', 'c', 'x'])
+        assert sorted(manager.get_tags('arch')) == ['b', 'd']
+
+        manager.delete_tags('arch', ['b', 'd'])
+        assert list(manager.get_tags('arch')) == []
+        assert list(manager.search(['b'])) == []
+
+        manager.add_tags('arch', ['e'])
+        assert list(manager.search(['e'])) == ['arch']
+
+        with pytest.raises(KeyError):
+            manager.add_tags('missing', ['a'])
+
+        with pytest.raises(KeyError):
+            manager.delete_tags('missing', ['a'])
+
+
+def test_dynamo_tag_list_conversion():
+
+    with prep_manager('dynamo', table_name='tag-list-test') as manager:
+
+        # Tags written as a list by earlier versions
+        manager._table.put_item(Item={
+            '_id': 'arch',
+            'authority_name': 'auth',
+            'archive_path': 'arch',
+            'versioned': True,
+            'version_history': [],
+            'archive_metadata': {},
+            'tags': ['b', 'a']})
+
+        assert manager.get_tags('arch') == ['b', 'a']
+
+        manager.add_tags('arch', ['c'])
+        assert manager.get_tags('arch') == ['a', 'b', 'c']
+
+        manager.delete_tags('arch', ['a'])
+        assert manager.get_tags('arch') == ['b', 'c']
+        assert sorted(manager.search(['c'])) == ['arch']
+
+
+def test_update_metadata(mgr_name):
+
+    with prep_manager(mgr_name, table_name='metadata-test') as manager:
+
+        manager.create_archive(
+            'arch',
+            authority_name='auth',
+            archive_path='arch',
+            versioned=True,
+            metadata={'description': 'old', 'size': 1, 'name': 'x'})
+
+        # Reserved words and punctuation are allowed in metadata keys
+        manager.update_metadata('arch', {
+            'description': 'new',
+            'source-url': 'http://example.com',
+            'name': None,
+            'unset-key': None})
+
+        assert manager.get_metadata('arch') == {
+            'description': 'new',
+            'size': 1,
+            'source-url': 'http://example.com'}
+
+        manager.update_metadata('arch', {})
+
+        with pytest.raises(KeyError):
+            manager.update_metadata('missing', {'description': 'new'})
+
+
 def test_manager_spec_setup_api_metadata(api_with_spec, auth1):
 
     with pytest.raises(AssertionError):
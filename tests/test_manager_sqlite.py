@@ -0,0 +1,108 @@
+from __future__ import absolute_import
+
+from datafs.managers.manager_sqlite import SQLiteManager
+from datafs.config.constructor import APIConstructor
+from datafs import DataAPI
+
+import os
+import pytest
+
+
+@pytest.yield_fixture
+def sqlite_path(tempdir):
+    yield os.path.join(tempdir, 'datafs.db')
+
+
+def _create(manager, archive_name, tags=None):
+    manager.create_archive(
+        archive_name,
+        authority_name='auth',
+        archive_path=archive_name,
+        versioned=True,
+        tags=tags)
+
+
+def test_sqlite_manager_persists(sqlite_path):
+
+    manager = APIConstructor._generate_manager({
+        'class': 'SQLiteManager',
+        'kwargs': {'database': sqlite_path, 'table_name': 'archives'}})
+
+    assert isinstance(manager, SQLiteManager)
+
+    manager.create_archive_table('archives')
+    _create(manager, 'arch1', tags=['a', 'b'])
+
+    manager.update('arch1', {'version': '0.0.1', 'checksum': 'abc'})
+    manager.update('arch1', {'version': '0.0.2', 'checksum': 'def'})
+    manager.update_metadata('arch1', {'description': 'my archive'})
+
+    manager = SQLiteManager(**manager.config)
+
+    assert manager.get_tags('arch1') == ['a', 'b']
+    assert manager.get_latest_hash('arch1') == 'def'
+    assert manager.get_metadata('arch1') == {'description': 'my archive'}
+    assert [v['version'] for v in manager.get_version_history('arch1')] == [
+        '0.0.1', '0.0.2']
+
+    manager.delete_archive_record('arch1')
+
+    with pytest.raises(KeyError):
+        manager.get_archive_listing('arch1')
+
+    # Versions and tags are removed with the archive
+    _create(manager, 'arch1')
+    assert manager.get_tags('arch1') == []
+    assert manager.get_version_history('arch1') == []
+
+
+def test_sqlite_search(sqlite_path):
+
+    manager = SQLiteManager(sqlite_path, 'archives')
+    manager.create_archive_table('archives')
+
+    _create(manager, 'proj/one', tags=['climate', 'model'])
+    _create(manager, 'proj/two', tags=['climate'])
+    _create(manager, 'proj*/three', tags=['climate', 'model'])
+    _create(manager, 'other/four', tags=['model'])
+
+    def search(*tags, **kwargs):
+        return sorted(manager.search(tags, **kwargs))
+
+    assert search('climate') == ['proj*/three', 'proj/one', 'proj/two']
+    assert search('climate', 'model') == ['proj*/three', 'proj/one']
+    assert search('climate', 'climate') == [
+        'proj*/three', 'proj/one', 'proj/two']
+    assert search('model', begins_with='proj/') == ['proj/one']
+    assert search(begins_with='proj*') == ['proj*/three']
+    assert search(begins_with='Proj') == []
+    assert search('unused') == []
+    assert len(search()) == 4
+
+    manager.add_tags('other/four', ['climate'])
+    manager.delete_tags('proj/two', ['climate'])
+    assert search('climate') == ['other/four', 'proj*/three', 'proj/one']
+
+
+def test_sqlite_batch_get(sqlite_path, monkeypatch):
+
+    monkeypatch.setattr(SQLiteManager, 'MaxQueryLength', 3)
+
+    api = DataAPI(username='My Name', contact='my.email@example.com')
+    api.attach_manager(SQLiteManager(sqlite_path, 'archives'))
+    api.manager.create_archive_table('archives')
+
+    names = ['archive_{}'.format(i) for i in range(10)]
+
+    for name in names:
+        _create(api.manager, name, tags=[name])
+        api.manager.update(name, {'version': '0.0.1', 'checksum': name})
+
+    listings = api.manager.batch_get_archive_listing(
+        names + ['missing_archive'])
+
+    assert sorted(l['_id'] for l in listings) == names
+
+    for listing in listings:
+        assert listing['tags'] == [listing['_id']]
+        assert listing['version_history'][0]['checksum'] == listing['_id']
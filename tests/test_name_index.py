@@ -0,0 +1,108 @@
+from __future__ import absolute_import
+
+from datafs._compat import u
+
+import pytest
+
+
+@pytest.fixture
+def indexed_api(api):
+
+    for name in [
+            'data/a.nc', 'data/b.csv', 'data/sub/c.nc', 'other/d.nc']:
+        archive = api.create(name)
+
+        with archive.open('w+') as f:
+            f.write(u(name))
+
+    api.create('data/empty.nc')
+
+    return api
+
+
+def test_name_index_queries(indexed_api):
+
+    api = indexed_api
+
+    expected = {
+        'filter': sorted(api.filter(pattern='*.nc')),
+        'prefix': sorted(api.filter(prefix='data/')),
+        'str': sorted(api.filter(pattern='sub', engine='str')),
+        'regex': sorted(api.filter(pattern=r'\.csv$', engine='regex')),
+        'search': sorted(api.search(prefix='data/sub')),
+        'versions': sorted(api.listdir('data/a.nc'))}
+
+    index = api.attach_name_index()
+
+    searches = []
+    search = api.manager.search
+
+    def counter(*args, **kwargs):
+        searches.append(args)
+        return search(*args, **kwargs)
+
+    api.manager.search = counter
+
+    assert sorted(api.filter(pattern='*.nc')) == expected['filter']
+    assert sorted(api.filter(prefix='data/')) == expected['prefix']
+    assert sorted(api.filter(pattern='sub', engine='str')) == expected['str']
+    assert sorted(
+        api.filter(pattern=r'\.csv$', engine='regex')) == expected['regex']
+    assert sorted(api.search(prefix='data/sub')) == expected['search']
+
+    assert api.listdir('') == ['data', 'other']
+    assert api.listdir('data') == ['a.nc', 'b.csv', 'empty.nc', 'sub']
+    assert api.listdir('data/sub') == ['c.nc']
+
+    # Archive names are listed on the authority
+    assert sorted(api.listdir('data/a.nc')) == expected['versions']
+
+    # The index was loaded once
+    assert len(searches) == 1
+    assert len(index) == 5
+
+    # Tag searches are sent to the manager
+    assert list(api.search('tag')) == []
+    assert len(searches) == 2
+
+    api.create('data/new.nc')
+    api.delete_archive('data/b.csv')
+
+    assert api.listdir('data') == ['a.nc', 'empty.nc', 'new.nc', 'sub']
+    assert 'data/new.nc' in index
+    assert 'data/b.csv' not in index
+    assert len(searches) == 2
+
+    api.manager.search = search
+    api.detach_name_index()
+
+    assert api.name_index is None
+    assert 'data/new.nc' in list(api.filter(prefix='data/'))
+
+
+def test_name_index_expiry(indexed_api, monkeypatch):
+
+    api = indexed_api
+
+    index = api.attach_name_index(ttl=60)
+    assert len(index) == 5
+
+    # Archives created by other users are seen once the index expires
+    api.manager.create_archive(
+        'data/other_user.nc', authority_name='filesys',
+        archive_path='data/other_user.nc', versioned=True)
+
+    assert 'data/other_user.nc' not in index
+
+    now = [1000]
+    monkeypatch.setattr(
+        'datafs.core.name_index.time.time', lambda: now[0])
+
+    index.refresh()
+    api.manager.delete_archive_record('data/other_user.nc')
+
+    now[0] += 59
+    assert 'data/other_user.nc' in index
+
+    now[0] += 1
+    assert 'data/other_user.nc' not in index
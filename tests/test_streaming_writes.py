@@ -0,0 +1,151 @@
+from __future__ import absolute_import
+
+from datafs.core import data_file
+from datafs._compat import u
+
+import hashlib
+import pytest
+
+
+@pytest.yield_fixture
+def no_write_fs(monkeypatch):
+    '''
+    Fail if a write goes through a temporary filesystem
+    '''
+
+    def fail():
+        raise AssertionError('Temporary write filesystem used')
+
+    monkeypatch.setattr(data_file, '_get_write_fs', fail)
+
+    yield
+
+
+def test_streaming_writes(api, no_write_fs):
+
+    archive = api.create('streamed_archive')
+
+    with archive.open('w') as f:
+        f.write(u('streamed text'))
+
+    with archive.open('wb', bumpversion='minor') as f:
+        f.write(b'streamed ')
+        f.write(b'bytes')
+
+    assert archive.get_versions() == ['0.0.1', '0.1']
+
+    assert archive.get_version_hash('0.0.1') == (
+        hashlib.md5(b'streamed text').hexdigest())
+
+    assert archive.get_version_hash('0.1') == (
+        hashlib.md5(b'streamed bytes').hexdigest())
+
+    with archive.open('rb', version='0.0.1') as f:
+        assert f.read() == b'streamed text'
+
+    with archive.open('rb') as f:
+        assert f.read() == b'streamed bytes'
+
+    # Unchanged contents and empty writes do not create new versions
+    with archive.open('wb', bumpversion='major') as f:
+        f.write(b'streamed bytes')
+
+    with archive.open('w', bumpversion='major') as f:
+        pass
+
+    assert archive.get_versions() == ['0.0.1', '0.1']
+
+
+def test_streaming_spills_to_disk(api, monkeypatch, no_write_fs):
+
+    monkeypatch.setattr(data_file, 'SpoolMaxSize', 1024)
+
+    api.HashAlgorithm = 'sha256'
+
+    archive = api.create('spilled_archive')
+
+    contents = b'0123456789abcdef' * 1000
+
+    with archive.open('wb') as f:
+        for i in range(0, len(contents), 100):
+            f.write(contents[i:i + 100])
+
+    assert archive.get_history()[-1]['algorithm'] == 'sha256'
+    assert archive.get_version_hash() == hashlib.sha256(contents).hexdigest()
+
+    with archive.open('rb') as f:
+        assert f.read() == contents
+
+
+def test_streaming_writes_update_cache(api, cache):
+
+    api.attach_cache(cache)
+
+    archive = api.create('streamed_cached', versioned=False)
+    archive.cache()
+
+    with archive.open('w') as f:
+        f.write(u('cached text'))
+
+    assert cache.getcontents(archive.get_version_path()) == b'cached text'
+
+    with archive.open('r') as f:
+        assert f.read() == u('cached text')
+
+    assert api.cache.get_stats()['hits'] == 1
+
+
+def test_streaming_writes_to_chunked_archives(api):
+
+    archive = api.create('streamed_chunks', chunked=True)
+
+    with archive.open('wb') as f:
+        f.write(b'chunked contents')
+
+    assert archive.get_version_manifest() is not None
+
+    with archive.open('rb') as f:
+        assert f.read() == b'chunked contents'
+
+
+def test_streaming_without_algorithms(api):
+    '''
+    Hashers without an ``algorithms`` list are called on the buffer
+    '''
+
+    archive = api.create('custom_hasher', versioned=False)
+    written = {}
+
+    def update(**checksum):
+        written.update(checksum)
+
+    def hasher(f):
+        return {
+            'algorithm': 'md5',
+            'checksum': hashlib.md5(f.read()).hexdigest()}
+
+    with data_file.open_stream(
+            archive.authority,
+            None,
+            update,
+            lambda chk: False,
+            hasher,
+            archive.get_version_path(),
+            mode='wb') as f:
+
+        f.write(b'custom')
+
+    assert written == {
+        'algorithm': 'md5',
+        'checksum': hashlib.md5(b'custom').hexdigest()}
+
+    with pytest.raises(ValueError):
+        with data_file.open_stream(
+                archive.authority,
+                None,
+                update,
+                lambda chk: False,
+                hasher,
+                archive.get_version_path(),
+                mode='w+'):
+            pass
@@ -0,0 +1,111 @@
+from __future__ import absolute_import
+
+from tests.resources import prep_manager
+
+import pytest
+
+
+@pytest.yield_fixture
+def separate_manager(mgr_name):
+
+    table_name = 'separate-versions-table'
+
+    with prep_manager(mgr_name, table_name=table_name) as manager:
+
+        manager.delete_table(table_name)
+        manager.create_archive_table(table_name, separate_versions=True)
+
+        yield manager
+
+
+def _create(manager, archive_name):
+    manager.create_archive(
+        archive_name,
+        authority_name='auth',
+        archive_path=archive_name,
+        versioned=True)
+
+
+def test_separate_version_storage(separate_manager):
+
+    manager = separate_manager
+
+    _create(manager, 'arch1')
+    _create(manager, 'arch2')
+
+    assert manager.get_latest_hash('arch1') is None
+    assert manager.get_version_history('arch1') == []
+
+    for i in range(5):
+        manager.update(
+            'arch1', {'version': '0.0.{}'.format(i), 'checksum': str(i)})
+
+    manager.update('arch2', {'version': '0.0.1', 'checksum': 'a'})
+
+    def versions(*args, **kwargs):
+        return [
+            v['version']
+            for v in manager.get_version_history('arch1', *args, **kwargs)]
+
+    assert versions() == ['0.0.0', '0.0.1', '0.0.2', '0.0.3', '0.0.4']
+    assert versions(start=1, limit=2) == ['0.0.1', '0.0.2']
+    assert versions(start=3) == ['0.0.3', '0.0.4']
+    assert versions(start=10) == []
+
+    assert manager.get_latest_hash('arch1') == '4'
+
+    listing = manager.get_archive_listing('arch1')
+    assert len(listing['version_history']) == 5
+
+    listings = manager.batch_get_archive_listing(['arch1', 'arch2'])
+    assert sorted(
+        len(listing['version_history']) for listing in listings) == [1, 5]
+
+    with pytest.raises(KeyError):
+        manager.update('missing', {'version': '0.0.1', 'checksum': 'a'})
+
+    with pytest.raises(KeyError):
+        manager.get_version_history('missing')
+
+    # Version records are deleted with the archive
+    manager.delete_archive_record('arch1')
+    _create(manager, 'arch1')
+
+    assert manager.get_version_history('arch1') == []
+    assert manager.get_latest_hash('arch1') is None
+
+
+def test_separate_versions_not_embedded(separate_manager):
+
+    manager = separate_manager
+
+    if not manager.separate_versions:
+        pytest.skip('Manager always stores versions separately')
+
+    _create(manager, 'arch1')
+
+    for i in range(3):
+        manager.update(
+            'arch1', {'version': '0.0.{}'.format(i), 'checksum': str(i)})
+
+    document = manager._get_archive_listing('arch1')
+
+    assert document['version_history'] == []
+    assert document['latest_version']['checksum'] == '2'
+
+
+def test_embedded_version_paging(mgr_name):
+
+    with prep_manager(mgr_name, table_name='embedded-versions') as manager:
+
+        assert not manager.separate_versions
+
+        _create(manager, 'arch1')
+
+        for i in range(3):
+            manager.update(
+                'arch1', {'version': '0.0.{}'.format(i), 'checksum': str(i)})
+
+        history = manager.get_version_history('arch1', start=1, limit=1)
+        assert [v['version'] for v in history] == ['0.0.1']
+        assert manager.get_latest_hash('arch1') == '2'